@@ -14,6 +14,7 @@ nox.options.sessions = (
     "pre-commit",
     "safety",
     "mypy",
+    "tests",
 )
 
 
@@ -112,3 +113,11 @@ def mypy(session: Session) -> None:
     session.run("mypy", *args)
     if not session.posargs:
         session.run("mypy", f"--python-executable={sys.executable}", "noxfile.py")
+
+
+@session(python=python_versions)
+def tests(session: Session) -> None:
+    """Run the test suite."""
+    session.install(".")
+    session.install("pytest")
+    session.run("pytest", *session.posargs)
@@ -1,5 +1,6 @@
 """Initialise and run the bot."""
 import logging
+from typing import Any
 
 from discord import Activity
 from discord import ActivityType
@@ -15,8 +16,8 @@ _update_event_loop_policy()
 log = logging.getLogger("obsidion")
 
 
-def main() -> None:
-    """Main initialisation script."""
+def run_bot(**kwargs: Any) -> None:
+    """Build and run a bot, extra arguments are passed on to it."""
     # So no one can abuse the bot to mass mention
     allowed_mentions = AllowedMentions(everyone=False, roles=False, users=True)
 
@@ -43,17 +44,31 @@ def main() -> None:
         "intents": intents,
         "allowed_mentions": allowed_mentions,
         "command_prefix": "$",
+        **kwargs,
     }
 
     obsidion = Obsidion(**args)
 
     log.info("Ready to go, building everything")
-    SlashCommand(obsidion, sync_commands=True, sync_on_cog_reload=True)
+    # Commands are global, so only one cluster needs to sync them
+    SlashCommand(
+        obsidion, sync_commands=obsidion.cluster_id == 0, sync_on_cog_reload=True
+    )
     log.info("Initialised slash commands")
     obsidion.run(get_settings().DISCORD_TOKEN)
     log.info("Obsidion shutting down")
 
 
+def main() -> None:
+    """Main initialisation script."""
+    if get_settings().CLUSTERS > 1:
+        from obsidion.core.cluster import launch
+
+        launch()
+    else:
+        run_bot(shard_count=get_settings().SHARD_COUNT)
+
+
 if __name__ == "__main__":
     """Run the bot."""
     main()
@@ -2,12 +2,14 @@
 from __future__ import annotations
 
 import logging
+from typing import List
 from typing import TYPE_CHECKING
 
-import dbl
 from discord.ext import commands
-from discord.ext import tasks
 from obsidion.core import get_settings
+from obsidion.core.cluster_stats import ClusterTotals
+from obsidion.core.webhooks import WebhookPoster
+from obsidion.core.webhooks import WebhookTarget
 
 if TYPE_CHECKING:
     from obsidion.core.bot import Obsidion
@@ -19,69 +21,72 @@ class Botlist(commands.Cog):
     def __init__(self, bot: Obsidion) -> None:
         """Init."""
         self.bot = bot
-        self.dblpy = None
-        self.post_stats.start()
+        self.poster = WebhookPoster(bot.http_clients.get("botlists"))
+        bot.scheduler.add("botlist_post_stats", self.post_stats, interval=30 * 60)
+
+    def cog_unload(self) -> None:
+        """Stop stats posting on cog unload."""
+        self.bot.scheduler.remove("botlist_post_stats")
 
-    @tasks.loop(minutes=30.0)
     async def post_stats(self):
         await self.bot.wait_until_ready()
-        if self.dblpy is None:
-            self.dblpy = dbl.DBLClient(
-                self.bot, get_settings().DBL_TOKEN, autopost=True
-            )
-        await self.post_discordbotlist()
-        await self.post_botsfordiscord()
-        await self.post_discordboats()
-        await self.post_discordlabs()
-
-    async def on_guild_post(self):
-        log.info("Top.gg guild count posted.")
-
-    async def post_discordbotlist(self):
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": get_settings().DISCORDBOTLIST_TOKEN,
-        }
-        json = {"server_count": len(self.bot.guilds)}
-        await self.bot.http_session.post(
-            f"https://discordbotlist.com/api/v1/bots/{self.bot.user.id}/stats",
-            headers=headers,
-            json=json,
+        totals = await self.bot.cluster_stats.totals()
+        if not totals.guilds:
+            return
+        results = await self.poster.post_all(self.build_targets(totals))
+        log.info(
+            "Posted stats to %d of %d bot lists.", sum(results.values()), len(results)
         )
 
-    async def post_botsfordiscord(self):
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": get_settings().BOTSFORDISCORD_TOKEN,
-        }
-        json = {"server_count": len(self.bot.guilds)}
-
-        await self.bot.http_session.post(
-            f"https://botsfordiscord.com/api/bot/{self.bot.user.id}",
-            headers=headers,
-            json=json,
-        )
-
-    async def post_discordboats(self):
-        headers = {
-            "Authorization": get_settings().DISCORDBOATS_TOKEN,
-        }
-        json = {"server_count": len(self.bot.guilds)}
-
-        await self.bot.http_session.post(
-            f"https://discord.boats/api/bot/{self.bot.user.id}",
-            headers=headers,
-            json=json,
-        )
-
-    async def post_discordlabs(self):
-        headers = {
-            "token": get_settings().DISCORDLABS_TOKEN,
-        }
-        json = {"server_count": len(self.bot.guilds)}
-
-        await self.bot.http_session.post(
-            f"https://bots.discordlabs.org/v2/bot/{self.bot.user.id}/stats",
-            headers=headers,
-            json=json,
-        )
+    def build_targets(self, totals: ClusterTotals) -> List[WebhookTarget]:
+        """Build the stats payload for every bot list with a token set."""
+        settings = get_settings()
+        bot_id = self.bot.user.id
+        json = {"server_count": totals.guilds}
+        targets = []
+        if settings.DBL_TOKEN:
+            targets.append(
+                WebhookTarget(
+                    "topgg",
+                    f"https://top.gg/api/bots/{bot_id}/stats",
+                    {"server_count": totals.guilds, "shard_count": totals.shards},
+                    {"Authorization": settings.DBL_TOKEN},
+                )
+            )
+        if settings.DISCORDBOTLIST_TOKEN:
+            targets.append(
+                WebhookTarget(
+                    "discordbotlist",
+                    f"https://discordbotlist.com/api/v1/bots/{bot_id}/stats",
+                    json,
+                    {"Authorization": settings.DISCORDBOTLIST_TOKEN},
+                )
+            )
+        if settings.BOTSFORDISCORD_TOKEN:
+            targets.append(
+                WebhookTarget(
+                    "botsfordiscord",
+                    f"https://botsfordiscord.com/api/bot/{bot_id}",
+                    json,
+                    {"Authorization": settings.BOTSFORDISCORD_TOKEN},
+                )
+            )
+        if settings.DISCORDBOATS_TOKEN:
+            targets.append(
+                WebhookTarget(
+                    "discordboats",
+                    f"https://discord.boats/api/bot/{bot_id}",
+                    json,
+                    {"Authorization": settings.DISCORDBOATS_TOKEN},
+                )
+            )
+        if settings.DISCORDLABS_TOKEN:
+            targets.append(
+                WebhookTarget(
+                    "discordlabs",
+                    f"https://bots.discordlabs.org/v2/bot/{bot_id}/stats",
+                    json,
+                    {"token": settings.DISCORDLABS_TOKEN},
+                )
+            )
+        return targets
@@ -1,18 +1,24 @@
 """Images cog."""
+import asyncio
 import datetime
 import logging
-import pickle  # noqa: S403
 
 import discord
-from asyncpixel import Hypixel as _Hypixel
 from discord.ext import commands
 from discord_slash import cog_ext
 from discord_slash.utils.manage_commands import create_option
-from obsidion.core import get_settings
+from obsidion.core.errors import NotFoundError
 from obsidion.core.i18n import cog_i18n
 from obsidion.core.i18n import Translator
+from obsidion.core.serialization import benchmark
+from obsidion.core.utils.chat_formatting import box
 from obsidion.core.utils.chat_formatting import humanize_timedelta
 
+from .schemas import BOOSTERS
+from .schemas import NEWS
+from .schemas import WATCHDOG
+from .service import HypixelService
+
 
 log = logging.getLogger(__name__)
 
@@ -24,17 +30,36 @@ class Hypixel(commands.Cog):
     def __init__(self, bot) -> None:
         """Init."""
         self.bot = bot
-        self.hypixel = _Hypixel(get_settings().HYPIXEL_API_TOKEN)
+        self.service = HypixelService(bot)
+
+    def cog_unload(self) -> None:
+        """Close the Hypixel client."""
+        asyncio.create_task(self.service.close())
+
+    @commands.command()
+    @commands.is_owner()
+    async def hypixelbench(self, ctx: commands.Context, rounds: int = 1000) -> None:
+        """Compare the cache serialisation of Hypixel models against pickle."""
+        samples = {
+            WATCHDOG: await self.service.watchdog_stats(),
+            BOOSTERS: await self.service.boosters(),
+            NEWS: await self.service.news(),
+        }
+        lines = []
+        for schema, value in samples.items():
+            for method, result in benchmark(schema, value, rounds).items():
+                lines.append(
+                    f"{schema.name} {method}: {result.size} bytes, "
+                    f"encode {result.encode:.1f}us, decode {result.decode:.1f}us"
+                )
+        await ctx.send(box("\n".join(lines), "yaml"))
 
-    @cog_ext.cog_slash(name="watchdogstats")
+    @cog_ext.cog_slash(
+        name="watchdogstats", description="Get the current watchdog statistics."
+    )
     async def slash_watchdogstats(self, ctx):
         """Get the current watchdog statistics."""
-        key = "hypixel_watchdog"
-        if await self.bot.redis.exists(key):
-            data = pickle.loads(await self.bot.redis.get(key))  # noqa: S301
-        else:
-            data = await self.hypixel.watchdog_stats()
-            await self.bot.redis.set(key, pickle.dumps(data), px=3600)  # noqa: S301
+        data = await self.service.watchdog_stats()
         embed = discord.Embed(title=_("Watchdog Stats"), colour=self.bot.color)
         embed.add_field(
             name=_("Total Bans"), value=f"{(data.watchdog_total + data.staff_total):,}"
@@ -46,18 +71,13 @@ class Hypixel(commands.Cog):
         embed.add_field(
             name=_("Staff Rolling Daily"), value=f"{data.staff_rolling_daily:,}"
         )
-        embed.timestamp = ctx.message.created_at
+        embed.timestamp = datetime.datetime.utcnow()
         await ctx.send(embed=embed)
 
-    @cog_ext.cog_slash(name="boosters")
+    @cog_ext.cog_slash(name="boosters", description="Get the current boosters online.")
     async def slash_boosters(self, ctx):
         """Get the current boosters online."""
-        key = "hypixel_boosters"
-        if await self.bot.redis.exists(key):
-            data = pickle.loads(await self.bot.redis.get(key))  # noqa: S301
-        else:
-            data = await self.hypixel.boosters()
-            await self.bot.redis.set(key, pickle.dumps(data), px=3600)  # noqa: S301
+        data = await self.service.boosters()
         embed = discord.Embed(
             title=_("Boosters"),
             description=_("Total Boosters online: {lenboosters}").format(
@@ -73,19 +93,16 @@ class Hypixel(commands.Cog):
         embed.set_thumbnail(
             url="https://hypixel.net/styles/hypixel-v2/images/header-logo.png"
         )
-        embed.timestamp = ctx.message.created_at
+        embed.timestamp = datetime.datetime.utcnow()
 
         await ctx.send(embed=embed)
 
-    @cog_ext.cog_slash(name="playercount")
+    @cog_ext.cog_slash(
+        name="playercount", description="Get the current players online on Hypixel."
+    )
     async def slash_playercount(self, ctx):
         """Get the current players online."""
-        key = "hypixel_playercount"
-        if await self.bot.redis.exists(key):
-            data = pickle.loads(await self.bot.redis.get(key))  # noqa: S301
-        else:
-            data = await self.hypixel.player_count()
-            await self.bot.redis.set(key, pickle.dumps(data), px=60)  # noqa: S301
+        data = await self.service.player_count()
         embed = discord.Embed(
             title=_("Players Online"),
             description=_("Total players online: {data}").format(data=data),
@@ -99,19 +116,16 @@ class Hypixel(commands.Cog):
         embed.set_thumbnail(
             url="https://hypixel.net/styles/hypixel-v2/images/header-logo.png"
         )
-        embed.timestamp = ctx.message.created_at
+        embed.timestamp = datetime.datetime.utcnow()
 
         await ctx.send(embed=embed)
 
-    @cog_ext.cog_slash(name="skyblocknews")
+    @cog_ext.cog_slash(
+        name="skyblocknews", description="Get current news for skyblock."
+    )
     async def slash_skyblocknews(self, ctx):
         """Get current news for skyblock."""
-        key = "hypixel_news"
-        if await self.bot.redis.exists(key):
-            data = pickle.loads(await self.bot.redis.get(key))  # noqa: S301
-        else:
-            data = await self.hypixel.news()
-            await self.bot.redis.set(key, pickle.dumps(data), px=3600)  # noqa: S301
+        data = await self.service.news()
         embed = discord.Embed(
             title=_("Skyblock News"),
             description=_("There are currently {lendata} news articles.").format(
@@ -134,12 +148,13 @@ class Hypixel(commands.Cog):
                 value=f"[{data[i].text}]({data[i].link})",
             )
 
-        embed.timestamp = ctx.message.created_at
+        embed.timestamp = datetime.datetime.utcnow()
 
         await ctx.send(embed=embed)
 
     @cog_ext.cog_slash(
         name="playerstatus",
+        description="Get the current status of an online player.",
         options=[
             create_option(
                 name="username",
@@ -155,21 +170,16 @@ class Hypixel(commands.Cog):
         player_data = await self.bot.mojang_player(ctx.author, username)
         uuid = player_data["uuid"]
 
-        key = f"hypixel_playerstatus{uuid}"
-        if await self.bot.redis.exists(key):
-            data = pickle.loads(await self.bot.redis.get(key))  # noqa: S301
-        else:
-            data = await self.hypixel.player_status(uuid)
-            await self.bot.redis.set(key, pickle.dumps(data), px=60)  # noqa: S301
+        data = await self.service.player_status(uuid)
 
-        if data.online is False:
-            await ctx.send("That player is not currently online.")
+        if data is None or data.online is False:
+            await ctx.send(_("That player is not currently online."))
             return
         else:
             embed = discord.Embed(
                 title=_("Player Status"),
                 description=_("Current status of Player {username}").format(
-                    username=username
+                    username=player_data["username"]
                 ),
                 colour=self.bot.color,
             )
@@ -182,18 +192,19 @@ class Hypixel(commands.Cog):
 
             embed.add_field(
                 name=_("Current game: "),
-                value=_("{gamename}").format(gamename=data.game_type.CleanName),
+                value=_("{gamename}").format(gamename=data.game_type.clean_name),
             )
             embed.add_field(
                 name=_("Current game mode: "), value=_("{mode}").format(mode=data.mode)
             )
 
-            embed.timestamp = ctx.message.created_at
+            embed.timestamp = datetime.datetime.utcnow()
 
         await ctx.send(embed=embed)
 
     @cog_ext.cog_slash(
         name="playerfriends",
+        description="Get the current friends of a player.",
         options=[
             create_option(
                 name="username",
@@ -209,16 +220,13 @@ class Hypixel(commands.Cog):
         player_data = await self.bot.mojang_player(ctx.author, username)
         uuid = player_data["uuid"]
 
-        key = f"hypixel_playerfriends{uuid}"
-        if await self.bot.redis.exists(key):
-            data = pickle.loads(await self.bot.redis.get(key))  # noqa: S301
-        else:
-            data = await self.hypixel.player_friends(uuid)
-            await self.bot.redis.set(key, pickle.dumps(data), px=3600)  # noqa: S301
+        data = await self.service.player_friends(uuid)
 
         embed = discord.Embed(
             title=_("Player Friends"),
-            description=_("Current Friends for {username}").format(username=username),
+            description=_("Current Friends for {username}").format(
+                username=player_data["username"]
+            ),
             colour=self.bot.color,
         )
         embed.set_author(
@@ -227,24 +235,23 @@ class Hypixel(commands.Cog):
             icon_url="https://hypixel.net/favicon-32x32.png",
         )
         embed.set_thumbnail(url=f"https://visage.surgeplay.com/bust/{uuid}")
-        embed.timestamp = ctx.message.created_at
-
+        embed.timestamp = datetime.datetime.utcnow()
+
+        # embeds hold at most 25 fields
+        data = (data or [])[:25]
+        friends = [
+            data[i].uuid_sender
+            if str(data[i].uuid_receiver) == str(uuid)
+            else data[i].uuid_receiver
+            for i in range(len(data))
+        ]
+        usernames = await self.bot.resolve_uuids(friends)
         for i in range(len(data)):
-            if str(data[i].uuid_receiver) == str(uuid):
-                friendusername = await self.bot.mojang_player(
-                    ctx.author, data[i].uuid_sender
-                )
-            else:
-                friendusername = await self.bot.mojang_player(
-                    ctx.author, data[i].uuid_receiver
-                )
-
-            friendusername = friendusername["username"]
+            friendusername = usernames.get(str(friends[i]), str(friends[i]))
 
             delta = datetime.datetime.now(tz=datetime.timezone.utc) - data[i].started
             friendstarted = humanize_timedelta(timedelta=delta)
-            friendstartedsplit = friendstarted.split(", ")
-            friendstarted = friendstartedsplit[0] + ", " + friendstartedsplit[1]
+            friendstarted = ", ".join(friendstarted.split(", ")[:2])
 
             embed.add_field(
                 name=friendusername,
@@ -262,11 +269,12 @@ class Hypixel(commands.Cog):
 
     #     menu = PaginatedMenu(ctx)
     #     key = "hypixel_bazaar"
-    #     if await self.bot.redis.exists(key):
-    #         data = pickle.loads(await self.bot.redis.get(key))  # noqa: S301
-    #     else:
-    #         data = await self.hypixel.bazaar()
-    #         await self.bot.redis.set(key, pickle.dumps(data), px=60)  # noqa: S301
+    #     data = await self.service.cache.get_or_fetch(
+    #         key,
+    #         BAZAAR,
+    #         partial(self.service.request, self.service.hypixel.bazaar),
+    #         px=BAZAAR_PX,
+    #     )
     #     split = list(divide_array(data.bazaar_items, 15))
     #     pagesend = []
 
@@ -313,11 +321,12 @@ class Hypixel(commands.Cog):
 
     #     await ctx.channel.trigger_typing()
     #     key = "hypixel_auctions"
-    #     if await self.bot.redis.exists(key):
-    #         data = pickle.loads(await self.bot.redis.get(key))  # noqa: S301
-    #     else:
-    #         data = await self.hypixel.auctions()
-    #         await self.bot.redis.set(key, pickle.dumps(data), px=30)  # noqa: S301
+    #     data = await self.service.cache.get_or_fetch(
+    #         key,
+    #         AUCTIONS,
+    #         partial(self.service.request, self.service.hypixel.auctions),
+    #         px=AUCTIONS_PX,
+    #     )
     #     menu = PaginatedMenu(ctx)
     #     split = list(divide_array(data.auctions, 9))
     #     auctionitems = split[:3]
@@ -370,16 +379,24 @@ class Hypixel(commands.Cog):
     #     await ctx.defer()
     #     await self.auctions(ctx)
 
-    @cog_ext.cog_slash(name="guild")
-    async def slash_guild(self, ctx, guildname=None):
+    @cog_ext.cog_slash(
+        name="guild",
+        description="Get guild info by guild name.",
+        options=[
+            create_option(
+                name="guildname",
+                description="Name of the guild.",
+                option_type=3,
+                required=True,
+            )
+        ],
+    )
+    async def slash_guild(self, ctx, guildname):
         """Get's guild info by guild name."""
         await ctx.defer()
-        key = f"hypixel_guild_{guildname}"
-        if await self.bot.redis.exists(key):
-            data = pickle.loads(await self.bot.redis.get(key))  # noqa: S301
-        else:
-            data = await self.hypixel.guild_by_name(guildname)
-            await self.bot.redis.set(key, pickle.dumps(data), px=3600)  # noqa: S301
+        data = await self.service.guild_by_name(guildname)
+        if data is None:
+            raise NotFoundError("guild", guildname)
 
         embed = discord.Embed(
             title=_("Guild Info"),
@@ -410,14 +427,21 @@ class Hypixel(commands.Cog):
     #     await ctx.channel.trigger_typing()
 
     #     key = "hypixel_leaderboards"
-    #     if await self.bot.redis.exists(key):
-    #         data = pickle.loads(await self.bot.redis.get(key))  # noqa: S301
-    #     else:
-    #         data = await self.hypixel.leaderboards()
-    #         await self.bot.redis.set(key, pickle.dumps(data), px=3600)  # noqa: S301
+    #     data = await self.service.cache.get_or_fetch(
+    #         key,
+    #         LEADERBOARDS,
+    #         partial(self.service.request, self.service.hypixel.leaderboards),
+    #         px=LEADERBOARDS_PX,
+    #     )
     #     menu = PaginatedMenu(ctx)
     #     pagesend = []
     #     pagenumber = 1
+    #     usernames = await self.bot.resolve_uuids(
+    #         leader
+    #         for boards in data.values()
+    #         if boards
+    #         for leader in boards[0].leaders
+    #     )
 
     #     for i in data:
     #         if data[i]:
@@ -438,11 +462,8 @@ class Hypixel(commands.Cog):
     #             )
     #             leaderstring = ""
 
-    #             for leader in range(len(data[i][0].leaders)):
-    #                 player_data = await self.bot.mojang_player(
-    #                     ctx.author, data[i][0].leaders[leader]
-    #                 )
-    #                 username = player_data["username"]
+    #             for leader in data[i][0].leaders:
+    #                 username = usernames.get(str(leader), str(leader))
     #                 leaderstring += f"{username} \n"
     #             pageleader.add_field(
     #                 name=_("Top {leader} Leaderboard").format(leader=data[i][0].title),
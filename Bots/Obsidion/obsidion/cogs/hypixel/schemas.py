@@ -0,0 +1,35 @@
+"""Cache schemas of the Hypixel API models."""
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from asyncpixel.models import Auction
+from asyncpixel.models import Bazaar
+from asyncpixel.models import Boosters
+from asyncpixel.models import Friend
+from asyncpixel.models import GameType
+from asyncpixel.models import Guild
+from asyncpixel.models import Leaderboards
+from asyncpixel.models import News
+from asyncpixel.models import Status
+from asyncpixel.models import WatchDog
+from obsidion.core.serialization import Schema
+
+# The game type validators of asyncpixel look game types up by id for
+# boosters and by name for statuses, so they are stored that way.
+WATCHDOG: Schema[WatchDog] = Schema("watchdog", WatchDog)
+BOOSTERS: Schema[Boosters] = Schema(
+    "boosters", Boosters, encoders={GameType: lambda game: game.id}
+)
+PLAYER_COUNT: Schema[int] = Schema("player_count", int)
+NEWS: Schema[List[News]] = Schema("news", List[News])
+STATUS: Schema[Optional[Status]] = Schema(
+    "status", Optional[Status], encoders={GameType: lambda game: game.type_name}
+)
+FRIENDS: Schema[Optional[List[Friend]]] = Schema("friends", Optional[List[Friend]])
+GUILD: Schema[Optional[Guild]] = Schema("guild", Optional[Guild])
+BAZAAR: Schema[Bazaar] = Schema("bazaar", Bazaar)
+AUCTIONS: Schema[Auction] = Schema("auctions", Auction)
+LEADERBOARDS: Schema[Dict[str, List[Leaderboards]]] = Schema(
+    "leaderboards", Dict[str, List[Leaderboards]]
+)
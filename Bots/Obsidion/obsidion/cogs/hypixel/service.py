@@ -0,0 +1,226 @@
+"""Cached and batched access to the Hypixel API."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from functools import partial
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Generic
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import TYPE_CHECKING
+from typing import TypeVar
+
+from asyncpixel import Hypixel
+from asyncpixel.models import Boosters
+from asyncpixel.models import Friend
+from asyncpixel.models import Guild
+from asyncpixel.models import News
+from asyncpixel.models import Status
+from asyncpixel.models import WatchDog
+from obsidion.core import get_settings
+from obsidion.core.serialization import ModelCache
+from obsidion.core.serialization import Schema
+
+from .schemas import BOOSTERS
+from .schemas import FRIENDS
+from .schemas import GUILD
+from .schemas import NEWS
+from .schemas import PLAYER_COUNT
+from .schemas import STATUS
+from .schemas import WATCHDOG
+
+if TYPE_CHECKING:
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Milliseconds to cache each kind of data for.
+STATUS_PX = 60 * 1000
+PLAYER_COUNT_PX = 60 * 1000
+FRIENDS_PX = 60 * 60 * 1000
+GUILD_PX = 60 * 60 * 1000
+WATCHDOG_PX = 60 * 60 * 1000
+BOOSTERS_PX = 60 * 60 * 1000
+NEWS_PX = 60 * 60 * 1000
+BAZAAR_PX = 60 * 1000
+AUCTIONS_PX = 30 * 1000
+LEADERBOARDS_PX = 60 * 60 * 1000
+
+# Seconds to collect player lookups for before they are made together.
+BATCH_WINDOW = 0.05
+
+
+class PlayerBatcher(Generic[T]):
+    """Collect lookups of players and make them together.
+
+    Lookups arriving within :data:`BATCH_WINDOW` of each other are checked
+    against the cache in one round trip, and a player looked up several times
+    is only fetched once. Lookups of a player already being fetched wait for
+    that fetch instead of starting another.
+    """
+
+    def __init__(
+        self,
+        cache: ModelCache,
+        schema: Schema[T],
+        fetch: Callable[[str], Awaitable[T]],
+        px: int,
+    ) -> None:
+        self._cache = cache
+        self._schema = schema
+        self._fetch = fetch
+        self._px = px
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        # flushes still running, so their tasks are not garbage collected
+        self._flushes: Set[asyncio.Task] = set()
+
+    def key(self, uuid: str) -> str:
+        """Get the cache key of a player."""
+        return f"hypixel_{self._schema.name}_{uuid}"
+
+    async def get(self, uuid: str) -> T:
+        """Look up a player by uuid."""
+        future = self._inflight.get(uuid) or self._pending.get(uuid)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[uuid] = future
+            if self._flusher is None:
+                self._flusher = asyncio.create_task(self._flush())
+                self._flushes.add(self._flusher)
+                self._flusher.add_done_callback(self._flushes.discard)
+        # one lookup being cancelled must not cancel the others
+        return await asyncio.shield(future)
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(BATCH_WINDOW)
+        batch, self._pending = self._pending, {}
+        self._flusher = None
+        self._inflight.update(batch)
+        try:
+            await self._resolve(batch)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for uuid in batch:
+                del self._inflight[uuid]
+
+    async def _resolve(self, batch: Dict[str, asyncio.Future]) -> None:
+        cached = await self._cache.get_many(
+            [self.key(uuid) for uuid in batch], self._schema
+        )
+        missing = []
+        for uuid, future in batch.items():
+            if self.key(uuid) in cached:
+                future.set_result(cached[self.key(uuid)])
+            else:
+                missing.append(uuid)
+        if not missing:
+            return
+
+        results = await asyncio.gather(
+            *(self._fetch(uuid) for uuid in missing), return_exceptions=True
+        )
+        fetched = {}
+        for uuid, result in zip(missing, results):
+            if isinstance(result, BaseException):
+                batch[uuid].set_exception(result)
+            else:
+                batch[uuid].set_result(result)
+                fetched[self.key(uuid)] = result
+        await self._cache.set_many(fetched, self._schema, self._px)
+
+
+class HypixelService:
+    """Hypixel data, cached for as long as each kind of data stays valid."""
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+        self.hypixel = Hypixel(get_settings().HYPIXEL_API_TOKEN)
+        self.cache = ModelCache(bot.redis_bytes, bot.compressor)
+        self._statuses: PlayerBatcher[Optional[Status]] = PlayerBatcher(
+            self.cache,
+            STATUS,
+            partial(self.request, self.hypixel.player_status),
+            STATUS_PX,
+        )
+        self._friends: PlayerBatcher[Optional[List[Friend]]] = PlayerBatcher(
+            self.cache,
+            FRIENDS,
+            partial(self.request, self.hypixel.player_friends),
+            FRIENDS_PX,
+        )
+
+    async def request(self, method: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Call the Hypixel API within the rate limit of our API key."""
+        await self._bot.rate_limiter.acquire(
+            "hypixel", str(get_settings().HYPIXEL_API_TOKEN)
+        )
+        return await method(*args)
+
+    async def player_status(self, uuid: str) -> Optional[Status]:
+        """Get the online status of a player."""
+        return await self._statuses.get(uuid)
+
+    async def player_friends(self, uuid: str) -> Optional[List[Friend]]:
+        """Get the friends of a player."""
+        return await self._friends.get(uuid)
+
+    async def guild_by_name(self, name: str) -> Optional[Guild]:
+        """Get a guild by its name."""
+        return await self.cache.get_or_fetch(
+            f"hypixel_guild_{name.casefold()}",
+            GUILD,
+            partial(self.request, self.hypixel.guild_by_name, name),
+            GUILD_PX,
+        )
+
+    async def watchdog_stats(self) -> WatchDog:
+        """Get the watchdog statistics."""
+        return await self.cache.get_or_fetch(
+            "hypixel_watchdog",
+            WATCHDOG,
+            partial(self.request, self.hypixel.watchdog_stats),
+            WATCHDOG_PX,
+        )
+
+    async def boosters(self) -> Boosters:
+        """Get the active boosters."""
+        return await self.cache.get_or_fetch(
+            "hypixel_boosters",
+            BOOSTERS,
+            partial(self.request, self.hypixel.boosters),
+            BOOSTERS_PX,
+        )
+
+    async def player_count(self) -> int:
+        """Get the number of players online."""
+        return await self.cache.get_or_fetch(
+            "hypixel_playercount",
+            PLAYER_COUNT,
+            partial(self.request, self.hypixel.player_count),
+            PLAYER_COUNT_PX,
+        )
+
+    async def news(self) -> List[News]:
+        """Get the skyblock news."""
+        return await self.cache.get_or_fetch(
+            "hypixel_news",
+            NEWS,
+            partial(self.request, self.hypixel.news),
+            NEWS_PX,
+        )
+
+    async def close(self) -> None:
+        """Close the connection to the Hypixel API."""
+        await self.hypixel.close()
@@ -1,12 +1,24 @@
 """Images cog."""
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import logging
+import time
+from io import BytesIO
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import TYPE_CHECKING
-from urllib.parse import quote
+from typing import Union
 
 import discord
+from aiohttp import ClientSession
+from aiohttp import web
 from discord.ext import commands
 from discord_slash import cog_ext
 from discord_slash import SlashContext
@@ -15,6 +27,15 @@ from discord_slash.utils.manage_commands import create_option
 from obsidion.core import get_settings
 from obsidion.core.i18n import cog_i18n
 from obsidion.core.i18n import Translator
+from obsidion.core.utils.chat_formatting import box
+
+from .items import find_item
+from .items import suggest_items
+from .render import RENDER_TYPES
+from .service import RenderService
+from .signs import ATLAS
+from .signs import normalise
+from .signs import render_sign
 
 if TYPE_CHECKING:
     from obsidion.core.bot import Obsidion
@@ -24,12 +45,22 @@ log = logging.getLogger(__name__)
 
 _ = Translator("Images", __file__)
 
+# Height of renders in pixels.
+RENDER_SIZE = 512
+# Milliseconds to keep generated images for.
+IMAGE_PX = 7 * 24 * 60 * 60 * 1000
+
 
 @cog_i18n(_)
 class Images(commands.Cog):
     def __init__(self, bot: Obsidion) -> None:
         """Init."""
         self.bot = bot
+        self.renderer = RenderService(bot)
+
+    def cog_unload(self) -> None:
+        """Stop the render processes."""
+        asyncio.create_task(self.renderer.close())
 
     @cog_ext.cog_slash(
         name="achievement",
@@ -62,24 +93,30 @@ class Images(commands.Cog):
         title: str,
         text: str,
     ) -> None:
-        text = text.replace(" ", "%20")
-        async with self.bot.http_session.get(
-            f"{get_settings().API_URL}/images/advancement?item={name}&tit"
-            f"le={title}&text={text}"
-        ) as resp:
-            if resp.status == 500:
-                await ctx.send(_("That item is not available."))
-                return
+        await ctx.defer()
+        item = find_item(name)
+        if item is None:
+            suggestions = suggest_items(name)
+            message = _("That item is not available.")
+            if suggestions:
+                message += " " + _("Did you mean {items}?").format(
+                    items=", ".join(f"`{item}`" for item in suggestions)
+                )
+            await ctx.send(message)
+            return
+        image = await self.api_image(
+            "advancement", {"item": item, "title": title, "text": text}
+        )
+        if image is None:
+            await ctx.send(_("That item is not available."))
+            return
         embed = self.bot.build_embed(
             title=_("Achievement created!"),
         )
-        embed.set_image(
-            url=(
-                f"{get_settings().API_URL}/images/advancement?item={name}"
-                f"&title={quote(title)}&text={quote(text)}"
-            )
+        embed.set_image(url="attachment://achievement.png")
+        await ctx.send(
+            embed=embed, file=discord.File(BytesIO(image), filename="achievement.png")
         )
-        await ctx.send(embed=embed)
 
     @cog_ext.cog_slash(
         name="sign",
@@ -115,20 +152,140 @@ class Images(commands.Cog):
         self,
         ctx: SlashContext,
         line1: str,
-        line2: str = "%20",
-        line3: str = "%20",
-        line4: str = "%20",
+        line2: str = " ",
+        line3: str = " ",
+        line4: str = " ",
     ) -> None:
+        await ctx.defer()
+        image = await self.sign_image((line1, line2, line3, line4))
+        if image is None:
+            await ctx.send(_("That sign could not be created."))
+            return
         embed = self.bot.build_embed(
             title=_("Sign created!"),
         )
-        embed.set_image(
-            url=(
-                f"{get_settings().API_URL}/images/sign?line1={quote(line1)}"
-                f"&line2={quote(line2)}&line3={quote(line3)}&line4={quote(line4)}"
-            )
+        embed.set_image(url="attachment://sign.png")
+        await ctx.send(
+            embed=embed, file=discord.File(BytesIO(image), filename="sign.png")
         )
-        await ctx.send(embed=embed)
+
+    async def sign_image(self, lines: Tuple[str, ...]) -> Optional[bytes]:
+        """Render a sign in a worker thread.
+
+        Text with characters missing from the font is rendered by the API.
+
+        Args:
+            lines (Tuple[str, ...]): text of each line
+
+        Returns:
+            Optional[bytes]: PNG of the sign, None if the API could not create it
+        """
+        if not ATLAS.supports("".join(lines)):
+            return await self.api_image(
+                "sign",
+                {f"line{row}": line for row, line in enumerate(lines, start=1)},
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, render_sign, normalise(lines))
+
+    @commands.command()
+    @commands.is_owner()
+    async def signbench(
+        self, ctx: commands.Context, rounds: int = 200, concurrency: int = 10
+    ) -> None:
+        """Compare rendering signs locally against fetching them over HTTP.
+
+        The HTTP path is served by a local stand-in which returns a prerendered
+        sign, so it measures the cost of the request alone.
+        """
+        sample = render_sign(normalise(("Obsidion", "sign", "benchmark", "")))
+
+        async def handler(request: web.Request) -> web.Response:
+            return web.Response(body=sample, content_type="image/png")
+
+        app = web.Application()
+        app.router.add_get("/images/sign", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = runner.addresses[0][:2]
+        url = f"http://{host}:{port}/images/sign"
+
+        async def run(
+            name: str, request: Callable[[int], Awaitable[Optional[bytes]]]
+        ) -> str:
+            latencies: List[float] = []
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def timed(index: int) -> None:
+                async with semaphore:
+                    start = time.perf_counter()
+                    await request(index)
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(timed(index) for index in range(rounds)))
+            elapsed = time.perf_counter() - start
+            latencies.sort()
+            return (
+                f"{name}: p50 {latencies[len(latencies) // 2] * 1000:.2f}ms, "
+                f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms, "
+                f"{rounds / elapsed:.0f}/s"
+            )
+
+        try:
+            async with ClientSession() as session:
+
+                async def fetch(index: int) -> bytes:
+                    params = {"line1": str(index), "line2": "sign"}
+                    async with session.get(url, params=params) as resp:
+                        return await resp.read()
+
+                render_sign.cache_clear()
+                lines = [
+                    await run("http", fetch),
+                    await run(
+                        "local",
+                        lambda index: self.sign_image((str(index), "sign")),
+                    ),
+                    await run(
+                        "local cached",
+                        lambda index: self.sign_image((str(index), "sign")),
+                    ),
+                ]
+        finally:
+            await runner.cleanup()
+        await ctx.send(box("\n".join(lines), "yaml"))
+
+    async def api_image(self, endpoint: str, params: Dict[str, str]) -> Optional[bytes]:
+        """Get an image generated by the API, cached by its parameters.
+
+        Args:
+            endpoint (str): name of the image endpoint
+            params (Dict[str, str]): query parameters
+
+        Returns:
+            Optional[bytes]: the image, None if the API could not create it
+        """
+        digest = hashlib.sha256(
+            json.dumps([endpoint, params], sort_keys=True).encode()
+        ).hexdigest()
+        key = f"image_{endpoint}_{digest}"
+        image = await self.bot.redis_bytes.get(key)
+        if image is not None:
+            return image
+        async with self.bot.http_clients.request(
+            "GET",
+            f"{get_settings().API_URL}/images/{endpoint}",
+            upstream="api",
+            params=params,
+        ) as resp:
+            if resp.status != 200:
+                return None
+            image = await resp.read()
+        await self.bot.redis_bytes.set(key, image, px=IMAGE_PX)
+        return image
 
     @cog_ext.cog_slash(
         name="avatar",
@@ -143,11 +300,7 @@ class Images(commands.Cog):
         ],
     )
     async def avatar(self, ctx: SlashContext, username: str = None) -> None:
-        embed = await self.build_render(ctx.author, ctx.guild, "face", username)
-        if isinstance(embed, str):
-            await ctx.send(embed)
-        else:
-            await ctx.send(embed=embed)
+        await self.send_render(ctx, "face", username)
 
     @cog_ext.cog_slash(
         name="skull",
@@ -162,11 +315,7 @@ class Images(commands.Cog):
         ],
     )
     async def skull(self, ctx: SlashContext, username: str = None) -> None:
-        embed = await self.build_render(ctx.author, ctx.guild, "head", username)
-        if isinstance(embed, str):
-            await ctx.send(embed)
-        else:
-            await ctx.send(embed=embed)
+        await self.send_render(ctx, "head", username)
 
     @cog_ext.cog_slash(
         name="skin",
@@ -181,11 +330,7 @@ class Images(commands.Cog):
         ],
     )
     async def skin(self, ctx: SlashContext, username: str = None) -> None:
-        embed = await self.build_render(ctx.author, ctx.guild, "full", username)
-        if isinstance(embed, str):
-            await ctx.send(embed)
-        else:
-            await ctx.send(embed=embed)
+        await self.send_render(ctx, "full", username)
 
     @cog_ext.cog_slash(
         name="bust",
@@ -200,40 +345,45 @@ class Images(commands.Cog):
         ],
     )
     async def bust(self, ctx: SlashContext, username: str = None) -> None:
-        embed = await self.build_render(ctx.author, ctx.guild, "bust", username)
-        if isinstance(embed, str):
-            await ctx.send(embed)
-        else:
-            await ctx.send(embed=embed)
+        await self.send_render(ctx, "bust", username)
 
     async def build_render(
         self,
         author: discord.User,
-        guild: discord.Guild,
         render_type: str,
         username: Optional[str] = None,
-    ):
-        renders = ["face", "front", "frontfull", "head", "bust", "full", "skin"]
-        if render_type not in renders:
+    ) -> Union[str, Tuple[discord.Embed, discord.File]]:
+        if render_type not in RENDER_TYPES:
             return _(
                 "Please supply a render type. Your "
                 "options are:\n `face`, `front`, `full`, `head`, `bust`, "
-                "`skin` \n Type: {prefix}render <render type> <username>"
-            ).format(prefix=(await self.bot._prefix_cache.get_prefixes(guild))[0])
+                "`skin` \n Type: /render <render type> <username>"
+            )
         player_data = await self.bot.mojang_player(author, username)
-        uuid = player_data["uuid"]
         username = player_data["username"]
+        image = await self.renderer.render(player_data, render_type, RENDER_SIZE)
+        filename = f"{render_type}.png"
         embed = self.bot.build_embed(
             title=_("Render of {username}'s {render_type}").format(
                 username=username, render_type=render_type.capitalize()
             ),
-            description=_(
-                "**[DOWNLOAD](https://visage.surgeplay.com/{render_type_lower}/512/"
-                "{uuid})\n[RAW](https://visage.surgeplay.com/skin/512/{uuid})**"
-            ).format(render_type_lower=render_type, uuid=uuid),
+            description=_("**[RAW]({skin})**").format(
+                skin=player_data["textures"]["skin"]["url"]
+            ),
         )
-        embed.set_image(url=f"https://visage.surgeplay.com/{render_type}/512/{uuid}")
-        return embed
+        embed.set_image(url=f"attachment://{filename}")
+        return embed, discord.File(BytesIO(image), filename=filename)
+
+    async def send_render(
+        self, ctx: SlashContext, render_type: str, username: Optional[str]
+    ) -> None:
+        await ctx.defer()
+        render = await self.build_render(ctx.author, render_type, username)
+        if isinstance(render, str):
+            await ctx.send(render)
+        else:
+            embed, file = render
+            await ctx.send(embed=embed, file=file)
 
     @cog_ext.cog_slash(
         name="render",
@@ -264,8 +414,4 @@ class Images(commands.Cog):
     async def render(
         self, ctx: SlashContext, render_type: str, username: str = None
     ) -> None:
-        embed = await self.build_render(ctx.author, ctx.guild, render_type, username)
-        if isinstance(embed, str):
-            await ctx.send(embed)
-        else:
-            await ctx.send(embed=embed)
+        await self.send_render(ctx, render_type, username)
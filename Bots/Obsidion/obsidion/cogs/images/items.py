@@ -0,0 +1,43 @@
+"""Index of Minecraft items."""
+import json
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from fuzzywuzzy import fuzz
+from fuzzywuzzy import process
+
+with open(Path(__file__).parent / "resources" / "items.json") as f:
+    ITEMS: Dict[str, str] = json.load(f)
+
+# Item ids by case folded id and display name.
+_INDEX = {
+    **{name.casefold(): item for item, name in ITEMS.items()},
+    **{item: item for item in ITEMS},
+}
+
+
+def find_item(query: str) -> Optional[str]:
+    """Get the id of an item by id or display name.
+
+    Args:
+        query (str): id such as ``minecraft:diamond_sword`` or
+            ``diamond_sword``, or display name such as ``Diamond Sword``
+
+    Returns:
+        Optional[str]: id of the item without namespace, None if there is no
+            such item
+    """
+    query = query.strip().casefold()
+    if query.startswith("minecraft:"):
+        query = query[len("minecraft:") :]
+    return _INDEX.get(query) or _INDEX.get(query.replace(" ", "_"))
+
+
+def suggest_items(query: str, limit: int = 3) -> List[str]:
+    """Get the display names of the items closest to a query."""
+    result = process.extractBests(
+        query, list(ITEMS.values()), scorer=fuzz.ratio, score_cutoff=60, limit=limit
+    )
+    return [name for name, score in result]
@@ -0,0 +1,296 @@
+"""Render Minecraft skins.
+
+Everything in here runs in a worker process, so it only takes and returns
+plain bytes.
+"""
+from io import BytesIO
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+# Pillow 9.1 moved these constants into enums, older versions only have them
+# on the module.
+NEAREST = getattr(Image, "Resampling", Image).NEAREST
+AFFINE = getattr(Image, "Transform", Image).AFFINE
+
+RENDER_TYPES = ["face", "front", "frontfull", "head", "bust", "full", "skin"]
+
+# A cuboid of a player model: texture origin of the base layer, texture
+# origin of the overlay layer, size (width, height, depth) in pixels and
+# position (x, y, z) of its corner nearest to the origin in the model, with
+# x to the viewer's right, y up and z towards the viewer.
+Part = Tuple[Tuple[int, int], Tuple[int, int], Tuple[int, int, int], Tuple[int, ...]]
+
+PARTS: Dict[str, Part] = {
+    "head": ((0, 0), (32, 0), (8, 8, 8), (-4, 24, -4)),
+    "body": ((16, 16), (16, 32), (8, 12, 4), (-4, 12, -2)),
+    "right_arm": ((40, 16), (40, 32), (4, 12, 4), (-8, 12, -2)),
+    "left_arm": ((32, 48), (48, 48), (4, 12, 4), (4, 12, -2)),
+    "right_leg": ((0, 16), (0, 32), (4, 12, 4), (-4, 0, -2)),
+    "left_leg": ((16, 48), (0, 48), (4, 12, 4), (0, 0, -2)),
+}
+
+# Parts in each render and the lowest model height shown.
+RENDERS = {
+    "face": (["head"], 24),
+    "head": (["head"], 24),
+    "front": (list(PARTS), 12),
+    "bust": (list(PARTS), 12),
+    "frontfull": (list(PARTS), 0),
+    "full": (list(PARTS), 0),
+}
+
+# Overlays are drawn this much larger than the base layer, in model pixels.
+OVERLAY_INFLATE = 0.5
+
+# Brightness of the faces of 3d renders.
+SHADE = {"top": 1.0, "front": 0.9, "side": 0.75}
+
+
+def part_shape(name: str, slim: bool) -> Part:
+    """Get the layout of a part, arms are a pixel thinner on slim models."""
+    base, overlay, (width, height, depth), position = PARTS[name]
+    if slim and name.endswith("_arm"):
+        width = 3
+        if name == "right_arm":
+            position = (position[0] + 1, *position[1:])
+    return base, overlay, (width, height, depth), position
+
+
+def face_region(
+    origin: Tuple[int, int], size: Tuple[int, int, int], face: str
+) -> Tuple[int, int, int, int]:
+    """Get the texture region (x, y, width, height) of a face of a cuboid."""
+    x, y = origin
+    width, height, depth = size
+    return {
+        "top": (x + depth, y, width, depth),
+        "bottom": (x + depth + width, y, width, depth),
+        "right": (x, y + depth, depth, height),
+        "front": (x + depth, y + depth, width, height),
+        "left": (x + depth + width, y + depth, depth, height),
+        "back": (x + 2 * depth + width, y + depth, width, height),
+    }[face]
+
+
+def load_skin(data: bytes) -> np.ndarray:
+    """Load a skin as a 64x64 RGBA array in skin pixels.
+
+    HD skins are scaled down and legacy 64x32 skins get their left limbs by
+    mirroring the right ones, like the game does.
+
+    >>> legacy = Image.new("RGBA", (64, 32))
+    >>> legacy.putpixel((44, 20), (255, 0, 0, 255))  # front of the right arm
+    >>> data = BytesIO()
+    >>> legacy.save(data, "PNG")
+    >>> skin = load_skin(data.getvalue())
+    >>> skin.shape, skin[52, 39].tolist()  # mirrored onto the left arm
+    ((64, 64, 4), [255, 0, 0, 255])
+    """
+    image = Image.open(BytesIO(data)).convert("RGBA")
+    scale = image.width // 64
+    if scale > 1:
+        image = image.resize((64, image.height // scale), NEAREST)
+    skin = np.zeros((64, 64, 4), dtype=np.uint8)
+    pixels = np.asarray(image)
+    skin[: pixels.shape[0]] = pixels[:64]
+    if pixels.shape[0] == 32:
+        for right, left in (("right_arm", "left_arm"), ("right_leg", "left_leg")):
+            size = PARTS[right][2]
+            for face, mirrored in (
+                ("top", "top"),
+                ("bottom", "bottom"),
+                ("front", "front"),
+                ("back", "back"),
+                ("right", "left"),
+                ("left", "right"),
+            ):
+                sx, sy, w, h = face_region(PARTS[right][0], size, face)
+                dx, dy, _, _ = face_region(PARTS[left][0], size, mirrored)
+                skin[dy : dy + h, dx : dx + w] = skin[sy : sy + h, sx : sx + w, :][
+                    :, ::-1
+                ]
+    return skin
+
+
+def texture(skin: np.ndarray, region: Tuple[int, int, int, int]) -> np.ndarray:
+    """Cut a region out of a skin."""
+    x, y, width, height = region
+    return skin[y : y + height, x : x + width]
+
+
+def over(bottom: np.ndarray, top: np.ndarray) -> np.ndarray:
+    """Composite two RGBA arrays of the same shape, pixels are on or off."""
+    return np.where(top[..., 3:4] >= 128, top, bottom)
+
+
+def render_flat(
+    skin: np.ndarray, parts: List[str], bottom: int, slim: bool
+) -> Image.Image:
+    """Render the front of a model without perspective."""
+    canvas = np.zeros((32 - bottom, 16, 4), dtype=np.uint8)
+    for name in parts:
+        base, overlay, size, (x, y, _) = part_shape(name, slim)
+        height = size[1]
+        top = 32 - (y + height)
+        if top >= canvas.shape[0]:
+            continue
+        for origin in (base, overlay):
+            face = texture(skin, face_region(origin, size, "front"))
+            face = face[: canvas.shape[0] - top]
+            region = canvas[top : top + face.shape[0], x + 8 : x + 8 + size[0]]
+            region[:] = over(region, face)
+    return Image.fromarray(canvas, "RGBA")
+
+
+def project(x: float, y: float, z: float) -> Tuple[float, float]:
+    """Project a point of the model onto the screen, isometrically."""
+    return (x - z) * 0.8660254, (x + z) * 0.5 - y
+
+
+def cuboid_faces(
+    skin: np.ndarray, origin: Tuple[int, int], size: Tuple[int, int, int], corner
+) -> List[Tuple[str, np.ndarray, List[Tuple[float, float]]]]:
+    """Get the visible faces of a cuboid with the screen points of three corners.
+
+    The points are where the top left, top right and bottom left corners of
+    the face texture end up.
+    """
+    width, height, depth = size
+    x0, y0, z0, x1, y1, z1 = corner
+    faces = []
+    top = texture(skin, face_region(origin, (width, height, depth), "top"))
+    faces.append(("top", top, [(x0, y1, z0), (x1, y1, z0), (x0, y1, z1)]))
+    front = texture(skin, face_region(origin, (width, height, depth), "front"))
+    faces.append(("front", front, [(x0, y1, z1), (x1, y1, z1), (x0, y0, z1)]))
+    side = texture(skin, face_region(origin, (width, height, depth), "left"))
+    faces.append(("side", side, [(x1, y1, z1), (x1, y1, z0), (x1, y0, z1)]))
+    return [
+        (name, pixels, [project(*point) for point in points])
+        for name, pixels, points in faces
+    ]
+
+
+def render_iso(
+    skin: np.ndarray, parts: List[str], bottom: int, slim: bool, size: int
+) -> Image.Image:
+    """Render a model isometrically, seen from the front right and above."""
+    faces: List[Tuple[float, str, np.ndarray, List[Tuple[float, float]]]] = []
+    for name in parts:
+        base, overlay, shape, (x, y, z) = part_shape(name, slim)
+        width, height, depth = shape
+        if y + height <= bottom:
+            continue
+        for origin, inflate in ((base, 0.0), (overlay, OVERLAY_INFLATE)):
+            corner = (
+                x - inflate,
+                y - inflate,
+                z - inflate,
+                x + width + inflate,
+                y + height + inflate,
+                z + depth + inflate,
+            )
+            # parts further from the viewer are drawn first
+            depth_key = (x + width / 2) + (y + height / 2) + (z + depth / 2)
+            faces.extend(
+                (depth_key + inflate, *face)
+                for face in cuboid_faces(skin, origin, shape, corner)
+            )
+
+    points = np.array([point for face in faces for point in face[3]])
+    # the fourth corner of each face is the sum of its edges
+    corners = np.concatenate(
+        [
+            points,
+            np.array([np.add(face[3][1], face[3][2]) - face[3][0] for face in faces]),
+        ]
+    )
+    low = corners.min(axis=0)
+    extent = corners.max(axis=0) - low
+    scale = (size - 2) / extent.max()
+    canvas_width, canvas_height = (int(v) for v in np.ceil(extent * scale) + 2)
+    canvas_size = (canvas_width, canvas_height)
+    canvas = Image.new("RGBA", canvas_size)
+
+    for _, face, pixels, screen in sorted(faces, key=lambda face: face[0]):
+        if pixels.size == 0:
+            continue
+        shaded = pixels.astype(np.float32)
+        shaded[..., :3] *= SHADE[face]
+        image = Image.fromarray(shaded.astype(np.uint8), "RGBA")
+        (ox, oy), (rx, ry), (bx, by) = [
+            ((np.array(point) - low) * scale + 1) for point in screen
+        ]
+        # maps texture pixels onto the screen, inverted for PIL
+        forward = np.array(
+            [
+                [(rx - ox) / image.width, (bx - ox) / image.height, ox],
+                [(ry - oy) / image.width, (by - oy) / image.height, oy],
+                [0, 0, 1],
+            ]
+        )
+        inverse = np.linalg.inv(forward)
+        layer = image.transform(
+            canvas_size,
+            AFFINE,
+            tuple(inverse[:2].flatten()),
+            resample=NEAREST,
+        )
+        canvas.alpha_composite(layer)
+    return canvas
+
+
+def render(data: bytes, render_type: str, size: int, slim: bool) -> bytes:
+    """Render a skin.
+
+    >>> skin = BytesIO()
+    >>> Image.new("RGBA", (64, 64), (120, 80, 40, 255)).save(skin, "PNG")
+    >>> for render_type in RENDER_TYPES:
+    ...     image = Image.open(BytesIO(render(skin.getvalue(), render_type, 128, True)))
+    ...     print(render_type, image.size)
+    face (128, 128)
+    front (96, 120)
+    frontfull (64, 128)
+    head (112, 128)
+    bust (74, 128)
+    full (56, 128)
+    skin (128, 128)
+
+    Args:
+        data (bytes): PNG of the skin
+        render_type (str): one of :data:`RENDER_TYPES`
+        size (int): height of the render in pixels
+        slim (bool): whether the skin uses the slim arm model
+
+    Returns:
+        bytes: PNG of the render
+    """
+    if render_type not in RENDER_TYPES:
+        raise ValueError(f"Unknown render type {render_type}")
+    skin = load_skin(data)
+    if render_type == "skin":
+        image = Image.fromarray(skin, "RGBA")
+        image = image.resize((size, size), NEAREST)
+    elif render_type in ("face", "front", "frontfull"):
+        parts, bottom = RENDERS[render_type]
+        if render_type == "face":
+            image = Image.fromarray(
+                over(
+                    texture(skin, face_region((0, 0), (8, 8, 8), "front")),
+                    texture(skin, face_region((32, 0), (8, 8, 8), "front")),
+                ),
+                "RGBA",
+            )
+        else:
+            image = render_flat(skin, parts, bottom, slim)
+        scale = max(size // image.height, 1)
+        image = image.resize((image.width * scale, image.height * scale), NEAREST)
+    else:
+        parts, bottom = RENDERS[render_type]
+        image = render_iso(skin, parts, bottom, slim, size)
+    output = BytesIO()
+    image.save(output, "PNG", optimize=True)
+    return output.getvalue()
@@ -0,0 +1,108 @@
+"""Skin rendering with cached skins and renders."""
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from typing import Dict
+from typing import TYPE_CHECKING
+
+from . import render
+
+if TYPE_CHECKING:
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+# Milliseconds to keep skins and renders for. Both are keyed by the hash of
+# the skin, so they never go stale, they only have to make room.
+SKIN_PX = 30 * 24 * 60 * 60 * 1000
+RENDER_PX = 7 * 24 * 60 * 60 * 1000
+RENDER_WORKERS = 2
+
+
+class RenderService:
+    """Render skins locally in a process pool.
+
+    Skins are stored under ``skin_{hash}`` and renders under
+    ``render_{hash}_{type}_{size}``, where the hash is the texture id Mojang
+    gives the skin, a hash of the image itself.
+    """
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+        self._pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def render(
+        self, profile: Dict[str, Any], render_type: str, size: int
+    ) -> bytes:
+        """Render the skin of a player.
+
+        Args:
+            profile (Dict[str, Any]): profile of the player from ashcon
+            render_type (str): one of :data:`render.RENDER_TYPES`
+            size (int): height of the render in pixels
+
+        Returns:
+            bytes: PNG of the render
+        """
+        textures = profile["textures"]
+        url = textures["skin"]["url"]
+        skin_hash = url.rstrip("/").rsplit("/", 1)[-1]
+        slim = bool(textures.get("slim", False))
+        key = f"render_{skin_hash}_{render_type}_{size}"
+        if slim:
+            key += "_slim"
+        # identical renders requested at the same time are only made once
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._render(key, skin_hash, textures, render_type, size, slim)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def skin(self, skin_hash: str, textures: Dict[str, Any]) -> bytes:
+        """Get the PNG of a skin, fetching it only if it is not stored yet."""
+        key = f"skin_{skin_hash}"
+        data = await self._bot.redis_bytes.get(key)
+        if data is not None:
+            return data
+        if textures["skin"].get("data"):
+            data = base64.b64decode(textures["skin"]["data"])
+        else:
+            async with self._bot.http_clients.request(
+                "GET", textures["skin"]["url"], upstream="textures"
+            ) as resp:
+                resp.raise_for_status()
+                data = await resp.read()
+        await self._bot.redis_bytes.set(key, data, px=SKIN_PX)
+        return data
+
+    async def close(self) -> None:
+        """Stop the render processes."""
+        self._pool.shutdown(wait=False)
+
+    async def _render(
+        self,
+        key: str,
+        skin_hash: str,
+        textures: Dict[str, Any],
+        render_type: str,
+        size: int,
+        slim: bool,
+    ) -> bytes:
+        cached = await self._bot.redis_bytes.get(key)
+        if cached is not None:
+            return cached
+        data = await self.skin(skin_hash, textures)
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(
+            self._pool, render.render, data, render_type, size, slim
+        )
+        await self._bot.redis_bytes.set(key, image, px=RENDER_PX)
+        return image
@@ -0,0 +1,205 @@
+"""Render Minecraft signs.
+
+The glyphs and the sign board are rasterised once into NumPy arrays, a sign
+is then only a few array copies and a PNG encode. Text with characters
+missing from the font has to be rendered elsewhere, see
+:meth:`GlyphAtlas.supports`.
+"""
+import functools
+import logging
+from io import BytesIO
+from pathlib import Path
+from typing import Dict
+from typing import Tuple
+from typing import Union
+
+import numpy as np
+from PIL import Image
+from PIL import ImageDraw
+from PIL import ImageFont
+
+from .render import NEAREST
+
+log = logging.getLogger(__name__)
+
+RESOURCES = Path(__file__).parent / "resources"
+FONT_PAGE = RESOURCES / "font" / "ascii.png"
+SIGN_TEXTURE = RESOURCES / "signs" / "oak.png"
+# Size of the sign board in texture pixels and the factor it is scaled up by.
+BOARD_WIDTH = 96
+BOARD_HEIGHT = 48
+SCALE = 4
+LINES = 4
+LINE_HEIGHT = 11
+TEXT_TOP = 2
+# Widest a line may be, like in game longer lines are cut off.
+MAX_LINE_WIDTH = 90
+SPACE_WIDTH = 3
+TEXT_COLOUR = np.array([0, 0, 0, 255], dtype=np.uint8)
+# Number of rendered signs kept in memory.
+CACHE_SIZE = 256
+
+
+class GlyphAtlas:
+    """Every glyph of a font in a single array."""
+
+    def __init__(self, glyphs: Dict[str, np.ndarray]) -> None:
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        x = 0
+        for char, glyph in glyphs.items():
+            self.offsets[char] = (x, glyph.shape[1])
+            x += glyph.shape[1]
+        atlas = np.concatenate(list(glyphs.values()), axis=1)
+        rows = np.flatnonzero(atlas.any(axis=1))
+        self.atlas = atlas[rows[0] : rows[-1] + 1]
+        self.height = self.atlas.shape[0]
+
+    @classmethod
+    def from_font_page(cls, page: Image.Image) -> "GlyphAtlas":
+        """Load the glyphs of a Minecraft font page.
+
+        The page is a 16 by 16 grid of glyphs in code page 437 order, like
+        ``assets/minecraft/textures/font/ascii.png`` of the game.
+        """
+        alpha = np.asarray(page.convert("RGBA"))[:, :, 3] > 0
+        cell = alpha.shape[0] // 16
+        glyphs = {}
+        # the first two rows are control characters
+        for code in range(32, 256):
+            row, column = divmod(code, 16)
+            mask = alpha[
+                row * cell : (row + 1) * cell, column * cell : (column + 1) * cell
+            ]
+            columns = np.flatnonzero(mask.any(axis=0))
+            if columns.size:
+                # glyphs are drawn from the left edge of their cell
+                glyphs[bytes([code]).decode("cp437")] = mask[:, : columns[-1] + 1]
+        return cls(glyphs)
+
+    @classmethod
+    def from_font(
+        cls, font: Union[ImageFont.ImageFont, ImageFont.FreeTypeFont], cell: int = 16
+    ) -> "GlyphAtlas":
+        """Rasterise the printable ASCII glyphs of a font.
+
+        Glyphs are thresholded to single pixels to look like the Minecraft font.
+        """
+        glyphs = {}
+        for code in range(33, 127):
+            char = chr(code)
+            image = Image.new("L", (cell, cell))
+            ImageDraw.Draw(image).text((0, 0), char, font=font, fill=255)
+            mask = np.asarray(image) >= 96
+            columns = np.flatnonzero(mask.any(axis=0))
+            if columns.size:
+                glyphs[char] = mask[:, columns[0] : columns[-1] + 1]
+        return cls(glyphs)
+
+    def supports(self, text: str) -> bool:
+        """Whether every character of the text has a glyph."""
+        return all(char == " " or char in self.offsets for char in text)
+
+    def glyph(self, char: str) -> np.ndarray:
+        """Get the mask of a glyph, unknown characters render as ``?``."""
+        x, width = self.offsets.get(char, self.offsets["?"])
+        return self.atlas[:, x : x + width]
+
+    def width(self, text: str) -> int:
+        """Get the width of a line of text including spacing."""
+        return sum(
+            SPACE_WIDTH if char == " " else self.glyph(char).shape[1] + 1
+            for char in text
+        )
+
+    def fit(self, text: str, width: int) -> str:
+        """Cut text off at a width."""
+        while text and self.width(text) > width:
+            text = text[:-1]
+        return text
+
+
+def _board() -> np.ndarray:
+    """Draw an oak sign board."""
+    rng = np.random.default_rng(0)
+    palette = np.array(
+        [[155, 124, 77], [143, 113, 69], [171, 137, 84], [126, 99, 60]],
+        dtype=np.uint8,
+    )
+    # wood grain runs along the planks, so the noise is stretched horizontally
+    grain = rng.integers(0, len(palette), (BOARD_HEIGHT, BOARD_WIDTH // 4))
+    board = palette[np.repeat(grain, 4, axis=1)]
+    board[::12] = [104, 83, 50]
+    border = np.full((BOARD_HEIGHT, BOARD_WIDTH), True)
+    border[1:-1, 1:-1] = False
+    board[border] = [84, 66, 39]
+    alpha = np.full((BOARD_HEIGHT, BOARD_WIDTH, 1), 255, dtype=np.uint8)
+    return np.concatenate([board, alpha], axis=2)
+
+
+def _board_from_texture(texture: Image.Image) -> np.ndarray:
+    """Cut the front of the board out of a sign texture.
+
+    The texture is laid out like ``assets/minecraft/textures/entity/signs/oak.png``
+    of the game.
+    """
+    scale = texture.width // 64
+    front = texture.convert("RGBA").crop((2 * scale, 2 * scale, 26 * scale, 14 * scale))
+    return np.asarray(front.resize((BOARD_WIDTH, BOARD_HEIGHT), NEAREST))
+
+
+def _load() -> Tuple[GlyphAtlas, np.ndarray]:
+    """Load the game's font and sign texture, or stand-ins if not installed.
+
+    The game's assets can't be distributed with the bot, they are taken from
+    the resources folder when they have been copied there from a client jar.
+    """
+    if FONT_PAGE.exists():
+        with Image.open(FONT_PAGE) as page:
+            atlas = GlyphAtlas.from_font_page(page)
+    else:
+        log.info("%s not found, signs use Pillow's default font", FONT_PAGE)
+        atlas = GlyphAtlas.from_font(ImageFont.load_default())
+    if SIGN_TEXTURE.exists():
+        with Image.open(SIGN_TEXTURE) as texture:
+            board = _board_from_texture(texture)
+    else:
+        board = _board()
+    return atlas, board
+
+
+ATLAS, BOARD = _load()
+
+
+def normalise(lines: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Normalise the lines of a sign, signs which look the same are equal."""
+    lines = tuple(" ".join(line.split()) for line in lines[:LINES])
+    lines += ("",) * (LINES - len(lines))
+    return tuple(ATLAS.fit(line, MAX_LINE_WIDTH) for line in lines)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def render_sign(lines: Tuple[str, ...]) -> bytes:
+    """Render a sign.
+
+    Args:
+        lines (Tuple[str, ...]): lines of text as returned by :func:`normalise`
+
+    Returns:
+        bytes: PNG of the sign
+    """
+    canvas = BOARD.copy()
+    for row, line in enumerate(lines):
+        x = (BOARD_WIDTH - ATLAS.width(line)) // 2
+        y = TEXT_TOP + row * LINE_HEIGHT + (LINE_HEIGHT - ATLAS.height) // 2
+        for char in line:
+            if char == " ":
+                x += SPACE_WIDTH
+                continue
+            glyph = ATLAS.glyph(char)
+            region = canvas[y : y + glyph.shape[0], x : x + glyph.shape[1]]
+            region[glyph[: region.shape[0], : region.shape[1]]] = TEXT_COLOUR
+            x += glyph.shape[1] + 1
+    canvas = canvas.repeat(SCALE, axis=0).repeat(SCALE, axis=1)
+    output = BytesIO()
+    Image.fromarray(canvas, "RGBA").save(output, "PNG")
+    return output.getvalue()
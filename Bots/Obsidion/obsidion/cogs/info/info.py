@@ -4,8 +4,7 @@ from __future__ import annotations
 import json
 import logging
 from datetime import datetime
-from typing import Any
-from typing import Dict
+from io import BytesIO
 from typing import Optional
 from typing import Tuple
 from typing import TYPE_CHECKING
@@ -19,8 +18,11 @@ from discord_slash.utils.manage_commands import create_option
 from obsidion.core import get_settings
 from obsidion.core.errors import ProvideServerError
 from obsidion.core.errors import ServerUnavailableError
+from obsidion.core.errors import UpstreamUnavailableError
 from obsidion.core.i18n import cog_i18n
 from obsidion.core.i18n import Translator
+from obsidion.core.server_ping import parse_address
+from obsidion.core.utils.java import java_string_hash
 
 if TYPE_CHECKING:
     from obsidion.core.bot import Obsidion
@@ -54,11 +56,8 @@ class Info(commands.Cog):
             username = profile_info["username"]
         uuid: str = profile_info["uuid"]
         names = profile_info["username_history"]
-        h = 0
-        for c in uuid.replace("-", ""):
-            h = (31 * h + ord(c)) & 0xFFFFFFFF
         skin_type = "Alex"
-        if (((h + 0x80000000) & 0xFFFFFFFF) - 0x80000000) % 2 == 0:
+        if java_string_hash(uuid.replace("-", "")) % 2 == 0:
             skin_type = "Steve"
 
         name_list = ""
@@ -131,12 +130,14 @@ class Info(commands.Cog):
         await ctx.send(embed=embed)
 
     @staticmethod
-    def get_server(ip: str, port: Optional[int] = None) -> Tuple[str, Optional[int]]:
-        """Returns the server icon."""
-        if ":" in ip:  # deal with them providing port in string instead of separate
-            address, _port = ip.split(":")
-            return (address, int(_port))
-        return (ip, port)
+    def get_server(
+        ip: str, port: Optional[Union[int, str]] = None
+    ) -> Tuple[str, Optional[int]]:
+        """Split the port off an address."""
+        try:
+            return parse_address(ip, port)
+        except ValueError:
+            raise ProvideServerError()
 
     @cog_ext.cog_slash(
         name="server",
@@ -159,19 +160,13 @@ class Info(commands.Cog):
     async def server(
         self, ctx: SlashContext, address: str = None, port: int = None
     ) -> None:
+        await ctx.defer()
         if address is None and ctx.guild is not None:
             address = await self.bot._guild_cache.get_server(ctx.guild)
         if address is None:
             raise ProvideServerError()
-        if len(address.split(":")) > 2:
-            raise ProvideServerError()
         server_ip, port = self.get_server(address, port)
-        key = f"server_{server_ip}:{port}"
-        endpoint = "server/java"
-        params: Dict[str, Union[int, str]] = (
-            {"server": address} if port is None else {"server": address, "port": port}
-        )
-        data = await self.bot.get_api_json(key, endpoint, params)
+        data = await self.bot.server_pinger.java(server_ip, port)
         if data is None:
             raise ServerUnavailableError(address)
         embed = self.bot.build_embed(
@@ -191,11 +186,17 @@ class Info(commands.Cog):
                 "Java Edition \n Running: `{version}` \n" "Protocol: `{protocol}`"
             ).format(version=data["version"], protocol=data["protocol"]),
         )
+        history = await self.bot.server_history.sparkline(server_ip, port)
+        if history is not None:
+            embed.add_field(name=_("Players Today"), value=f"`{history}`", inline=False)
+        icon = None
         if data["icon"]:
-            url = f"{get_settings().API_URL}/server/javaicon?server={server_ip}"
-            if port is not None:
-                url += f"&port={port}"
-            embed.set_thumbnail(url=url)
+            icon = await self.bot.server_pinger.icon(data["icon"])
+        if icon is not None:
+            embed.set_thumbnail(url="attachment://icon.png")
+            await ctx.send(
+                embed=embed, file=discord.File(BytesIO(icon), filename="icon.png")
+            )
         else:
             embed.set_thumbnail(
                 url=(
@@ -203,7 +204,7 @@ class Info(commands.Cog):
                     "/602058959284863051/unknown.png"
                 )
             )
-        await ctx.send(embed=embed)
+            await ctx.send(embed=embed)
 
     @cog_ext.cog_slash(
         name="serverpe",
@@ -224,15 +225,9 @@ class Info(commands.Cog):
         ],
     )
     async def serverpe(self, ctx: SlashContext, address: str, port: int = None) -> None:
-        if len(address.split(":")) > 2:
-            raise ProvideServerError()
+        await ctx.defer()
         address, port = self.get_server(address, port)
-        key = f"server_{address}:{port}"
-        endpoint = "server/bedrock"
-        params: Dict[str, Union[str, int]] = (
-            {"server": address} if port is None else {"server": address, "port": port}
-        )
-        data = await self.bot.get_api_json(key, endpoint, params)
+        data = await self.bot.server_pinger.bedrock(address, port)
         if data is None:
             raise ServerUnavailableError(address)
         embed = self.bot.build_embed(
@@ -250,13 +245,13 @@ class Info(commands.Cog):
             name=_("Version"),
             value=_(
                 "Bedrock Edition \n Running: `{version}` \n" "Protocol: `{protocol}`"
-            ).format(version=data["protocol_version"], protocol=data["protocol_name"]),
+            ).format(version=data["protocol_name"], protocol=data["protocol_version"]),
             inline=False,
         )
         embed.add_field(
             name=_("Info"),
             value=_("Gamemode: `{gamemode}` \n" "Latency: `{latency}`").format(
-                version=data["gamemode"], protocol=data["latency"]
+                gamemode=data["gamemode"], latency=data["latency"]
             ),
         )
         await ctx.send(embed=embed)
@@ -266,8 +261,8 @@ class Info(commands.Cog):
     )
     async def status(self, ctx: SlashContext) -> None:
         await ctx.defer()
-        async with self.bot.http_session.get(
-            f"{get_settings().API_URL}/mojang/check"
+        async with self.bot.http_clients.request(
+            "GET", f"{get_settings().API_URL}/mojang/check", upstream="api"
         ) as resp:
             if resp.status == 200:
                 data = await resp.json()
@@ -281,16 +276,16 @@ class Info(commands.Cog):
         }
         payload = {"metricKeys": [k for (k, v) in sales_mapping.items() if v]}
 
-        if await self.bot.redis.exists("status"):
-            sales_data = json.loads(await self.bot.redis.get("status"))
+        if await self.bot.redis.exists("sales"):
+            sales_data = json.loads(await self.bot.redis.get("sales"))
         else:
             url = "https://api.mojang.com/orders/statistics"
-            async with self.bot.http_session.post(
-                url, json=payload, timeout=self.bot._long_http_timeout
+            async with self.bot.http_clients.request(
+                "POST", url, upstream="mojang", json=payload
             ) as resp:
                 if resp.status == 200:
                     sales_data = await resp.json()
-            await self.bot.redis.set("status", json.dumps(sales_data), px=600)
+            await self.bot.redis.set("sales", json.dumps(sales_data), px=600)
 
         services = ""
         for service in data:
@@ -346,7 +341,9 @@ class Info(commands.Cog):
         )
 
         payload = generate_payload(query)
-        async with self.bot.http_session.get(base_url, params=payload) as resp:
+        async with self.bot.http_clients.request(
+            "GET", base_url, upstream="fandom", params=payload
+        ) as resp:
             if resp.status == 200:
                 result = await resp.json()
             else:
@@ -464,45 +461,25 @@ class Info(commands.Cog):
     )
     async def version(self, ctx: SlashContext, version: str = None) -> None:
         await ctx.defer()
-        key = "versions"
-        if await self.bot.redis.exists(key):
-            data = json.loads(await self.bot.redis.get(key))
-        else:
-            async with self.bot.http_session.get(
-                "https://launchermeta.mojang.com/mc/game/version_manifest.json",
-                timeout=self.bot._long_http_timeout,
-            ) as resp:
-                data = await resp.json()
-            await self.bot.redis.set(key, json.dumps(data), px=600)
-        id2version = {}
-        versions: Dict[str, Any] = {}
-
-        for _version in reversed(data["versions"]):
-            id2version[_version["id"]] = _version
-            if _version["type"] == "release":
-                version_num = ".".join(_version["id"].split(".")[:2])
-                if version_num in versions:
-                    _updated = versions[version_num]
-                    _updated.append(_version)
-                    versions[version_num] = _updated
-                else:
-                    versions[version_num] = [_version]
+        index = await self.bot.versions.index()
+        if index is None:
+            raise UpstreamUnavailableError("mojang")
         embed = discord.Embed(
             colour=self.bot.color,
         )
-        format = "%Y-%m-%dT%H:%M:%S%z"
         if version is not None:
-            if version not in id2version:
+            version_data = index.get(version)
+            if version_data is None:
                 embed = self.bot.build_embed(
                     _("Error"),
                     _("Version {version} not found.").format(version=version),
                     "error",
                 )
                 await ctx.send(embed=embed)
-            version_data = id2version[version]
+                return
             embed.set_author(
                 name=_("Minecraft Java Edition {version}").format(version=version),
-                url=f"https://minecraft.fandom.com/Java_Edition_{version}",
+                url=version_data.wiki,
                 icon_url=(
                     "https://www.minecraft.net/etc.clientlibs/minecraft"
                     "/clientlibs/main/resources/img/menu/menu-buy--reversed"
@@ -515,10 +492,10 @@ class Info(commands.Cog):
                     "Type: `{type}`\nRelease: `{released}`\nPackage URL: [link"
                     "]({package_url})\nMinecraft Wiki: [link]({wiki})"
                 ).format(
-                    type=version_data["type"],
-                    released=datetime.strptime(version_data["releaseTime"], format),
-                    package_url=version_data["url"],
-                    wiki="https://minecraft.fandom.com/Java_Edition_{_version}",
+                    type=version_data.type,
+                    released=version_data.released,
+                    package_url=version_data.url,
+                    wiki=version_data.wiki,
                 ),
             )
         else:
@@ -529,9 +506,9 @@ class Info(commands.Cog):
                     "/clientlibs/main/resources/img/menu/menu-buy--reversed.gif"
                 ),
             ),
-            for _version in reversed(versions):
+            for major, releases in reversed(index.majors.items()):
                 embed.add_field(
-                    name=_version,
+                    name=major,
                     value=_(
                         "Releases: `{releases}`\n"
                         "**Latest Version**\n"
@@ -539,12 +516,10 @@ class Info(commands.Cog):
                         "Released: `{released}`\n"
                         "Wiki: [link]({link})"
                     ).format(
-                        releases=len(versions[_version]),
-                        id=versions[_version][-1]["id"],
-                        released=datetime.strptime(
-                            versions[_version][-1]["releaseTime"], format
-                        ),
-                        link=f"https://minecraft.fandom.com/Java_Edition_{_version}",
+                        releases=len(releases),
+                        id=releases[-1].id,
+                        released=releases[-1].released,
+                        link=f"https://minecraft.fandom.com/Java_Edition_{major}",
                     ),
                 )
         await ctx.send(embed=embed)
@@ -0,0 +1,200 @@
+"""Convert between Minecraft units, many values at once.
+
+Values are entered as a number, a list like ``1, 2, 3`` or a range like
+``0-15`` or ``0-100:10``, and are converted as one array.
+"""
+import re
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import numpy as np
+
+TICKS_PER_SECOND = 20
+STACK_SIZE = 64
+# Values converted at once, keeps answers within an embed.
+MAX_VALUES = 64
+# Largest value accepted, keeps every conversion well within int64.
+MAX_VALUE = 10**9
+MAX_SIGNAL = 15
+
+# Size of each unit in the smallest unit of what it measures.
+UNITS: Dict[str, Tuple[str, int]] = {
+    "tick": ("time", 1),
+    "second": ("time", TICKS_PER_SECOND),
+    "item": ("amount", 1),
+    "stack": ("amount", STACK_SIZE),
+    "shulker_box": ("amount", 27 * STACK_SIZE),
+}
+
+# Slots of the containers a comparator can read.
+CONTAINERS: Dict[str, int] = {
+    "chest": 27,
+    "double_chest": 54,
+    "barrel": 27,
+    "hopper": 5,
+    "shulker_box": 27,
+    "dispenser": 9,
+}
+
+_VALUE = r"-?\d+(?:\.\d+)?"
+_ITEM = re.compile(
+    rf"^({_VALUE})(?:\s*(?:-|\.\.)\s*({_VALUE})(?:\s*:\s*({_VALUE}))?)?$"
+)
+
+
+def parse_values(text: str) -> np.ndarray:
+    """Parse numbers, lists and ranges into an array.
+
+    Ranges include both ends and step by 1 unless a step is given.
+
+    >>> parse_values("3, 0-2, 10-20:5").tolist()
+    [3.0, 0.0, 1.0, 2.0, 10.0, 15.0, 20.0]
+    >>> parse_values("100000000000000000000000")
+    Traceback (most recent call last):
+    ...
+    ValueError: Values must be between -1000000000 and 1000000000
+
+    Args:
+        text (str): the values
+
+    Raises:
+        ValueError: the text is not values, there are too many or they are
+            too large
+
+    Returns:
+        np.ndarray: the values as floats
+    """
+    parts: List[np.ndarray] = []
+    total = 0
+    for item in text.split(","):
+        match = _ITEM.match(item.strip())
+        if match is None:
+            raise ValueError(f"{item.strip()!r} is not a number or range")
+        start, stop, step = match.groups()
+        if any(
+            number is not None and abs(float(number)) > MAX_VALUE
+            for number in (start, stop, step)
+        ):
+            raise ValueError(f"Values must be between {-MAX_VALUE} and {MAX_VALUE}")
+        if stop is None:
+            values = np.array([float(start)])
+        else:
+            step = float(step) if step is not None else 1.0
+            if step <= 0:
+                raise ValueError("The step of a range must be greater than 0")
+            count = int(np.floor((float(stop) - float(start)) / step + 1e-9)) + 1
+            if count < 1:
+                raise ValueError(f"{item.strip()!r} is an empty range")
+            if total + count > MAX_VALUES:
+                raise ValueError(f"At most {MAX_VALUES} values can be converted")
+            values = float(start) + step * np.arange(count)
+        total += len(values)
+        if total > MAX_VALUES:
+            raise ValueError(f"At most {MAX_VALUES} values can be converted")
+        parts.append(values)
+    return np.concatenate(parts)
+
+
+def convert(values: np.ndarray, source: str, target: str) -> np.ndarray:
+    """Convert values between two units of the same thing.
+
+    >>> convert(np.array([20.0, 30.0]), "tick", "second").tolist()
+    [1.0, 1.5]
+    >>> convert(np.array([2.0]), "shulker_box", "item").tolist()
+    [3456.0]
+
+    Args:
+        values (np.ndarray): values in the source unit
+        source (str): unit of the values, one of :data:`UNITS`
+        target (str): unit to convert to, one of :data:`UNITS`
+
+    Raises:
+        ValueError: the units measure different things
+
+    Returns:
+        np.ndarray: the values in the target unit
+    """
+    (source_kind, source_size), (target_kind, target_size) = (
+        UNITS[source],
+        UNITS[target],
+    )
+    if source_kind != target_kind:
+        raise ValueError(f"Can not convert {source} to {target}")
+    return values * source_size / target_size
+
+
+def split_items(items: np.ndarray) -> np.ndarray:
+    """Split amounts of items into shulker boxes, stacks and items.
+
+    >>> split_items(np.array([1000, 3456])).tolist()
+    [[0, 15, 40], [2, 0, 0]]
+
+    Returns:
+        np.ndarray: a row of shulker boxes, stacks and items for every amount
+    """
+    items = np.asarray(items, dtype=np.int64)
+    shulker_boxes, rest = np.divmod(items, UNITS["shulker_box"][1])
+    stacks, items = np.divmod(rest, STACK_SIZE)
+    return np.stack([shulker_boxes, stacks, items], axis=-1)
+
+
+def signal_strength(items: np.ndarray, container: str) -> np.ndarray:
+    """Get the signal a comparator reads from containers of items.
+
+    Items are taken to stack to 64. Like in the game, a container holding
+    any items gives a signal of at least 1.
+
+    >>> signal_strength(np.array([0, 1, 123, 124, 1728]), "chest").tolist()
+    [0, 1, 1, 2, 15]
+
+    Args:
+        items (np.ndarray): items in each container
+        container (str): one of :data:`CONTAINERS`
+
+    Returns:
+        np.ndarray: the signal strengths
+    """
+    items = np.asarray(items, dtype=np.int64)
+    capacity = CONTAINERS[container] * STACK_SIZE
+    # floor(1 + 14 * items / capacity) in integers, to not be off by a float
+    return np.where(items > 0, 1 + (MAX_SIGNAL - 1) * items // capacity, 0)
+
+
+def _minimum_items(slots: int) -> np.ndarray:
+    strength = np.arange(MAX_SIGNAL + 1, dtype=np.int64)
+    # the fewest items for which 14 * items >= (strength - 1) * capacity
+    items = -(-(strength - 1) * slots * STACK_SIZE // (MAX_SIGNAL - 1))
+    items[:2] = strength[:2]
+    return items
+
+
+# Fewest items giving each signal strength, by container.
+MINIMUM_ITEMS: Dict[str, np.ndarray] = {
+    container: _minimum_items(slots) for container, slots in CONTAINERS.items()
+}
+
+
+def _signal_table(container: str) -> str:
+    rows = ["Signal  Items  Stacks"]
+    for strength, items in enumerate(MINIMUM_ITEMS[container].tolist()):
+        stacks, rest = divmod(items, STACK_SIZE)
+        rows.append(f"{strength:>6}  {items:>5}  {stacks:>3} + {rest:>2}")
+    return "\n".join(rows)
+
+
+# The answer to every signal strength of a container, made once.
+SIGNAL_TABLES: Dict[str, str] = {
+    container: _signal_table(container) for container in CONTAINERS
+}
+
+
+def format_number(value: float) -> str:
+    """Format a number without a trailing ``.0``.
+
+    >>> format_number(3.0), format_number(0.05)
+    ('3', '0.05')
+    """
+    if float(value).is_integer():
+        return str(int(value))
+    return np.format_float_positional(value, precision=4, trim="-")
@@ -1,17 +1,25 @@
 """Minecraft cog."""
 from __future__ import annotations
 
+import asyncio
 import logging
-import math
+from typing import List
+from typing import Optional
 from typing import TYPE_CHECKING
 
+import numpy as np
 from discord.ext import commands
 from discord_slash import cog_ext
 from discord_slash import SlashContext
+from discord_slash.utils.manage_commands import create_choice
 from discord_slash.utils.manage_commands import create_option
 from obsidion.core.i18n import cog_i18n
 from obsidion.core.i18n import Translator
 
+from . import conversions
+from .seeds import parse_seed
+from .service import SeedService
+
 if TYPE_CHECKING:
     from obsidion.core.bot import Obsidion
 
@@ -19,12 +27,82 @@ log = logging.getLogger(__name__)
 
 _ = Translator("Minecraft", __file__)
 
+# Chunks shown on each side of the player in the slime chunk map.
+SLIME_MAP_RADIUS = 8
+MAX_SLIME_RADIUS = 1024
+
+CONTAINER_CHOICES = [
+    create_choice(name="Chest", value="chest"),
+    create_choice(name="Double Chest", value="double_chest"),
+    create_choice(name="Barrel", value="barrel"),
+    create_choice(name="Hopper", value="hopper"),
+    create_choice(name="Shulker Box", value="shulker_box"),
+    create_choice(name="Dispenser", value="dispenser"),
+]
+AMOUNT_CHOICES = [
+    create_choice(name="Items", value="item"),
+    create_choice(name="Stacks", value="stack"),
+    create_choice(name="Shulker Boxes", value="shulker_box"),
+]
+
+
+def container_name(container: str) -> str:
+    """Get the name of a container to use in replies."""
+    return {
+        "chest": _("Chest"),
+        "double_chest": _("Double Chest"),
+        "barrel": _("Barrel"),
+        "hopper": _("Hopper"),
+        "shulker_box": _("Shulker Box"),
+        "dispenser": _("Dispenser"),
+    }[container]
+
 
 @cog_i18n(_)
 class Minecraft(commands.Cog):
     def __init__(self, bot: Obsidion) -> None:
         """Init."""
         self.bot = bot
+        self.seeds = SeedService(bot)
+
+    def cog_unload(self) -> None:
+        """Stop the seed analysis processes."""
+        asyncio.create_task(self.seeds.close())
+
+    async def _parse(
+        self, ctx: SlashContext, text: str, integer: bool = False
+    ) -> Optional[np.ndarray]:
+        """Parse the values of a conversion, telling the user when they can't be."""
+        try:
+            values = conversions.parse_values(text)
+        except ValueError:
+            description = _(
+                "Enter a number, a list like `1, 2, 3` or a range like `0-15`, "
+                "of at most {max} values up to {max_value}."
+            ).format(max=conversions.MAX_VALUES, max_value=conversions.MAX_VALUE)
+        else:
+            if (values < 0).any():
+                description = _("Input must not be negative.")
+            elif integer and (values % 1).any():
+                description = _("Input must be whole numbers.")
+            else:
+                return values.astype(np.int64) if integer else values
+        embed = self.bot.build_embed(
+            title=_("Invalid Input"),
+            description=description,
+            type="error",
+        )
+        await ctx.send(embed=embed, hidden=True)
+        return None
+
+    async def _send_table(
+        self, ctx: SlashContext, title: str, header: str, rows: List[str]
+    ) -> None:
+        """Send the answers for many values as a table."""
+        embed = self.bot.build_embed(
+            title, "```\n{}\n{}\n```".format(header, "\n".join(rows))
+        )
+        await ctx.send(embed=embed)
 
     @cog_ext.cog_subcommand(
         base="convert",
@@ -33,39 +111,35 @@ class Minecraft(commands.Cog):
         options=[
             create_option(
                 name="ticks",
-                description="Ticks.",
-                option_type=4,
+                description="Ticks, a list like 1, 2, 3 or a range like 0-100:20.",
+                option_type=3,
                 required=True,
             )
         ],
     )
-    async def second(self, ctx: SlashContext, ticks: int) -> None:
-        if ticks <= 0:
-            embed = self.bot.build_embed(
-                title=_("Invalid Input"),
-                description=_("Input must be greater than 0."),
-                type="error",
-            )
-            await ctx.send(embed=embed, hidden=True)
+    async def second(self, ctx: SlashContext, ticks: str) -> None:
+        values = await self._parse(ctx, ticks)
+        if values is None:
             return
-        try:
-            seconds = ticks / 20
-        except OverflowError:
+        seconds = conversions.convert(values, "tick", "second")
+        title = _("Seconds to Tick Conversion")
+        if len(values) == 1:
             embed = self.bot.build_embed(
-                title=_("Invalid Input"),
-                description=_("Ticks must be greater than 0."),
-                type="error",
+                title,
+                _("It takes `{seconds}` seconds for `{ticks}` ticks to happen.").format(
+                    seconds=conversions.format_number(seconds[0]),
+                    ticks=conversions.format_number(values[0]),
+                ),
             )
-            await ctx.send(embed=embed, hidden=True)
+            await ctx.send(embed=embed)
             return
-
-        embed = self.bot.build_embed(
-            _("Seconds to Tick Conversion"),
-            _("It takes `{seconds}` seconds for `{ticks}` ticks to happen.").format(
-                seconds=seconds, ticks=ticks
-            ),
+        rows = [
+            f"{conversions.format_number(a):>10}  {conversions.format_number(b):>10}"
+            for a, b in zip(values, seconds)
+        ]
+        await self._send_table(
+            ctx, title, f"{_('Ticks'):>10}  {_('Seconds'):>10}", rows
         )
-        await ctx.send(embed=embed)
 
     @cog_ext.cog_subcommand(
         base="convert",
@@ -74,29 +148,87 @@ class Minecraft(commands.Cog):
         options=[
             create_option(
                 name="seconds",
-                description="Seconds.",
-                option_type=10,
+                description="Seconds, a list like 1, 2, 3 or a range like 0-10.",
+                option_type=3,
                 required=True,
             )
         ],
     )
-    async def tick(self, ctx: SlashContext, seconds: int) -> None:
-        if seconds <= 0:
+    async def tick(self, ctx: SlashContext, seconds: str) -> None:
+        values = await self._parse(ctx, seconds)
+        if values is None:
+            return
+        ticks = conversions.convert(values, "second", "tick")
+        title = _("Ticks to Seconds Conversion")
+        if len(values) == 1:
             embed = self.bot.build_embed(
-                title=_("Invalid Input"),
-                description=_("Input must be greater than 0."),
-                type="error",
+                title,
+                _("There are `{ticks}` ticks in `{seconds}` seconds").format(
+                    ticks=conversions.format_number(ticks[0]),
+                    seconds=conversions.format_number(values[0]),
+                ),
             )
-            await ctx.send(embed=embed, hidden=True)
+            await ctx.send(embed=embed)
             return
-        ticks = seconds * 20
-        embed = self.bot.build_embed(
-            _("Ticks to Seconds Conversion"),
-            _("There are `{ticks}` ticks in `{seconds}` seconds").format(
-                ticks=ticks, seconds=seconds
+        rows = [
+            f"{conversions.format_number(a):>10}  {conversions.format_number(b):>10}"
+            for a, b in zip(values, ticks)
+        ]
+        await self._send_table(
+            ctx, title, f"{_('Seconds'):>10}  {_('Ticks'):>10}", rows
+        )
+
+    @cog_ext.cog_subcommand(
+        base="convert",
+        name="items",
+        description="Convert items, stacks and shulker boxes.",
+        options=[
+            create_option(
+                name="amount",
+                description="Amount, a list like 1, 2, 3 or a range like 0-640:64.",
+                option_type=3,
+                required=True,
             ),
+            create_option(
+                name="unit",
+                description="Unit of the amount, items if not given.",
+                option_type=3,
+                required=False,
+                choices=AMOUNT_CHOICES,
+            ),
+        ],
+    )
+    async def items(self, ctx: SlashContext, amount: str, unit: str = "item") -> None:
+        values = await self._parse(ctx, amount)
+        if values is None:
+            return
+        items = np.floor(conversions.convert(values, unit, "item"))
+        parts = conversions.split_items(items)
+        title = _("Item Conversion")
+        if len(values) == 1:
+            shulker_boxes, stacks, rest = parts[0].tolist()
+            embed = self.bot.build_embed(
+                title,
+                _(
+                    "That is `{items}` items, or `{shulker_boxes}` shulker boxes, "
+                    "`{stacks}` stacks and `{rest}` items."
+                ).format(
+                    items=int(items[0]),
+                    shulker_boxes=shulker_boxes,
+                    stacks=stacks,
+                    rest=rest,
+                ),
+            )
+            await ctx.send(embed=embed)
+            return
+        rows = [
+            f"{int(total):>9}  {boxes:>8}  {stacks:>6}  {rest:>5}"
+            for total, (boxes, stacks, rest) in zip(items, parts.tolist())
+        ]
+        header = (
+            f"{_('Items'):>9}  {_('Shulkers'):>8}  {_('Stacks'):>6}  {_('Items'):>5}"
         )
-        await ctx.send(embed=embed)
+        await self._send_table(ctx, title, header, rows)
 
     @cog_ext.cog_subcommand(
         base="convert",
@@ -108,29 +240,51 @@ class Minecraft(commands.Cog):
         options=[
             create_option(
                 name="items",
-                description="Number of items in the chest.",
-                option_type=4,
+                description="Items, a list like 1, 2, 3 or a range like 0-1728:128.",
+                option_type=3,
                 required=True,
-            )
+            ),
+            create_option(
+                name="container",
+                description="Container the comparator reads, a chest if not given.",
+                option_type=3,
+                required=False,
+                choices=CONTAINER_CHOICES,
+            ),
         ],
     )
-    async def chest(self, ctx: SlashContext, items: int) -> None:
-        fullness = math.floor(1 + ((items / 64) / (27)) * 14)
-        if fullness == 0:
+    async def chest(
+        self, ctx: SlashContext, items: str, container: str = "chest"
+    ) -> None:
+        values = await self._parse(ctx, items, integer=True)
+        if values is None:
+            return
+        capacity = conversions.CONTAINERS[container] * conversions.STACK_SIZE
+        if (values > capacity).any():
             embed = self.bot.build_embed(
                 title=_("Invalid Input"),
-                description=_("Input must be greater than 0."),
+                description=_("The container holds at most {capacity} items.").format(
+                    capacity=capacity
+                ),
                 type="error",
             )
             await ctx.send(embed=embed, hidden=True)
             return
-        embed = self.bot.build_embed(
-            _("Chest Comparator"),
-            _(
-                "The chest will output a redstone signal of strength: `{fullness}`."
-            ).format(fullness=fullness),
-        )
-        await ctx.send(embed=embed)
+        strengths = conversions.signal_strength(values, container)
+        name = container_name(container)
+        title = _("{container} Comparator").format(container=name)
+        if len(values) == 1:
+            embed = self.bot.build_embed(
+                title,
+                _(
+                    "The {container} will output a redstone signal of strength: "
+                    "`{fullness}`."
+                ).format(container=name.lower(), fullness=int(strengths[0])),
+            )
+            await ctx.send(embed=embed)
+            return
+        rows = [f"{a:>6}  {b:>6}" for a, b in zip(values.tolist(), strengths.tolist())]
+        await self._send_table(ctx, title, f"{_('Items'):>6}  {_('Signal'):>6}", rows)
 
     @cog_ext.cog_subcommand(
         base="convert",
@@ -139,31 +293,60 @@ class Minecraft(commands.Cog):
         options=[
             create_option(
                 name="strength",
-                description="Strength of redstone output.",
+                description="Strength of redstone output, every strength if not given.",
                 option_type=4,
-                required=True,
-            )
+                required=False,
+            ),
+            create_option(
+                name="container",
+                description="Container the comparator reads, a chest if not given.",
+                option_type=3,
+                required=False,
+                choices=CONTAINER_CHOICES,
+            ),
         ],
     )
-    async def comparator(self, ctx: SlashContext, strength: int) -> None:
-        if strength < 0 or strength > 15:
+    async def comparator(
+        self,
+        ctx: SlashContext,
+        strength: Optional[int] = None,
+        container: str = "chest",
+    ) -> None:
+        name = container_name(container)
+        title = _("{container} Comparator").format(container=name)
+        if strength is None:
+            # every strength is looked up ahead of time
+            embed = self.bot.build_embed(
+                title,
+                f"```\n{conversions.SIGNAL_TABLES[container]}\n```",
+            )
+            await ctx.send(embed=embed)
+            return
+        if not 0 <= strength <= conversions.MAX_SIGNAL:
             embed = self.bot.build_embed(
                 title=_("Invalid Input"),
                 description=_("Input must be between 0 and 15."),
                 type="error",
             )
+            await ctx.send(embed=embed, hidden=True)
             return
-        items = max(strength, math.ceil((27 * 64 / 14) * (strength - 1)))
+        items = int(conversions.MINIMUM_ITEMS[container][strength])
+        capacity = conversions.CONTAINERS[container] * conversions.STACK_SIZE
         embed = self.bot.build_embed(
-            _("Chest Comparator"),
-            _("The chest is `{strength}%` full. It is holding `{items}` items.").format(
-                strength=(strength / 15 * 100), items=items
+            title,
+            _(
+                "The {container} is `{strength}%` full. It is holding `{items}` items."
+            ).format(
+                container=name.lower(),
+                strength=conversions.format_number(items / capacity * 100),
+                items=items,
             ),
         )
         await ctx.send(embed=embed)
 
-    @cog_ext.cog_slash(
-        name="seed",
+    @cog_ext.cog_subcommand(
+        base="seed",
+        name="text",
         description="Convert text to minecraft numerical seed.",
         options=[
             create_option(
@@ -175,15 +358,131 @@ class Minecraft(commands.Cog):
         ],
     )
     async def seed(self, ctx: SlashContext, text: str) -> None:
-        try:
-            seed = str(int(text))
-        except ValueError:
-            h = 0
-            for c in text:
-                h = (31 * h + ord(c)) & 0xFFFFFFFF
-            seed = str(((h + 0x80000000) & 0xFFFFFFFF) - 0x80000000)
+        seed = parse_seed(text)
         embed = self.bot.build_embed(
             _("Seed"),
             _("The seed for {text} is: `{seed}`").format(text=text, seed=seed),
         )
         await ctx.send(embed=embed)
+
+    @cog_ext.cog_subcommand(
+        base="seed",
+        name="slime",
+        description="Map the slime chunks around a position.",
+        options=[
+            create_option(
+                name="seed",
+                description="Seed of the world.",
+                option_type=3,
+                required=True,
+            ),
+            create_option(
+                name="x",
+                description="X coordinate.",
+                option_type=4,
+                required=True,
+            ),
+            create_option(
+                name="z",
+                description="Z coordinate.",
+                option_type=4,
+                required=True,
+            ),
+        ],
+    )
+    async def slime(self, ctx: SlashContext, seed: str, x: int, z: int) -> None:
+        await ctx.defer()
+        world_seed = parse_seed(seed)
+        # block coordinates to the chunk they are in
+        chunk_x, chunk_z = x >> 4, z >> 4
+        size = 2 * SLIME_MAP_RADIUS + 1
+        chunks = await self.seeds.slime_chunks(
+            world_seed,
+            chunk_x - SLIME_MAP_RADIUS,
+            chunk_z - SLIME_MAP_RADIUS,
+            size,
+            size,
+        )
+        rows = []
+        for row, line in enumerate(chunks):
+            cells = ["🟩" if slime else "⬛" for slime in line]
+            if row == SLIME_MAP_RADIUS:
+                cells[SLIME_MAP_RADIUS] = "🟢" if line[SLIME_MAP_RADIUS] else "⚪"
+            rows.append("".join(cells))
+        if chunks[SLIME_MAP_RADIUS, SLIME_MAP_RADIUS]:
+            here = _("Chunk `{x}, {z}` is a slime chunk.")
+        else:
+            here = _("Chunk `{x}, {z}` is not a slime chunk.")
+        embed = self.bot.build_embed(
+            _("Slime Chunks"),
+            "\n".join(rows),
+        )
+        embed.add_field(name=_("Seed"), value=f"`{world_seed}`")
+        embed.add_field(name=_("Position"), value=here.format(x=chunk_x, z=chunk_z))
+        embed.set_footer(
+            text=_("North is up, each square is a chunk, the circle is you.")
+        )
+        await ctx.send(embed=embed)
+
+    @cog_ext.cog_subcommand(
+        base="seed",
+        name="slimecount",
+        description="Count the slime chunks around a position.",
+        options=[
+            create_option(
+                name="seed",
+                description="Seed of the world.",
+                option_type=3,
+                required=True,
+            ),
+            create_option(
+                name="x",
+                description="X coordinate.",
+                option_type=4,
+                required=True,
+            ),
+            create_option(
+                name="z",
+                description="Z coordinate.",
+                option_type=4,
+                required=True,
+            ),
+            create_option(
+                name="radius",
+                description="Radius in chunks, at most 1024.",
+                option_type=4,
+                required=True,
+            ),
+        ],
+    )
+    async def slimecount(
+        self, ctx: SlashContext, seed: str, x: int, z: int, radius: int
+    ) -> None:
+        if not 0 <= radius <= MAX_SLIME_RADIUS:
+            embed = self.bot.build_embed(
+                title=_("Invalid Input"),
+                description=_("Radius must be between 0 and {max}.").format(
+                    max=MAX_SLIME_RADIUS
+                ),
+                type="error",
+            )
+            await ctx.send(embed=embed, hidden=True)
+            return
+        await ctx.defer()
+        world_seed = parse_seed(seed)
+        chunk_x, chunk_z = x >> 4, z >> 4
+        size = 2 * radius + 1
+        count = await self.seeds.count_slime_chunks(
+            world_seed, chunk_x - radius, chunk_z - radius, size, size
+        )
+        embed = self.bot.build_embed(
+            _("Slime Chunks"),
+            _(
+                "There are `{count}` slime chunks out of `{total}` within "
+                "`{radius}` chunks of chunk `{x}, {z}`."
+            ).format(
+                count=count, total=size * size, radius=radius, x=chunk_x, z=chunk_z
+            ),
+        )
+        embed.add_field(name=_("Seed"), value=f"`{world_seed}`")
+        await ctx.send(embed=embed)
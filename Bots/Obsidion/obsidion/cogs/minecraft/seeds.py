@@ -0,0 +1,158 @@
+"""Analyse Minecraft world seeds.
+
+Everything in here works on whole grids of chunks at once and runs in a
+worker process, so it only takes and returns plain values and arrays.
+"""
+import re
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from obsidion.core.utils.java import java_string_hash
+
+MULTIPLIER = np.uint64(0x5DEECE66D)
+ADDEND = np.uint64(0xB)
+MASK = np.uint64((1 << 48) - 1)
+LONG_MIN = -(1 << 63)
+LONG_MAX = (1 << 63) - 1
+# What Long.parseLong accepts, int() also takes whitespace, underscores and
+# digits of other scripts.
+LONG_PATTERN = re.compile(r"[+-]?[0-9]+")
+# Rows of chunks processed at once when counting, bounds the memory used.
+BLOCK_ROWS = 256
+
+
+def parse_seed(text: str) -> int:
+    """Turn the text entered as a seed into the seed, like the game does.
+
+    >>> parse_seed("-42")
+    -42
+    >>> parse_seed("hello")
+    99162322
+    >>> parse_seed("1_000")
+    48130338
+
+    Args:
+        text (str): text entered as the seed
+
+    Returns:
+        int: the seed
+    """
+    if LONG_PATTERN.fullmatch(text) is None:
+        return java_string_hash(text)
+    seed = int(text)
+    if not LONG_MIN <= seed <= LONG_MAX:
+        return java_string_hash(text)
+    return seed
+
+
+class JavaRandom:
+    """Many ``java.util.Random`` generators stepped together.
+
+    >>> int(JavaRandom([42]).next(32)[0])
+    -1170105035
+    >>> JavaRandom([0, 42]).next_int(10).tolist()
+    [0, 0]
+    """
+
+    def __init__(self, seeds: np.ndarray) -> None:
+        self.state = (
+            np.asarray(seeds, dtype=np.int64).view(np.uint64) ^ MULTIPLIER
+        ) & MASK
+
+    def _step(self, index: Optional[np.ndarray] = None) -> None:
+        if index is None:
+            self.state = (self.state * MULTIPLIER + ADDEND) & MASK
+        else:
+            self.state[index] = (self.state[index] * MULTIPLIER + ADDEND) & MASK
+
+    def next(self, bits: int) -> np.ndarray:
+        """Get the next ``bits`` random bits of every generator as Java ints."""
+        self._step()
+        return self._bits(self.state, bits)
+
+    @staticmethod
+    def _bits(state: np.ndarray, bits: int) -> np.ndarray:
+        values = (state >> np.uint64(48 - bits)).astype(np.int64)
+        if bits == 32:
+            values = values.astype(np.int32).astype(np.int64)
+        return values
+
+    def next_int(self, bound: int) -> np.ndarray:
+        """Get the next int below ``bound`` of every generator."""
+        if bound & -bound == bound:
+            return (bound * self.next(31)) >> 31
+        bits = self.next(31)
+        values = bits % bound
+        # Java draws again when the value falls in the incomplete last range
+        rejected = np.flatnonzero(bits - values + (bound - 1) >= 1 << 31)
+        while rejected.size:
+            self._step(rejected)
+            bits = self._bits(self.state[rejected], 31)
+            values[rejected] = bits % bound
+            rejected = rejected[bits - bits % bound + (bound - 1) >= 1 << 31]
+        return values
+
+
+def slime_chunks(seed: int, x: int, z: int, width: int, height: int) -> np.ndarray:
+    """Find the slime chunks in an area.
+
+    >>> slime_chunks(0, -2, -2, 4, 4).astype(int).tolist()
+    [[0, 0, 0, 0], [0, 0, 0, 0], [1, 0, 0, 0], [0, 0, 0, 0]]
+    >>> slime_chunks(2147483647, 1875000, 1875000, 4, 4).astype(int).tolist()
+    [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 1], [0, 0, 0, 0]]
+
+    Args:
+        seed (int): seed of the world
+        x (int): x of the chunk in the north west corner
+        z (int): z of the chunk in the north west corner
+        width (int): chunks along x
+        height (int): chunks along z
+
+    Returns:
+        np.ndarray: whether each chunk is a slime chunk, indexed by [z, x]
+    """
+    xs = np.arange(x, x + width, dtype=np.int64)[np.newaxis, :]
+    zs = np.arange(z, z + height, dtype=np.int64)[:, np.newaxis]
+    # the game does these in int arithmetic, so they wrap at 32 bits, then
+    # sums them as longs. NumPy would keep an int32 sum in int32.
+    with np.errstate(over="ignore"):
+        seeds = (
+            np.int64(seed)
+            + (xs * xs * 0x4C1906).astype(np.int32).astype(np.int64)
+            + (xs * 0x5AC0DB).astype(np.int32).astype(np.int64)
+            + (zs * zs).astype(np.int32).astype(np.int64) * 0x4307A7
+            + (zs * 0x5F24F).astype(np.int32).astype(np.int64)
+        ) ^ 0x3AD8025F
+    return JavaRandom(seeds).next_int(10) == 0
+
+
+def count_slime_chunks(seed: int, x: int, z: int, width: int, height: int) -> int:
+    """Count the slime chunks in an area, which may be very large.
+
+    Args:
+        seed (int): seed of the world
+        x (int): x of the chunk in the north west corner
+        z (int): z of the chunk in the north west corner
+        width (int): chunks along x
+        height (int): chunks along z
+
+    Returns:
+        int: number of slime chunks
+    """
+    count = 0
+    for row in range(z, z + height, BLOCK_ROWS):
+        rows = min(BLOCK_ROWS, z + height - row)
+        count += int(slime_chunks(seed, x, row, width, rows).sum())
+    return count
+
+
+def slime_map(seed: int, x: int, z: int, width: int, height: int) -> Tuple[bytes, int]:
+    """Find the slime chunks in an area, packed to send between processes.
+
+    Returns:
+        Tuple[bytes, int]: the packed bits of :func:`slime_chunks`, and the
+            number of slime chunks
+    """
+    chunks = slime_chunks(seed, x, z, width, height)
+    return np.packbits(chunks).tobytes(), int(chunks.sum())
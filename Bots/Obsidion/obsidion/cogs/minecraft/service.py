@@ -0,0 +1,126 @@
+"""Seed analysis with cached results."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from typing import Callable
+from typing import Coroutine
+from typing import Dict
+from typing import TYPE_CHECKING
+from typing import TypeVar
+
+import numpy as np
+
+from . import seeds
+
+if TYPE_CHECKING:
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Milliseconds to keep results for. A seed and region always give the same
+# result, so they never go stale, they only have to make room.
+SEED_PX = 30 * 24 * 60 * 60 * 1000
+SEED_WORKERS = 2
+
+
+class SeedService:
+    """Analyse seeds in a process pool.
+
+    Slime chunk maps are stored packed under
+    ``seed_slime_{seed}_{x}_{z}_{width}_{height}`` and counts under
+    ``seed_slimecount_{seed}_{x}_{z}_{width}_{height}``.
+    """
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+        self._pool = ProcessPoolExecutor(max_workers=SEED_WORKERS)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def slime_chunks(
+        self, seed: int, x: int, z: int, width: int, height: int
+    ) -> np.ndarray:
+        """Find the slime chunks in an area.
+
+        Args:
+            seed (int): seed of the world
+            x (int): x of the chunk in the north west corner
+            z (int): z of the chunk in the north west corner
+            width (int): chunks along x
+            height (int): chunks along z
+
+        Returns:
+            np.ndarray: whether each chunk is a slime chunk, indexed by [z, x]
+        """
+        key = f"seed_slime_{seed}_{x}_{z}_{width}_{height}"
+        packed = await self._once(
+            key, lambda: self._slime_map(key, seed, x, z, width, height)
+        )
+        bits = np.unpackbits(np.frombuffer(packed, dtype=np.uint8))
+        return bits[: width * height].reshape(height, width).astype(bool)
+
+    async def count_slime_chunks(
+        self, seed: int, x: int, z: int, width: int, height: int
+    ) -> int:
+        """Count the slime chunks in an area.
+
+        Args:
+            seed (int): seed of the world
+            x (int): x of the chunk in the north west corner
+            z (int): z of the chunk in the north west corner
+            width (int): chunks along x
+            height (int): chunks along z
+
+        Returns:
+            int: number of slime chunks
+        """
+        key = f"seed_slimecount_{seed}_{x}_{z}_{width}_{height}"
+        return await self._once(
+            key, lambda: self._count(key, seed, x, z, width, height)
+        )
+
+    async def close(self) -> None:
+        """Stop the worker processes."""
+        self._pool.shutdown(wait=False)
+
+    async def _once(self, key: str, factory: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        # identical requests made at the same time are only worked out once
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _slime_map(
+        self, key: str, seed: int, x: int, z: int, width: int, height: int
+    ) -> bytes:
+        cached = await self._bot.redis_bytes.get(key)
+        if cached is not None:
+            return cached
+        loop = asyncio.get_running_loop()
+        packed, count = await loop.run_in_executor(
+            self._pool, seeds.slime_map, seed, x, z, width, height
+        )
+        await self._bot.redis_bytes.set(key, packed, px=SEED_PX)
+        await self._bot.redis.set(
+            f"seed_slimecount_{seed}_{x}_{z}_{width}_{height}", count, px=SEED_PX
+        )
+        return packed
+
+    async def _count(
+        self, key: str, seed: int, x: int, z: int, width: int, height: int
+    ) -> int:
+        cached = await self._bot.redis.get(key)
+        if cached is not None:
+            return int(cached)
+        loop = asyncio.get_running_loop()
+        count = await loop.run_in_executor(
+            self._pool, seeds.count_slime_chunks, seed, x, z, width, height
+        )
+        await self._bot.redis.set(key, count, px=SEED_PX)
+        return count
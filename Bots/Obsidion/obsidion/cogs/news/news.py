@@ -7,16 +7,19 @@ from datetime import datetime
 from datetime import timezone
 from typing import Any
 from typing import Dict
+from typing import Iterator
 from typing import List
+from typing import Tuple
 from typing import TYPE_CHECKING
 from typing import Union
 
 import discord
 from bs4 import BeautifulSoup
 from discord.ext import commands
-from discord.ext import tasks
+from obsidion.core.feeds import FeedDiff
 from obsidion.core.i18n import cog_i18n
 from obsidion.core.i18n import Translator
+from obsidion.core.versions import Version
 
 if TYPE_CHECKING:
     from obsidion.core.bot import Obsidion
@@ -31,11 +34,11 @@ class News(commands.Cog):
     def __init__(self, bot: Obsidion) -> None:
         """Init."""
         self.bot = bot
-        self.last_media_data = datetime.now(timezone.utc)
-        self.last_media_url = ""
-        self.last_java_version_data = datetime.now(timezone.utc)
         self.mojang_service: Dict[str, str] = {}
-        self.autopost.start()
+        self._releases = FeedDiff(bot.redis, "java_versions")
+        self._articles = FeedDiff(bot.redis, "articles")
+        # only the leader process polls the feeds
+        bot.scheduler.add("news_autopost", self.autopost, interval=10 * 60)
 
     async def get_status(self) -> Union[discord.Embed, None]:
         data = await self.bot.get_api_json("status", "mojang/check")
@@ -55,35 +58,43 @@ class News(commands.Cog):
             return None
         return embed
 
-    async def get_media(self) -> Union[discord.Embed, None]:
-        """Get rss media."""
+    async def get_media(self) -> List[discord.Embed]:
+        """Get new articles from minecraft.net."""
         data = await self.bot.get_json(
             "news",
             "https://www.minecraft.net/content/minecraft-net/_jcr_content.articles.grid?tileselection=auto",
         )
         if data is None:
-            return None
-
-        latest_post = data["article_grid"][0]
-
-        # run checks to see wether it should be posted
-
-        time = datetime.strptime(
-            latest_post["publish_date"], "%d %B %Y %X %Z"
-        ).astimezone(timezone.utc)
-
-        if time <= self.last_media_data:
-            return None
-
-        if latest_post["article_url"] != self.last_media_url:
-            return None
-
-        self.last_media_data = time
-        self.last_media_url = latest_post["article_url"]
-
-        post_url = f"https://minecraft.net{latest_post['article_url']}"
+            return []
+
+        posts = {post["article_url"]: post for post in data["article_grid"]}
+
+        def entries() -> Iterator[Tuple[str, float]]:
+            for post in data["article_grid"]:
+                time = datetime.strptime(post["publish_date"], "%d %B %Y %X %Z")
+                yield post["article_url"], time.replace(tzinfo=timezone.utc).timestamp()
+
+        new_posts = await self._articles.diff(entries())
+        embeds = []
+        failed = []
+        for url in new_posts:
+            try:
+                embeds.append(await self.build_article(posts[url]))
+            except Exception as e:
+                log.exception("Unable to build article %s", url, exc_info=e)
+                failed.append(url)
+        # retried on the next poll instead of being lost
+        await self._articles.forget(failed)
+        return embeds
+
+    async def build_article(self, post: Dict[str, Any]) -> discord.Embed:
+        """Build the embed announcing an article."""
+        time = datetime.strptime(post["publish_date"], "%d %B %Y %X %Z").replace(
+            tzinfo=timezone.utc
+        )
+        post_url = f"https://minecraft.net{post['article_url']}"
 
-        async with self.bot.http_session.get(
+        async with self.bot.http_clients.get("minecraft_net").get(
             post_url, headers={"User-Agent": "Obsidion Discord Bot"}
         ) as resp:
             text = await resp.text()
@@ -91,7 +102,7 @@ class News(commands.Cog):
 
         author = soup.find("dl", class_="attribution__details").dd.string
         text = soup.find("div", class_="end-with-block").p.text
-        url = f"https://minecraft.net{latest_post['default_tile']['image']['imageURL']}"
+        url = f"https://minecraft.net{post['default_tile']['image']['imageURL']}"
         embed = discord.Embed(
             title=soup.find("h1").string,
             description=text,
@@ -109,14 +120,11 @@ class News(commands.Cog):
             embed.set_thumbnail(url=author_image)
         except AttributeError:
             pass
-        embed.add_field(name=_("Category"), value=latest_post["primary_category"])
+        embed.add_field(name=_("Category"), value=post["primary_category"])
         embed.add_field(name=_("Author"), value=author)
         embed.add_field(
             name=_("Publish Date"),
-            value=datetime.strftime(
-                datetime.strptime(latest_post["publish_date"], "%d %B %Y %X %Z"),
-                "%d/%m/%Y",
-            ),
+            value=datetime.strftime(time, "%d/%m/%Y"),
         )
 
         # create footer
@@ -135,42 +143,60 @@ class News(commands.Cog):
 
         return embed
 
-    async def get_java_releases(self) -> Union[discord.Embed, None]:
-        data = await self.bot.get_json(
-            "versions", "https://launchermeta.mojang.com/mc/game/version_manifest.json"
-        )
-        if data is None:
-            return None
-
-        last_release = data["versions"][0]
-
-        format = "%Y-%m-%dT%H:%M:%S%z"
-        time = datetime.strptime(last_release["time"], format)
-        if time <= self.last_java_version_data:
-            return None
-
+    async def get_java_releases(self) -> List[Tuple[str, discord.Embed]]:
+        """Get new Java Edition versions with the news category to post them in."""
+        index = await self.bot.versions.index()
+        if index is None:
+            return []
+
+        def entries() -> Iterator[Tuple[str, float]]:
+            # the index is ordered by release time, newest first
+            for version in index.versions:
+                yield version.id, version.released.timestamp()
+
+        new_versions = await self._releases.diff(entries())
+        releases = []
+        failed = []
+        for _id in new_versions:
+            version = index[_id]
+            try:
+                embed = self.build_release(version)
+            except Exception as e:
+                log.exception("Unable to build version %s", _id, exc_info=e)
+                failed.append(_id)
+                continue
+            category = "release" if version.type == "release" else "snapshot"
+            releases.append((category, embed))
+        await self._releases.forget(failed)
+        return releases
+
+    def build_release(self, version: Version) -> discord.Embed:
+        """Build the embed announcing a version."""
         embed = discord.Embed(
             colour=self.bot.color,
         )
 
-        embed.add_field(name=_("Name"), value=last_release["id"])
+        embed.add_field(name=_("Name"), value=version.id)
         embed.add_field(
             name=_("Package URL"),
-            value=_("[Package URL]({url})").format(url=last_release["url"]),
+            value=_("[Package URL]({url})").format(url=version.url),
         )
         embed.add_field(
             name=_("Minecraft Wiki"),
             value=_(
                 "[Minecraft Wiki](https://minecraft.fandom.com/Java_Edition_{id})"
-            ).format(id=last_release["id"]),
+            ).format(id=version.id),
         )
 
         embed.set_footer(text=_("Article Published"))
-        embed.timestamp = time
-        self.last_java_version_data = time
+        embed.timestamp = version.released
+        if version.type == "release":
+            title = _("New Minecraft Java Edition Release")
+        else:
+            title = _("New Minecraft Java Edition Snapshot")
         embed.set_author(
-            name=_("New Minecraft Java Edition Snapshot"),
-            url=f"https://minecraft.fandom.com/Java_Edition_{last_release['id']}",
+            name=title,
+            url=version.wiki,
             icon_url=(
                 "https://www.minecraft.net/etc.clientlibs/minecraft"
                 "/clientlibs/main/resources/img/menu/menu-buy--reversed.gif"
@@ -181,20 +207,22 @@ class News(commands.Cog):
     async def post_content(
         self, embed: Union[discord.Embed, None], channels: Dict[str, Any], category: str
     ) -> None:
+        # Post through the REST API as the channel may belong to a shard
+        # which is run by another process.
         if embed is not None and category in channels:
-            for _channel in channels[category]:
-                channel = self.bot.get_channel(_channel)
-                if (
-                    channel is not None
-                    and channel.permissions_for(channel.server.me).send_messages
-                ):
-                    message = await channel.send(embed=embed)
-                    try:
-                        await message.publish()
-                    except discord.errors.Forbidden:
-                        pass
-
-    @tasks.loop(minutes=10)
+            payload = embed.to_dict()
+            for channel_id in channels[category]:
+                try:
+                    message = await self.bot.http.send_message(
+                        channel_id, None, embed=payload
+                    )
+                except (discord.errors.Forbidden, discord.errors.NotFound):
+                    continue
+                try:
+                    await self.bot.http.publish_message(channel_id, message["id"])
+                except discord.errors.HTTPException:
+                    pass
+
     async def autopost(self) -> None:
         posts = await self.bot.db.fetch("SELECT news FROM guild WHERE news IS NOT NULL")
         channels: Dict[str, List[int]] = {}
@@ -207,13 +235,13 @@ class News(commands.Cog):
                     else:
                         channels[key] = [n[key]]
         try:
-            release_embed = await self.get_java_releases()
-            await self.post_content(release_embed, channels, "release")
+            for category, release_embed in await self.get_java_releases():
+                await self.post_content(release_embed, channels, category)
         except Exception as e:
             log.exception(type(e).__name__, exc_info=e)
         try:
-            article_embed = await self.get_media()
-            await self.post_content(article_embed, channels, "article")
+            for article_embed in await self.get_media():
+                await self.post_content(article_embed, channels, "article")
         except Exception as e:
             log.exception(type(e).__name__, exc_info=e)
         # try:
@@ -224,4 +252,4 @@ class News(commands.Cog):
 
     def cog_unload(self) -> None:
         """Stop news posting tasks on cog unload."""
-        self.autopost.cancel()
+        self.bot.scheduler.remove("news_autopost")
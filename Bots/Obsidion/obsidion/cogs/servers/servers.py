@@ -1,18 +1,68 @@
 """Images cog."""
+import asyncio
 import logging
+import time
 
 from discord.ext import commands
 from obsidion.core.i18n import cog_i18n
 from obsidion.core.i18n import Translator
+from obsidion.core.server_ping import parse_address
 
 
 log = logging.getLogger(__name__)
 
 _ = Translator("Servers", __file__)
 
+# Seconds between polls of the linked servers.
+POLL_INTERVAL = 5 * 60
+# Milliseconds polled statuses are cached for, so /server is answered from
+# the cache until the next poll.
+POLLED_PX = (POLL_INTERVAL + 60) * 1000
+
 
 @cog_i18n(_)
 class Servers(commands.Cog):
     def __init__(self, bot) -> None:
         """Init."""
         self.bot = bot
+        bot.scheduler.add("servers_poll", self.poll, interval=POLL_INTERVAL)
+
+    def cog_unload(self) -> None:
+        """Stop polling servers."""
+        self.bot.scheduler.remove("servers_poll")
+
+    async def poll(self) -> None:
+        """Ping every linked server once and record its player count."""
+        rows = await self.bot.db.fetch(
+            "SELECT DISTINCT server FROM guild WHERE server IS NOT NULL"
+        )
+        unique = set()
+        for row in rows:
+            try:
+                unique.add(parse_address(row["server"]))
+            except ValueError:
+                continue
+        addresses = list(unique)
+        start = time.perf_counter()
+        # the pinger bounds how many of these are connecting at once
+        results = await asyncio.gather(
+            *(
+                self.bot.server_pinger.java(host, port, cached=False, px=POLLED_PX)
+                for host, port in addresses
+            ),
+            return_exceptions=True,
+        )
+        statuses = {}
+        for address, result in zip(addresses, results):
+            if isinstance(result, BaseException):
+                # one broken server must not lose the poll of all the others
+                log.warning("Unable to poll %s:%s: %r", *address, result)
+                continue
+            statuses[address] = result
+        await self.bot.server_history.record(statuses)
+        log.info(
+            "Polled %d servers in %.1fs, %d online",
+            len(addresses),
+            time.perf_counter() - start,
+            sum(status is not None for status in statuses.values()),
+        )
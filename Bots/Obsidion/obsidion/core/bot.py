@@ -1,12 +1,12 @@
 """Main bot file."""
-import json
+import asyncio
 import logging
-import socket
 import sys
 from datetime import datetime
 from enum import IntEnum
 from typing import Any
 from typing import Dict
+from typing import Iterable
 from typing import Optional
 from typing import Union
 from uuid import UUID
@@ -15,42 +15,83 @@ import aiohttp
 import aioredis
 import asyncpg
 import discord
+import orjson
 from discord.ext.commands import AutoShardedBot
 
+from .cluster_stats import ClusterStats
+from .compression import CompressionError
+from .compression import Compressor
+from .compression import load_dictionary
 from .config import get_settings
 from .core_commands import Core
 from .dev_commands import Dev
 from .errors import PlayerNotExistError
+from .errors import UpstreamUnavailableError
 from .events import Events
+from .http import HTTPClients
+from .ipc import IPCBus
+from .json_cache import JSONCache
+from .profiles import ProfileStore
+from .ratelimit import RateLimiter
+from .scheduler import Scheduler
+from .server_history import ServerHistory
+from .server_ping import ServerPinger
 from .settings_cache import AccountManager
 from .settings_cache import GuildManager
 from .settings_cache import I18nManager
+from .versions import Versions
 
 
 log = logging.getLogger(__name__)
 
+# Milliseconds to keep the last good response of an upstream, served while
+# the upstream is unavailable.
+STALE_PX = 86400000
+# Default of :meth:`Obsidion.read_json` telling a cached null from a miss.
+MISSING = object()
+
 
 class Obsidion(AutoShardedBot):
     """Main bot class."""
 
     redis: aioredis.Redis
+    redis_bytes: aioredis.Redis
     db: asyncpg.Pool
     http_session: aiohttp.ClientSession
-    _connector: aiohttp.TCPConnector
+    http_clients: HTTPClients
     _resolver: aiohttp.AsyncResolver
     _invite: Optional[str]
     _invite_bot: Optional[str]
 
     def __init__(self, *args, **kwargs) -> None:
         """Initialise bot with args passed through."""
+        self.cluster_id: int = kwargs.pop("cluster_id", 0)
+        self.cluster_count: int = kwargs.pop("cluster_count", 1)
         self._shutdown_mode = ExitCodes.CRITICAL
-        self.uptime = datetime.now()
+        self.uptime = datetime.utcnow()
         color = get_settings().COLOR.as_rgb_tuple()
         self.color = discord.Color.from_rgb(color[0], color[1], color[2])
 
         self._i18n_cache = I18nManager(self)
         self._account_cache = AccountManager(self)
         self._guild_cache = GuildManager(self)
+        self.scheduler = Scheduler(self)
+        self.rate_limiter = RateLimiter(self)
+        self.profiles = ProfileStore(self)
+        self.server_pinger = ServerPinger(self)
+        self.server_history = ServerHistory(self)
+        self.versions = Versions(self)
+        self.json_cache = JSONCache()
+        self.compressor = Compressor()
+        self.cluster_stats = ClusterStats(self)
+        self.ipc = IPCBus(self)
+        self.ipc.register("load_extension", self._ipc_load_extension)
+        self.ipc.register("unload_extension", self._ipc_unload_extension)
+        self.ipc.register("reload_extension", self._ipc_reload_extension)
+        self.ipc.register("stats", self._ipc_stats)
+        self.ipc.register("ping", self._ipc_ping)
+        self.ipc.register("compression_dict", self._ipc_compression_dict)
+        self.ipc.add_invalidation_listener(self.json_cache.invalidate)
 
         super().__init__(*args, **kwargs)
 
@@ -64,24 +105,19 @@ class Obsidion(AutoShardedBot):
             max_connections=10,
         )
         self.redis = aioredis.Redis(connection_pool=pool)
+        # binary values such as serialised models must not be decoded
+        bytes_pool = aioredis.ConnectionPool.from_url(
+            str(get_settings().REDIS_URL), max_connections=10
+        )
+        self.redis_bytes = aioredis.Redis(connection_pool=bytes_pool)
+        await load_dictionary(self.compressor, self.redis_bytes)
         self.db = await asyncpg.create_pool(str(get_settings().DB))
         self._resolver = aiohttp.AsyncResolver()
-        # Use AF_INET as its socket family to prevent HTTPS related
-        # problems both locally and in production.
-        self._connector = aiohttp.TCPConnector(
-            resolver=self._resolver,
-            family=socket.AF_INET,
-        )
+        self.http_clients = HTTPClients(self._resolver, self.rate_limiter)
+        self.http_session = self.http_clients.get("default")
 
-        # timeout
-        self._http_timeout = aiohttp.ClientTimeout(total=2)
-        self._long_http_timeout = aiohttp.ClientTimeout(total=300)
-
-        # Client.login() will call HTTPClient.static_login()
-        # which will create a session using this connector attribute.
-        self.http_session = aiohttp.ClientSession(
-            connector=self._connector, timeout=self._http_timeout
-        )
+        self.cluster_stats.start()
+        await self.ipc.start()
 
         # Load important cogs
         self.add_cog(Events(self))
@@ -93,8 +129,7 @@ class Obsidion(AutoShardedBot):
         # load cogs
         self.load_extension("obsidion.cogs.images")
         self.load_extension("obsidion.cogs.info")
-        # due to bug with slash_command lib
-        # self.load_extension("obsidion.cogs.hypixel")
+        self.load_extension("obsidion.cogs.hypixel")
         self.load_extension("obsidion.cogs.news")
         self.load_extension("obsidion.cogs.fun")
         self.load_extension("obsidion.cogs.minecraft")
@@ -131,12 +166,52 @@ class Obsidion(AutoShardedBot):
             self._shutdown_mode = ExitCodes.RESTART
 
         await self.close()
-        if self.db is not None:
+        sys.exit(self._shutdown_mode)
+
+    async def close(self) -> None:
+        """Close the gateway connections and everything set up in pre-flight.
+
+        This also runs when the process is asked to stop by a signal, so
+        cluster workers clean up without going through :meth:`shutdown`.
+        """
+        if self.is_closed():
+            return
+        await self.scheduler.close()
+        await self.ipc.close()
+        await self.rate_limiter.close()
+        await self.server_pinger.close()
+        await super().close()
+        if getattr(self, "db", None) is not None:
             await self.db.close()
-        if self.redis is not None:
+        if getattr(self, "redis", None) is not None:
             await self.redis.close()
-        await self.http_session.close()
-        sys.exit(self._shutdown_mode)
+        if getattr(self, "redis_bytes", None) is not None:
+            await self.redis_bytes.close()
+        if getattr(self, "http_clients", None) is not None:
+            await self.http_clients.close()
+
+    async def _ipc_load_extension(self, data: Dict[str, Any]) -> None:
+        self.load_extension(data["name"])
+
+    async def _ipc_unload_extension(self, data: Dict[str, Any]) -> None:
+        self.unload_extension(data["name"])
+
+    async def _ipc_reload_extension(self, data: Dict[str, Any]) -> None:
+        self.reload_extension(data["name"])
+
+    async def _ipc_stats(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "shards": sorted(self.shards),
+            "guilds": len(self.guilds),
+            "latency": self.latency,
+            "uptime": str(datetime.utcnow() - self.uptime),
+        }
+
+    async def _ipc_ping(self, data: Dict[str, Any]) -> None:
+        pass
+
+    async def _ipc_compression_dict(self, data: Dict[str, Any]) -> None:
+        await load_dictionary(self.compressor, self.redis_bytes)
 
     async def mojang_player(
         self, user: discord.User, username: Optional[Union[str, UUID]] = None
@@ -154,36 +229,29 @@ class Obsidion(AutoShardedBot):
             _uuid = await self._account_cache.get_account(user)
             if _uuid is None:
                 raise PlayerNotExistError(None)
-            uuid = str(_uuid)
+            query = str(_uuid)
         else:
-            username_key = f"username_{username}"
-            if await self.redis.exists(username_key):
-                uuid = await self.redis.get(username_key)
-            else:
-                uuid = str(username)
-        data: Optional[Dict[str, Any]]
-        key = f"player_{str(uuid)}"
-        if await self.redis.exists(key):
-            data = json.loads(await self.redis.get(key))
-        else:
-            url = f"https://api.ashcon.app/mojang/v2/user/{str(uuid)}"
-            async with self.http_session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                else:
-                    data = None
-            if data is not None:
-                uuid = data["uuid"]
-            key = f"player_{uuid}"
-            await self.redis.set(key, json.dumps(data), px=28800)
+            query = str(username)
+        data = await self.profiles.get(query)
         if data is None:
             raise PlayerNotExistError(str(username))
-        else:
-            uuid = data["uuid"]
-        username_key = f"username_{data['username']}"
-        await self.redis.set(username_key, str(uuid), px=28800)
         return data
 
+    async def resolve_uuids(self, uuids: Iterable[Union[str, UUID]]) -> Dict[str, str]:
+        """Get the usernames of many players at once.
+
+        Cached players are looked up in one round trip, the rest are fetched
+        concurrently.
+
+        Args:
+            uuids (Iterable[Union[str, UUID]]): uuids of the players
+
+        Returns:
+            Dict[str, str]: usernames by uuid, players which could not be
+                found are left out
+        """
+        return await self.profiles.usernames(uuids)
+
     def build_embed(
         self, title: str, description: Optional[str] = None, type: Optional[str] = None
     ):
@@ -216,18 +284,16 @@ class Obsidion(AutoShardedBot):
         params: Optional[Dict[str, Any]] = None,
         px: int = 600,
     ):
-        if await self.redis.exists(key):
-            data = json.loads(await self.redis.get(key))
-        else:
-            async with self.http_session.get(
-                f"{get_settings().API_URL}/{endpoint}",
-                params=params,
-            ) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                else:
-                    data = None
-            await self.redis.set(key, json.dumps(data), px=px)
+        data = await self.read_json(key, MISSING)
+        if data is not MISSING:
+            return data
+        data = await self.fetch_json(
+            key,
+            f"{get_settings().API_URL}/{endpoint}",
+            upstream="api",
+            params=params,
+        )
+        await self.write_json(key, data, px)
         return data
 
     async def get_json(
@@ -237,19 +303,108 @@ class Obsidion(AutoShardedBot):
         params: Optional[Dict[str, Any]] = None,
         px: int = 600,
     ):
-        if await self.redis.exists(key):
-            data = json.loads(await self.redis.get(key))
-        else:
-            async with self.http_session.get(
-                url,
-                params=params,
-                headers={"User-Agent": "Obsidion Discord Bot"},
+        data = await self.read_json(key, MISSING)
+        if data is not MISSING:
+            return data
+        data = await self.fetch_json(
+            key,
+            url,
+            params=params,
+            headers={"User-Agent": "Obsidion Discord Bot"},
+        )
+        await self.write_json(key, data, px)
+        return data
+
+    async def read_json(self, key: str, default: Any = None) -> Any:
+        """Read a cached JSON document.
+
+        Args:
+            key (str): cache key of the document
+            default (Any): returned when the document is not cached or can
+                not be read
+
+        Returns:
+            Any: the decoded document
+        """
+        raw = await self.redis_bytes.get(key)
+        if raw is None:
+            return default
+        try:
+            return self.json_cache.loads(key, raw, self._decode_json)
+        except CompressionError as e:
+            log.debug("Ignoring cached %s: %s", key, e)
+            return default
+
+    async def write_json(self, key: str, data: Any, px: int) -> None:
+        """Cache a JSON document, compressed if it is large.
+
+        Args:
+            key (str): cache key of the document
+            data (Any): the document
+            px (int): milliseconds to cache it for
+        """
+        await self.redis_bytes.set(
+            key, self.compressor.compress(orjson.dumps(data)), px=px
+        )
+
+    def _decode_json(self, raw: Union[str, bytes]) -> Any:
+        if isinstance(raw, str):
+            raw = raw.encode()
+        return orjson.loads(self.compressor.decompress(raw))
+
+    async def fetch_json(
+        self,
+        key: str,
+        url: str,
+        upstream: Optional[str] = None,
+        *,
+        not_found: Any = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Fetch JSON from an upstream, falling back to a stale copy.
+
+        Every successful response is kept under ``stale_{key}`` for a day.
+        When the upstream fails, answers with a server error, its circuit is
+        open or its rate limit does not allow a request in time that copy is
+        returned instead, if there is one.
+
+        Args:
+            key (str): cache key of the response
+            url (str): url to fetch
+            upstream (Optional[str]): name of the upstream serving the url,
+                looked up from the url by default
+            not_found (Any): returned when the upstream answers with a 404
+            **kwargs (Any): passed on to :meth:`HTTPClients.request`
+
+        Raises:
+            UpstreamUnavailableError: the upstream is failing and there is no
+                stale copy
+
+        Returns:
+            Any: the decoded response, ``not_found`` if it was a 404 and None
+                if it was any other client error
+        """
+        stale_key = f"stale_{key}"
+        upstream = upstream or self.http_clients.upstream(url)
+        try:
+            async with self.http_clients.request(
+                "GET", url, upstream=upstream, **kwargs
             ) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
+                status = resp.status
+                if status == 200:
+                    data = await resp.json(loads=orjson.loads)
                 else:
-                    data = None
-            await self.redis.set(key, json.dumps(data), px=px)
+                    data = not_found if status == 404 else None
+            if status >= 500:
+                raise UpstreamUnavailableError(upstream)
+        except (UpstreamUnavailableError, aiohttp.ClientError, asyncio.TimeoutError):
+            stale = await self.read_json(stale_key, MISSING)
+            if stale is MISSING:
+                raise
+            log.info("Serving stale %s", key)
+            return stale
+        if status == 200:
+            await self.write_json(stale_key, data, STALE_PX)
         return data
 
 
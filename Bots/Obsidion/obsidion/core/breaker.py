@@ -0,0 +1,109 @@
+"""Circuit breaking for upstream APIs."""
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from typing import Deque
+from typing import Optional
+
+from .errors import UpstreamUnavailableError
+
+log = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Fail fast while an upstream is down.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    every request fails straight away. Once ``reset_timeout`` has passed a
+    single probe request is let through: if it succeeds the breaker closes
+    again, otherwise it stays open for another ``reset_timeout``.
+
+    The timeout of requests adapts to the upstream as well, it is a multiple
+    of the p99 time to the response headers of recent successful requests,
+    kept between ``min_timeout`` and ``max_timeout``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_timeout: float,
+        min_timeout: float = 0.5,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        window: int = 200,
+    ) -> None:
+        self.name = name
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._timeout = max_timeout
+
+    @property
+    def timeout(self) -> float:
+        """Seconds to wait to connect to the upstream or for the next read."""
+        return self._timeout
+
+    @property
+    def p99(self) -> Optional[float]:
+        """p99 latency of recent successful requests."""
+        if not self._latencies:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[int(len(latencies) * 0.99)]
+
+    def before_request(self) -> None:
+        """Check whether a request may be made.
+
+        Raises:
+            UpstreamUnavailableError: the breaker is open
+        """
+        if self.state == CLOSED:
+            return
+        if (
+            self.state == OPEN
+            and time.monotonic() - self.opened_at >= self.reset_timeout
+        ):
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        raise UpstreamUnavailableError(self.name)
+
+    def after_request(self) -> None:
+        """Let another probe through if a probe ended without an outcome."""
+        self._probing = False
+
+    def record_success(self, latency: float) -> None:
+        """Record a successful request and how long it took."""
+        if self.state != CLOSED:
+            log.info("Circuit of %s closed", self.name)
+        self.state = CLOSED
+        self.failures = 0
+        self._latencies.append(latency)
+        # recalculating on every request would sort the window every time
+        if len(self._latencies) % 20 == 0:
+            p99 = self.p99 or self.max_timeout
+            self._timeout = min(max(p99 * 3, self.min_timeout), self.max_timeout)
+
+    def record_failure(self) -> None:
+        """Record a failed request."""
+        self.failures += 1
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and self.failures >= self.failure_threshold
+        ):
+            log.warning("Circuit of %s opened", self.name)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
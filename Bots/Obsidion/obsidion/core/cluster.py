@@ -0,0 +1,177 @@
+"""Run the shards over several supervised worker processes."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+import sys
+import time
+from multiprocessing.process import BaseProcess
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import aiohttp
+
+from .bot import ExitCodes
+from .config import get_settings
+
+log = logging.getLogger("obsidion.cluster")
+
+# Seconds to wait before restarting a crashed worker, doubled per crash.
+RESTART_BACKOFF = 5
+MAX_RESTART_BACKOFF = 300
+# Seconds a worker gets to close its connections when shutting down.
+SHUTDOWN_TIMEOUT = 30
+
+
+def shard_ranges(shard_count: int, clusters: int) -> List[List[int]]:
+    """Split the shards into contiguous ranges, one per cluster."""
+    size, extra = divmod(shard_count, clusters)
+    ranges = []
+    start = 0
+    for cluster_id in range(clusters):
+        end = start + size + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+async def fetch_shard_count(token: str) -> int:
+    """Get the number of shards Discord recommends for the bot."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v9/gateway/bot",
+            headers={"Authorization": f"Bot {token}"},
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+    return int(data["shards"])
+
+
+def run_worker(
+    cluster_id: int, cluster_count: int, shard_ids: List[int], shard_count: int
+) -> None:
+    """Entry point of a worker process."""
+    from obsidion.__main__ import run_bot
+
+    run_bot(
+        cluster_id=cluster_id,
+        cluster_count=cluster_count,
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+    )
+
+
+class ClusterLauncher:
+    """Start a worker process per cluster and keep them running.
+
+    Workers do not share any memory, everything they need to agree on goes
+    through Redis. A worker exiting with :attr:`ExitCodes.RESTART` is started
+    again straight away, one that crashed is restarted with a backoff and one
+    exiting with :attr:`ExitCodes.SHUTDOWN` shuts the whole cluster down.
+    """
+
+    def __init__(self, clusters: int, shard_count: int) -> None:
+        self.clusters = clusters
+        self.shard_count = shard_count
+        self.ranges = shard_ranges(shard_count, clusters)
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, BaseProcess] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._crashes: Dict[int, int] = {}
+        self._stopping = False
+
+    def start_worker(self, cluster_id: int) -> None:
+        """Start the worker process of a cluster."""
+        shard_ids = self.ranges[cluster_id]
+        worker = self._context.Process(
+            target=run_worker,
+            args=(cluster_id, self.clusters, shard_ids, self.shard_count),
+            name=f"obsidion-cluster-{cluster_id}",
+        )
+        worker.start()
+        self._workers[cluster_id] = worker
+        log.info(
+            "Started cluster %d with shards %d-%d (pid %s)",
+            cluster_id,
+            shard_ids[0],
+            shard_ids[-1],
+            worker.pid,
+        )
+
+    def stop(self, *args: object) -> None:
+        """Ask every worker to shut down."""
+        if self._stopping:
+            return
+        self._stopping = True
+        log.info("Shutting down all clusters")
+        for worker in self._workers.values():
+            if worker.is_alive():
+                worker.terminate()
+
+    def supervise(self, cluster_id: int, worker: BaseProcess) -> None:
+        """Handle a worker which exited."""
+        code = worker.exitcode
+        del self._workers[cluster_id]
+        if code == ExitCodes.SHUTDOWN:
+            log.info("Cluster %d shut down, stopping the cluster", cluster_id)
+            self.stop()
+        elif code == ExitCodes.RESTART:
+            log.info("Restarting cluster %d", cluster_id)
+            self._crashes[cluster_id] = 0
+            self.start_worker(cluster_id)
+        else:
+            crashes = self._crashes.get(cluster_id, 0)
+            delay = min(RESTART_BACKOFF * pow(2, crashes), MAX_RESTART_BACKOFF)
+            self._crashes[cluster_id] = crashes + 1
+            self._restart_at[cluster_id] = time.monotonic() + delay
+            log.error(
+                "Cluster %d exited with code %s, restarting in %ds",
+                cluster_id,
+                code,
+                delay,
+            )
+
+    def run(self) -> int:
+        """Run the clusters until they are shut down.
+
+        Returns:
+            int: exit code for the launcher
+        """
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        for cluster_id in range(self.clusters):
+            self.start_worker(cluster_id)
+
+        while not self._stopping:
+            for cluster_id, worker in list(self._workers.items()):
+                if not worker.is_alive():
+                    self.supervise(cluster_id, worker)
+            now = time.monotonic()
+            for cluster_id, restart_at in list(self._restart_at.items()):
+                if restart_at <= now and not self._stopping:
+                    del self._restart_at[cluster_id]
+                    self.start_worker(cluster_id)
+            time.sleep(1)
+
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for worker in self._workers.values():
+            worker.join(max(deadline - time.monotonic(), 0))
+            if worker.is_alive():
+                log.warning("Killing unresponsive worker %s", worker.name)
+                worker.kill()
+                worker.join()
+        return ExitCodes.SHUTDOWN
+
+
+def launch() -> None:
+    """Launch the clusters configured in the settings."""
+    settings = get_settings()
+    shard_count: Optional[int] = settings.SHARD_COUNT
+    if shard_count is None:
+        shard_count = asyncio.run(fetch_shard_count(settings.DISCORD_TOKEN))
+    clusters = min(settings.CLUSTERS, shard_count)
+    log.info("Launching %d shards over %d clusters", shard_count, clusters)
+    sys.exit(ClusterLauncher(clusters, shard_count).run())
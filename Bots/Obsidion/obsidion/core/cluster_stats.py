@@ -0,0 +1,150 @@
+"""Guild and user counts across every shard process."""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Dict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+# Seconds between publishing the counts of the local shards.
+PUBLISH_INTERVAL = 60
+# Shards which have not published for this long are left out of the totals.
+STALE_AFTER = 3 * PUBLISH_INTERVAL
+
+
+class ClusterTotals:
+    """Totals over every shard."""
+
+    def __init__(self, guilds: int = 0, users: int = 0, shards: int = 0) -> None:
+        self.guilds = guilds
+        self.users = users
+        self.shards = shards
+
+
+class ClusterStats:
+    """Publish per-shard counts to Redis and aggregate them.
+
+    Every process writes the guild and user count of the shards it runs into
+    Redis hashes keyed by shard id. The leader sums those hashes into a
+    single totals hash which everything else reads.
+    """
+
+    GUILDS_KEY = "cluster_shard_guilds"
+    USERS_KEY = "cluster_shard_users"
+    SEEN_KEY = "cluster_shard_seen"
+    TOTALS_KEY = "cluster_totals"
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+
+    def start(self) -> None:
+        """Schedule publishing and aggregating the counts."""
+        self._bot.scheduler.add(
+            "cluster_stats_publish",
+            self.publish,
+            interval=PUBLISH_INTERVAL,
+            leader=False,
+        )
+        self._bot.scheduler.add(
+            "cluster_stats_aggregate", self.aggregate, interval=PUBLISH_INTERVAL
+        )
+
+    def local_counts(self) -> Dict[int, Dict[str, int]]:
+        """Count the guilds and users of the shards run by this process."""
+        counts = {shard_id: {"guilds": 0, "users": 0} for shard_id in self._bot.shards}
+        for guild in self._bot.guilds:
+            shard = counts.setdefault(guild.shard_id, {"guilds": 0, "users": 0})
+            shard["guilds"] += 1
+            shard["users"] += guild.member_count or 0
+        return counts
+
+    async def publish(self) -> None:
+        """Publish the counts of the local shards."""
+        await self._bot.wait_until_ready()
+        counts = self.local_counts()
+        if not counts:
+            return
+        now = time.time()
+        async with self._bot.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                self.GUILDS_KEY,
+                mapping={shard: c["guilds"] for shard, c in counts.items()},
+            )
+            pipe.hset(
+                self.USERS_KEY,
+                mapping={shard: c["users"] for shard, c in counts.items()},
+            )
+            pipe.hset(self.SEEN_KEY, mapping={shard: now for shard in counts})
+            await pipe.execute()
+
+    async def aggregate(self) -> ClusterTotals:
+        """Sum the published counts of every live shard into the totals."""
+        async with self._bot.redis.pipeline(transaction=True) as pipe:
+            pipe.hgetall(self.GUILDS_KEY)
+            pipe.hgetall(self.USERS_KEY)
+            pipe.hgetall(self.SEEN_KEY)
+            guilds, users, seen = await pipe.execute()
+
+        cutoff = time.time() - STALE_AFTER
+        totals = ClusterTotals()
+        stale = []
+        for shard, last_seen in seen.items():
+            if float(last_seen) < cutoff:
+                stale.append(shard)
+                continue
+            totals.shards += 1
+            totals.guilds += int(guilds.get(shard, 0))
+            totals.users += int(users.get(shard, 0))
+
+        if not totals.shards:
+            # nothing published yet, leave the last totals in place
+            return totals
+        async with self._bot.redis.pipeline(transaction=True) as pipe:
+            if stale:
+                # shards which moved or were removed from the cluster
+                pipe.hdel(self.GUILDS_KEY, *stale)
+                pipe.hdel(self.USERS_KEY, *stale)
+                pipe.hdel(self.SEEN_KEY, *stale)
+            pipe.hset(
+                self.TOTALS_KEY,
+                mapping={
+                    "guilds": totals.guilds,
+                    "users": totals.users,
+                    "shards": totals.shards,
+                },
+            )
+            await pipe.execute()
+        return totals
+
+    async def totals(self) -> ClusterTotals:
+        """Get the totals over every shard."""
+        data = await self._bot.redis.hgetall(self.TOTALS_KEY)
+        if not data:
+            totals = await self.aggregate()
+            if totals.shards:
+                return totals
+            counts = self.local_counts().values()
+            return ClusterTotals(
+                sum(c["guilds"] for c in counts),
+                sum(c["users"] for c in counts),
+                len(counts),
+            )
+        return ClusterTotals(
+            int(data["guilds"]), int(data["users"]), int(data["shards"])
+        )
+
+    async def shards(self) -> Dict[int, Dict[str, int]]:
+        """Get the published counts of every shard."""
+        async with self._bot.redis.pipeline(transaction=True) as pipe:
+            pipe.hgetall(self.GUILDS_KEY)
+            pipe.hgetall(self.USERS_KEY)
+            guilds, users = await pipe.execute()
+        return {
+            int(shard): {"guilds": int(count), "users": int(users.get(shard, 0))}
+            for shard, count in guilds.items()
+        }
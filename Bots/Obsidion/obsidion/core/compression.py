@@ -0,0 +1,204 @@
+"""Transparent compression of large cached payloads.
+
+Payloads over a size threshold are compressed with zstd, or zlib when
+zstandard is not installed. Compressed payloads are told apart from plain
+JSON by their magic bytes, which no JSON document starts with, so values
+cached before compression was enabled stay readable.
+"""
+from __future__ import annotations
+
+import logging
+import time
+import zlib
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import TYPE_CHECKING
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+if TYPE_CHECKING:
+    import aioredis
+
+log = logging.getLogger(__name__)
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# zlib streams start with 0x78, ``x`` is never the first byte of JSON.
+ZLIB_MAGIC = b"\x78"
+# Payloads smaller than this many bytes are stored as they are.
+THRESHOLD = 1024
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+DICTIONARY_SIZE = 64 * 1024
+# Redis key holding the id of the current dictionary, each dictionary is
+# stored under ``compression_dict_{id}``.
+DICTIONARY_KEY = "compression_dict"
+
+
+class CompressionError(ValueError):
+    """A payload could not be decompressed."""
+
+
+class CompressionStats:
+    """Running totals of a compressor."""
+
+    def __init__(self) -> None:
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.decompressed = 0
+        self.decompress_time = 0.0
+
+    @property
+    def ratio(self) -> float:
+        """Compressed size as a fraction of the original size."""
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+
+    @property
+    def average_decompress(self) -> float:
+        """Average decompression time in seconds."""
+        return self.decompress_time / self.decompressed if self.decompressed else 0.0
+
+
+class Compressor:
+    """Compress payloads over a threshold.
+
+    With zstd a shared dictionary trained on cached payloads can be used.
+    Every frame records the id of its dictionary, so payloads compressed with
+    an older dictionary stay readable while it is still loaded.
+    """
+
+    def __init__(self, threshold: int = THRESHOLD) -> None:
+        self.threshold = threshold
+        self.stats = CompressionStats()
+        self._dictionaries: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+        self._dictionary: Optional["zstandard.ZstdCompressionDict"] = None
+        self._compressor = self._make_compressor()
+        self._decompressors: Dict[int, "zstandard.ZstdDecompressor"] = {}
+
+    @property
+    def algorithm(self) -> str:
+        """Name of the algorithm used to compress."""
+        return "zstd" if zstandard is not None else "zlib"
+
+    @property
+    def dictionary_id(self) -> Optional[int]:
+        """Id of the dictionary used to compress, None if there is none."""
+        return self._dictionary.dict_id() if self._dictionary is not None else None
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a payload if it is large enough to be worth it."""
+        if len(data) < self.threshold:
+            return data
+        if self._compressor is not None:
+            compressed = self._compressor.compress(data)
+        else:
+            compressed = zlib.compress(data, ZLIB_LEVEL)
+        if len(compressed) >= len(data):
+            return data
+        self.stats.compressed += 1
+        self.stats.bytes_in += len(data)
+        self.stats.bytes_out += len(compressed)
+        return compressed
+
+    def decompress(self, data: bytes) -> bytes:
+        """Get the original payload, which is returned as is if not compressed.
+
+        Raises:
+            CompressionError: the payload is corrupt or its dictionary is not
+                loaded
+        """
+        start = time.perf_counter()
+        try:
+            if data.startswith(ZSTD_MAGIC):
+                result = self._zstd_decompress(data)
+            elif data.startswith(ZLIB_MAGIC):
+                result = zlib.decompress(data)
+            else:
+                return data
+        except zlib.error as e:
+            raise CompressionError(str(e)) from e
+        self.stats.decompressed += 1
+        self.stats.decompress_time += time.perf_counter() - start
+        return result
+
+    def use_dictionary(self, data: bytes) -> int:
+        """Load a dictionary and compress with it from now on.
+
+        Returns:
+            int: id of the dictionary
+        """
+        dictionary = self.add_dictionary(data)
+        self._dictionary = dictionary
+        self._compressor = self._make_compressor()
+        return dictionary.dict_id()
+
+    def add_dictionary(self, data: bytes) -> "zstandard.ZstdCompressionDict":
+        """Load a dictionary to decompress payloads with."""
+        if zstandard is None:
+            raise CompressionError("Dictionaries need zstandard")
+        dictionary = zstandard.ZstdCompressionDict(data)
+        self._dictionaries[dictionary.dict_id()] = dictionary
+        self._decompressors.pop(dictionary.dict_id(), None)
+        return dictionary
+
+    @staticmethod
+    def train(samples: List[bytes], size: int = DICTIONARY_SIZE) -> bytes:
+        """Train a dictionary on sample payloads.
+
+        Args:
+            samples (List[bytes]): uncompressed payloads
+            size (int): size of the dictionary in bytes
+
+        Returns:
+            bytes: the dictionary
+        """
+        if zstandard is None:
+            raise CompressionError("Dictionaries need zstandard")
+        return zstandard.train_dictionary(size, samples).as_bytes()
+
+    def _make_compressor(self) -> Optional["zstandard.ZstdCompressor"]:
+        if zstandard is None:
+            return None
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=self._dictionary)
+
+    def _zstd_decompress(self, data: bytes) -> bytes:
+        if zstandard is None:
+            raise CompressionError("Payload needs zstandard")
+        try:
+            dict_id = zstandard.get_frame_parameters(data).dict_id
+            decompressor = self._decompressors.get(dict_id)
+            if decompressor is None:
+                if dict_id and dict_id not in self._dictionaries:
+                    raise CompressionError(f"Dictionary {dict_id} is not loaded")
+                decompressor = zstandard.ZstdDecompressor(
+                    dict_data=self._dictionaries.get(dict_id)
+                )
+                self._decompressors[dict_id] = decompressor
+            return decompressor.decompress(data)
+        except zstandard.ZstdError as e:
+            raise CompressionError(str(e)) from e
+
+
+async def load_dictionary(compressor: Compressor, redis: aioredis.Redis) -> None:
+    """Load the current dictionary from Redis.
+
+    Payloads compressed with a dictionary which is no longer loaded, after a
+    restart, cannot be read and are treated as cache misses.
+
+    Args:
+        compressor (Compressor): compressor to load it into
+        redis (aioredis.Redis): client without ``decode_responses``
+    """
+    if zstandard is None:
+        return
+    current = await redis.get(DICTIONARY_KEY)
+    if current is None:
+        return
+    data = await redis.get(f"{DICTIONARY_KEY}_{int(current)}")
+    if data is not None:
+        compressor.use_dictionary(data)
+        log.info("Compressing with dictionary %s", int(current))
@@ -58,6 +58,10 @@ class Settings(BaseSettings):
         )
 
     REDIS_URL: RedisDsn
+    # Number of worker processes to split the shards over
+    CLUSTERS: PositiveInt = 1
+    # Total number of shards, fetched from Discord if not set
+    SHARD_COUNT: Optional[PositiveInt] = None
     DEV: bool = False
     COLOR: Color = Color("0x00FF00")
     LOGLEVEL: Optional[str] = "INFO"
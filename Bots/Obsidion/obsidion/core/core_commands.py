@@ -83,6 +83,10 @@ class Core(commands.Cog):
         embed.add_field(name=_("discord.py"), value=dpy_version)
         embed.add_field(name=_("Obsidion version"), value=obsidion_version)
         embed.add_field(name=_("Server Name"), value=get_settings().SERVER_NAME)
+        totals = await self.bot.cluster_stats.totals()
+        embed.add_field(name=_("Servers"), value=f"{totals.guilds:,}")
+        embed.add_field(name=_("Users"), value=f"{totals.users:,}")
+        embed.add_field(name=_("Shards"), value=f"{totals.shards:,}")
 
         embed.set_footer(text=_("Bringing joy for over {} days!").format(days_since))
         embed.timestamp = since
@@ -6,13 +6,16 @@ import asyncio
 import contextlib
 import inspect
 import io
+import json
 import re
 import textwrap
+import time
 import traceback
 import types
 from contextlib import redirect_stdout
 from typing import Any
 from typing import Awaitable
+from typing import Callable
 from typing import Dict
 from typing import Iterator
 from typing import Optional
@@ -20,10 +23,14 @@ from typing import TYPE_CHECKING
 
 import aiohttp
 import discord
+import orjson
 from discord.ext import commands
 from obsidion.core.i18n import cog_i18n
 from obsidion.core.i18n import Translator
 
+from .compression import CompressionError
+from .compression import DICTIONARY_KEY
+from .json_cache import JSONCache
 from .utils.chat_formatting import box
 from .utils.chat_formatting import pagify
 from .utils.predicates import MessagePredicate
@@ -47,50 +54,284 @@ class Dev(commands.Cog):
         self.sessions: Dict[int, bool] = {}
         self.bot = bot
 
+    async def broadcast_extension(
+        self, ctx: commands.Context, op: str, module: str, success: str
+    ) -> None:
+        """Run an extension operation on every cluster and report the result."""
+        replies = await self.bot.ipc.request(op, {"name": f"obsidion.{module}"})
+        errors = [
+            _("Cluster {cluster}: {error}").format(
+                cluster=reply.cluster_id, error=reply.error
+            )
+            for reply in replies.values()
+            if not reply.ok
+        ]
+        missing = self.bot.cluster_count - len(replies)
+        if missing > 0:
+            errors.append(
+                _("{missing} clusters did not reply.").format(missing=missing)
+            )
+        await ctx.reply("\n".join(errors) or success.format(module=module))
+
     @commands.command()
     @commands.is_owner()
     async def load(self, ctx: commands.Context, *, module: str) -> None:
-        """Loads a module."""
-        try:
-            self.bot.load_extension(f"obsidion.{module}")
-        except commands.ExtensionError as e:
-            await ctx.reply(f"{e.__class__.__name__}: {e}")
-        else:
-            await ctx.reply(
-                _("The cog `{module}` has been succesfully loaded").format(
-                    module=module
+        """Loads a module on every cluster."""
+        await self.broadcast_extension(
+            ctx,
+            "load_extension",
+            module,
+            _("The cog `{module}` has been succesfully loaded"),
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def unload(self, ctx: commands.Context, *, module: str) -> None:
+        """Unloads a module on every cluster."""
+        await self.broadcast_extension(
+            ctx,
+            "unload_extension",
+            module,
+            _("The cog `{module}` has been succesfully unloaded"),
+        )
+
+    @commands.command(name="reload")
+    @commands.is_owner()
+    async def _reload(self, ctx: commands.Context, *, module: str) -> None:
+        """Reloads a module on every cluster."""
+        await self.broadcast_extension(
+            ctx,
+            "reload_extension",
+            module,
+            _("The cog `{module}` has been succesfully reloaded"),
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def clusters(self, ctx: commands.Context) -> None:
+        """Show the state of every cluster."""
+        replies = await self.bot.ipc.request("stats")
+        lines = []
+        for cluster_id in range(self.bot.cluster_count):
+            reply = replies.get(cluster_id)
+            if reply is None:
+                lines.append(f"cluster {cluster_id}: no reply")
+            elif not reply.ok:
+                lines.append(f"cluster {cluster_id}: {reply.error}")
+            else:
+                stats = reply.data
+                assert stats is not None  # noqa: S101
+                lines.append(
+                    f"cluster {cluster_id}: shards {stats['shards']}, "
+                    f"{stats['guilds']:,} guilds, "
+                    f"{stats['latency'] * 1000:.0f}ms, up {stats['uptime']}"
                 )
+        await send_interactive(ctx, self.get_pages("\n".join(lines)), "yaml")
+
+    @commands.command()
+    @commands.is_owner()
+    async def ipcping(self, ctx: commands.Context, rounds: int = 20) -> None:
+        """Measure the round trip time of requests to every cluster."""
+        timings = []
+        for _round in range(rounds):
+            start = time.perf_counter()
+            replies = await self.bot.ipc.request("ping")
+            if len(replies) == self.bot.cluster_count:
+                timings.append((time.perf_counter() - start) * 1000)
+        if not timings:
+            await ctx.reply(_("No round trip completed."))
+            return
+        timings.sort()
+        await ctx.reply(
+            box(
+                f"rounds: {len(timings)}/{rounds}\n"
+                f"min: {timings[0]:.2f}ms\n"
+                f"p50: {timings[len(timings) // 2]:.2f}ms\n"
+                f"p99: {timings[int(len(timings) * 0.99)]:.2f}ms\n"
+                f"max: {timings[-1]:.2f}ms",
+                lang="yaml",
             )
+        )
 
     @commands.command()
     @commands.is_owner()
-    async def unload(self, ctx: commands.Context, *, module: str) -> None:
-        """Unloads a module."""
+    async def tasks(self, ctx: commands.Context) -> None:
+        """Show runtime metrics of the scheduled background tasks."""
+        lines = []
+        for name, stats in self.bot.scheduler.stats().items():
+            last_run = stats.last_run.strftime("%H:%M:%S") if stats.last_run else "-"
+            lines.append(
+                f"{name}: {stats.runs} runs, {stats.failures} failed, "
+                f"{stats.catch_ups} caught up, last {last_run} "
+                f"({stats.last_duration:.2f}s), avg {stats.average_duration:.2f}s"
+            )
+        await send_interactive(
+            ctx, self.get_pages("\n".join(lines) or _("No tasks scheduled.")), "yaml"
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def shards(self, ctx: commands.Context) -> None:
+        """Show the guild and user counts published by every shard."""
+        lines = [
+            f"shard {shard}: {counts['guilds']:,} guilds, {counts['users']:,} users"
+            for shard, counts in sorted((await self.bot.cluster_stats.shards()).items())
+        ]
+        totals = await self.bot.cluster_stats.totals()
+        lines.append(
+            f"total: {totals.guilds:,} guilds, {totals.users:,} users, "
+            f"{totals.shards} shards"
+        )
+        await send_interactive(ctx, self.get_pages("\n".join(lines)), "yaml")
+
+    @commands.command()
+    @commands.is_owner()
+    async def pools(self, ctx: commands.Context) -> None:
+        """Show the utilisation of the HTTP connection pools."""
+        lines = [
+            f"{name}: {stats.in_use}/{stats.limit} in use "
+            f"({stats.utilisation:.0%}), {stats.idle} idle"
+            for name, stats in self.bot.http_clients.stats().items()
+        ]
+        await send_interactive(
+            ctx, self.get_pages("\n".join(lines) or _("No pools open.")), "yaml"
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def breakers(self, ctx: commands.Context) -> None:
+        """Show the circuit breaker of every upstream."""
+        lines = []
+        for name, breaker in self.bot.http_clients.breakers().items():
+            p99 = breaker.p99
+            lines.append(
+                f"{name}: {breaker.state}, {breaker.failures} failures, "
+                f"timeout {breaker.timeout:.2f}s, "
+                f"p99 {'-' if p99 is None else f'{p99:.3f}s'}"
+            )
+        await send_interactive(
+            ctx, self.get_pages("\n".join(lines) or _("No requests made.")), "yaml"
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def jsonbench(
+        self, ctx: commands.Context, key: str = "versions", rounds: int = 100
+    ) -> None:
+        """Compare the ways of decoding a cached JSON document."""
+        raw = await self.bot.redis_bytes.get(key)
+        if raw is None:
+            await ctx.send(_("Nothing is cached under that key."))
+            return
         try:
-            self.bot.unload_extension(f"obsidion.{module}")
-        except commands.ExtensionError as e:
-            await ctx.reply(f"{e.__class__.__name__}: {e}")
-        else:
-            await ctx.reply(
-                _("The cog `{module}` has been succesfully unloaded").format(
-                    module=module
-                )
+            raw = self.bot.compressor.decompress(raw)
+        except CompressionError as e:
+            await ctx.send(
+                _("The cached payload could not be read: {error}").format(error=e)
             )
+            return
+        cache = JSONCache()
+        methods: Dict[str, Callable[[bytes], Any]] = {
+            "json": json.loads,
+            "orjson": orjson.loads,
+            "cache": lambda payload: cache.loads(key, payload),
+        }
+        lines = [f"{key}: {len(raw)} bytes"]
+        for name, method in methods.items():
+            # fresh copies, like payloads read from redis on every call
+            payloads = [bytes(bytearray(raw)) for _round in range(rounds)]
+            start = time.process_time()
+            for payload in payloads:
+                method(payload)
+            elapsed = (time.process_time() - start) / rounds
+            lines.append(f"{name}: {elapsed * 1000000:.1f}us CPU per decode")
+        await ctx.send(box("\n".join(lines), "yaml"))
 
-    @commands.command(name="reload")
+    @commands.command()
     @commands.is_owner()
-    async def _reload(self, ctx: commands.Context, *, module: str) -> None:
-        """Reloads a module."""
+    async def compression(
+        self, ctx: commands.Context, pattern: str = "*", sample: int = 200
+    ) -> None:
+        """Show how well cached payloads compress and what they cost to read."""
+        compressor = self.bot.compressor
+        redis = self.bot.redis_bytes
+        keys = []
+        async for key in redis.scan_iter(match=pattern, count=500):
+            keys.append(key)
+            if len(keys) >= sample:
+                break
+        stored = original = memory = compressed = 0
+        decode_time = 0.0
+        for key in keys:
+            if await redis.type(key) != b"string":
+                continue
+            data = await redis.get(key)
+            if data is None:
+                continue
+            start = time.perf_counter()
+            try:
+                payload = compressor.decompress(data)
+            except CompressionError:
+                continue
+            decode_time += time.perf_counter() - start
+            compressed += payload is not data
+            stored += len(data)
+            original += len(payload)
+            memory += await redis.memory_usage(key) or 0
+        stats = compressor.stats
+        lines = [
+            f"algorithm: {compressor.algorithm}, "
+            f"dictionary: {compressor.dictionary_id or '-'}",
+            f"sampled: {len(keys)} keys, {compressed} compressed",
+            f"payloads: {original} bytes, stored as {stored} bytes",
+            f"redis memory: {memory} bytes",
+            f"decode: {decode_time * 1000000 / max(len(keys), 1):.1f}us per key",
+            f"since start: {stats.compressed} compressed at "
+            f"{stats.ratio:.2f}, {stats.average_decompress * 1000000:.1f}us "
+            f"per decompression",
+        ]
+        await ctx.send(box("\n".join(lines), "yaml"))
+
+    @commands.command()
+    @commands.is_owner()
+    async def traindict(
+        self, ctx: commands.Context, pattern: str = "*", sample: int = 1000
+    ) -> None:
+        """Train a compression dictionary on cached payloads and use it."""
+        compressor = self.bot.compressor
+        redis = self.bot.redis_bytes
+        samples = []
+        async for key in redis.scan_iter(match=pattern, count=500):
+            if await redis.type(key) != b"string":
+                continue
+            data = await redis.get(key)
+            if data is None:
+                continue
+            try:
+                payload = compressor.decompress(data)
+            except CompressionError:
+                continue
+            # only JSON documents, images and the like do not share anything
+            if payload[:1] in (b"{", b"["):
+                samples.append(payload)
+            if len(samples) >= sample:
+                break
         try:
-            self.bot.reload_extension(f"obsidion.{module}")
-        except commands.ExtensionError as e:
-            await ctx.reply(f"{e.__class__.__name__}: {e}")
-        else:
-            await ctx.reply(
-                _("The cog `{module}` has been succesfully reloaded").format(
-                    module=module
-                )
+            dictionary = await asyncio.get_running_loop().run_in_executor(
+                None, compressor.train, samples
+            )
+        except Exception as e:
+            await ctx.send(_("Unable to train a dictionary: {error}").format(error=e))
+            return
+        dict_id = compressor.use_dictionary(dictionary)
+        await redis.set(f"{DICTIONARY_KEY}_{dict_id}", dictionary)
+        await redis.set(DICTIONARY_KEY, dict_id)
+        await self.bot.ipc.publish("compression_dict")
+        await ctx.send(
+            _("Trained dictionary {id} on {count} payloads.").format(
+                id=dict_id, count=len(samples)
             )
+        )
 
     @staticmethod
     def async_compile(source, filename, mode: str) -> Any:
@@ -26,3 +26,11 @@ class ServerUnavailableError(Exception):
     def __init__(self, name: str, *args: object) -> None:
         self.name = name
         super().__init__(*args)
+
+
+class UpstreamUnavailableError(Exception):
+    """An upstream API is failing and is not called until it recovers."""
+
+    def __init__(self, name: str, *args: object) -> None:
+        self.name = name
+        super().__init__(*args)
@@ -16,6 +16,7 @@ from .errors import NotFoundError
 from .errors import PlayerNotExistError
 from .errors import ProvideServerError
 from .errors import ServerUnavailableError
+from .errors import UpstreamUnavailableError
 from .i18n import cog_i18n
 from .i18n import set_contextual_locales_from_guild
 from .i18n import Translator
@@ -290,6 +291,20 @@ class Events(commands.Cog):
             await self.handle(ctx, embed=embed)
             return
 
+        elif isinstance(error.__cause__, UpstreamUnavailableError) or isinstance(
+            error, UpstreamUnavailableError
+        ):
+            embed = self.bot.build_embed(
+                title=_("API unavailable!"),
+                description=_(
+                    "The api we use is having problems at the moment, please "
+                    "try again in a minute."
+                ),
+                type="error",
+            )
+            await self.handle(ctx, embed=embed)
+            return
+
         elif (
             isinstance(error.__cause__, asyncio.TimeoutError)
             or type(error) == asyncio.TimeoutError
@@ -0,0 +1,125 @@
+"""Persistent change detection for upstream feeds."""
+from __future__ import annotations
+
+import logging
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+import aioredis
+
+log = logging.getLogger(__name__)
+
+# Removes ids from the seen set and lowers the watermark to the oldest of
+# them, so the next diff reaches them again.
+FORGET_SCRIPT = """
+local lowest = nil
+for _, id in ipairs(ARGV) do
+    local score = tonumber(redis.call("ZSCORE", KEYS[1], id))
+    if score ~= nil then
+        redis.call("ZREM", KEYS[1], id)
+        if lowest == nil or score < lowest then
+            lowest = score
+        end
+    end
+end
+local watermark = tonumber(redis.call("GET", KEYS[2]))
+if lowest ~= nil and watermark ~= nil and lowest < watermark then
+    redis.call("SET", KEYS[2], tostring(lowest))
+end
+return 0
+"""
+
+
+class FeedDiff:
+    """Find the items of a feed which have not been seen before.
+
+    Seen item ids are kept in a Redis sorted set scored by their publish
+    time, next to a watermark holding the newest score seen so far. Both
+    survive restarts and are shared by every process, and as an item is only
+    reported by the call which manages to add it to the set it is emitted
+    exactly once.
+    """
+
+    def __init__(self, redis: aioredis.Redis, name: str, max_size: int = 500) -> None:
+        """Init.
+
+        Args:
+            redis (aioredis.Redis): redis connection shared by all processes
+            name (str): name of the feed
+            max_size (int): number of seen ids to remember
+        """
+        self._redis = redis
+        self.name = name
+        self.max_size = max_size
+        self._seen_key = f"feed_{name}_seen"
+        self._watermark_key = f"feed_{name}_watermark"
+
+    async def diff(self, items: Iterable[Tuple[str, float]]) -> List[str]:
+        """Work out which items are new since the last call.
+
+        The items have to be ordered newest first. They are consumed lazily
+        and only up to the first one older than the watermark, so a lazy
+        iterable keeps the cost proportional to the number of new items.
+
+        The first call for a feed only records the current items, so
+        existing posts are not announced when a feed is set up.
+
+        Args:
+            items (Iterable[Tuple[str, float]]): ``(id, timestamp)`` pairs
+
+        Returns:
+            List[str]: ids of the new items, oldest first
+        """
+        watermark = await self._redis.get(self._watermark_key)
+        if watermark is None:
+            seed = dict(items)
+            if seed:
+                async with self._redis.pipeline(transaction=True) as pipe:
+                    pipe.zadd(self._seen_key, seed)
+                    pipe.set(self._watermark_key, max(seed.values()))
+                    await pipe.execute()
+                log.info("Seeded feed %s with %d items", self.name, len(seed))
+            return []
+
+        newest = float(watermark)
+        candidates: List[Tuple[str, float]] = []
+        for item_id, score in items:
+            if score < newest:
+                break
+            candidates.append((item_id, score))
+        if not candidates:
+            return []
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for item_id, score in candidates:
+                pipe.zadd(self._seen_key, {item_id: score}, nx=True)
+            added = await pipe.execute()
+
+        latest = max(score for _, score in candidates)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            if latest > newest:
+                pipe.set(self._watermark_key, latest)
+            pipe.zremrangebyrank(self._seen_key, 0, -self.max_size - 1)
+            await pipe.execute()
+
+        return [
+            item_id
+            for (item_id, _), new in zip(reversed(candidates), reversed(added))
+            if new
+        ]
+
+    async def forget(self, item_ids: Iterable[str]) -> None:
+        """Report items as new again on the next call.
+
+        Used when an item could not be handled after :meth:`diff` reported
+        it, so it is retried rather than lost.
+
+        Args:
+            item_ids (Iterable[str]): ids of the items
+        """
+        item_ids = list(item_ids)
+        if item_ids:
+            await self._redis.eval(
+                FORGET_SCRIPT, 2, self._seen_key, self._watermark_key, *item_ids
+            )
@@ -0,0 +1,234 @@
+"""HTTP connection pools per upstream."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import socket
+import time
+from typing import Any
+from typing import AsyncIterator
+from typing import Dict
+from typing import Optional
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .breaker import CircuitBreaker
+from .config import get_settings
+
+if TYPE_CHECKING:
+    from .ratelimit import RateLimiter
+
+log = logging.getLogger(__name__)
+
+
+class UpstreamProfile:
+    """Connection pool and timeout settings of an upstream."""
+
+    def __init__(
+        self,
+        limit: int,
+        keepalive_timeout: float,
+        timeout: float,
+        dns_ttl: int = 300,
+    ) -> None:
+        """Init.
+
+        Args:
+            limit (int): maximum number of open connections
+            keepalive_timeout (float): seconds to keep idle connections open
+            timeout (float): maximum seconds before a request is given up
+            dns_ttl (int): seconds to cache resolved addresses for
+        """
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.dns_ttl = dns_ttl
+
+
+PROFILES = {
+    "api": UpstreamProfile(limit=50, keepalive_timeout=30, timeout=2),
+    "ashcon": UpstreamProfile(limit=30, keepalive_timeout=30, timeout=2),
+    "mojang": UpstreamProfile(limit=10, keepalive_timeout=60, timeout=300),
+    "minecraft_net": UpstreamProfile(limit=10, keepalive_timeout=30, timeout=10),
+    "fandom": UpstreamProfile(limit=10, keepalive_timeout=15, timeout=5),
+    "textures": UpstreamProfile(limit=20, keepalive_timeout=30, timeout=5),
+    "botlists": UpstreamProfile(limit=10, keepalive_timeout=5, timeout=10),
+    "default": UpstreamProfile(limit=20, keepalive_timeout=15, timeout=2),
+}
+
+HOSTS = {
+    "api.ashcon.app": "ashcon",
+    "launchermeta.mojang.com": "mojang",
+    "api.mojang.com": "mojang",
+    "www.minecraft.net": "minecraft_net",
+    "minecraft.net": "minecraft_net",
+    "minecraft.fandom.com": "fandom",
+    "textures.minecraft.net": "textures",
+}
+
+
+class PoolStats:
+    """Utilisation of a connection pool."""
+
+    def __init__(self, limit: int, in_use: int, idle: int) -> None:
+        self.limit = limit
+        self.in_use = in_use
+        self.idle = idle
+
+    @property
+    def utilisation(self) -> float:
+        """Fraction of the pool in use."""
+        return self.in_use / self.limit if self.limit else 0.0
+
+
+class HTTPClients:
+    """A client session per upstream.
+
+    Each upstream gets its own connector, so a slow upstream can only use up
+    the sockets of its own pool instead of starving every other one.
+    """
+
+    def __init__(
+        self,
+        resolver: Optional[aiohttp.AsyncResolver] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        """Init.
+
+        Args:
+            resolver (Optional[aiohttp.AsyncResolver]): resolver of every
+                connector
+            rate_limiter (Optional[RateLimiter]): limits the requests made to
+                each upstream
+        """
+        self._resolver = resolver
+        self._rate_limiter = rate_limiter
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._hosts = dict(HOSTS)
+        api_host = urlparse(str(get_settings().API_URL)).hostname
+        if api_host is not None:
+            self._hosts[api_host] = "api"
+
+    def get(self, name: str) -> aiohttp.ClientSession:
+        """Get the session of an upstream by name."""
+        session = self._sessions.get(name)
+        if session is None or session.closed:
+            profile = PROFILES[name]
+            # Use AF_INET as its socket family to prevent HTTPS related
+            # problems both locally and in production.
+            connector = aiohttp.TCPConnector(
+                resolver=self._resolver,
+                family=socket.AF_INET,
+                limit=profile.limit,
+                limit_per_host=profile.limit,
+                keepalive_timeout=profile.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=profile.dns_ttl,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=profile.timeout),
+            )
+            self._sessions[name] = session
+        return session
+
+    def upstream(self, url: str) -> str:
+        """Get the name of the upstream serving a url."""
+        return self._hosts.get(urlparse(url).hostname or "", "default")
+
+    def for_url(self, url: str) -> aiohttp.ClientSession:
+        """Get the session of the upstream serving a url."""
+        return self.get(self.upstream(url))
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        """Get the circuit breaker of an upstream by name."""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, max_timeout=PROFILES[name].timeout)
+            self._breakers[name] = breaker
+        return breaker
+
+    def breakers(self) -> Dict[str, CircuitBreaker]:
+        """Get the circuit breakers of every upstream used so far."""
+        return dict(self._breakers)
+
+    @contextlib.asynccontextmanager
+    async def request(
+        self, method: str, url: str, *, upstream: Optional[str] = None, **kwargs: Any
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Make a request through the circuit breaker of its upstream.
+
+        Server errors, connection errors and timeouts count as failures, any
+        other response means the upstream is up. The rate limit of the
+        upstream is only waited for once the breaker allows the request, so
+        requests failing fast do not use up tokens.
+
+        Args:
+            method (str): HTTP method
+            url (str): url to request
+            upstream (Optional[str]): name of the upstream, looked up from
+                the url by default
+            **kwargs (Any): passed on to :meth:`aiohttp.ClientSession.request`
+
+        Raises:
+            UpstreamUnavailableError: the circuit of the upstream is open
+            asyncio.TimeoutError: the rate limit did not allow the request in
+                time, or the request timed out
+        """
+        name = upstream or self.upstream(url)
+        breaker = self.breaker(name)
+        breaker.before_request()
+        # the adaptive timeout is measured up to the headers, it bounds each
+        # step of a request and not reading a body which may be large
+        kwargs.setdefault(
+            "timeout",
+            aiohttp.ClientTimeout(
+                total=PROFILES[name].timeout,
+                sock_connect=breaker.timeout,
+                sock_read=breaker.timeout,
+            ),
+        )
+        try:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire(name)
+            start = time.perf_counter()
+            try:
+                async with self.get(name).request(method, url, **kwargs) as resp:
+                    if resp.status >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success(time.perf_counter() - start)
+                    yield resp
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                breaker.record_failure()
+                raise
+        finally:
+            breaker.after_request()
+
+    def stats(self) -> Dict[str, PoolStats]:
+        """Get the utilisation of every open pool."""
+        stats = {}
+        for name, session in self._sessions.items():
+            connector = session.connector
+            if connector is None or connector.closed:
+                continue
+            # aiohttp does not expose pool usage publicly
+            stats[name] = PoolStats(
+                connector.limit,
+                len(connector._acquired),  # type: ignore[attr-defined]
+                sum(
+                    len(conns)
+                    for conns in connector._conns.values()  # type: ignore[attr-defined]
+                ),
+            )
+        return stats
+
+    async def close(self) -> None:
+        """Close every session."""
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
@@ -0,0 +1,205 @@
+"""Messaging between the cluster processes."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+import aioredis
+
+if TYPE_CHECKING:
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class IPCReply:
+    """The reply of a single cluster to a request."""
+
+    def __init__(
+        self, cluster_id: int, ok: bool, data: Any = None, error: Optional[str] = None
+    ) -> None:
+        self.cluster_id = cluster_id
+        self.ok = ok
+        self.data = data
+        self.error = error
+
+
+class _PendingRequest:
+    def __init__(self, expected: int) -> None:
+        self.expected = expected
+        self.replies: Dict[int, IPCReply] = {}
+        self.done = asyncio.Event()
+
+
+class IPCBus:
+    """Broadcast operations to every cluster over Redis pub/sub.
+
+    Every process subscribes to a shared broadcast channel and to a reply
+    channel of its own. A request is run by every cluster, including the
+    one which sent it, and the replies are gathered until all clusters have
+    answered or the deadline passes.
+    """
+
+    BROADCAST_CHANNEL = "ipc_broadcast"
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+        self._handlers: Dict[str, Handler] = {}
+        self._invalidation_listeners: List[Callable[[List[str]], None]] = []
+        self._pending: Dict[str, _PendingRequest] = {}
+        self._reply_channel = f"ipc_reply_{bot.cluster_id}_{uuid4().hex}"
+        self._pubsub: Optional[aioredis.client.PubSub] = None
+        self._listener: Optional[asyncio.Task] = None
+        # operations being handled, so their tasks are not garbage collected
+        self._handling: Set[asyncio.Task] = set()
+        self.register("invalidate", self._invalidate)
+
+    async def start(self) -> None:
+        """Subscribe to the bus and start handling messages."""
+        self._pubsub = self._bot.redis.pubsub()
+        await self._pubsub.subscribe(self.BROADCAST_CHANNEL, self._reply_channel)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        """Stop handling messages."""
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+        for task in list(self._handling):
+            task.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.close()
+
+    def register(self, op: str, handler: Handler) -> None:
+        """Register the coroutine function which handles an operation.
+
+        The handler is passed the request data and its return value, which has
+        to be JSON serialisable, is sent back as the reply.
+        """
+        self._handlers[op] = handler
+
+    def add_invalidation_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """Call ``listener`` with the keys of every cache invalidation."""
+        self._invalidation_listeners.append(listener)
+
+    async def request(
+        self, op: str, data: Optional[Dict[str, Any]] = None, timeout: float = 5
+    ) -> Dict[int, IPCReply]:
+        """Run an operation on every cluster.
+
+        Args:
+            op (str): name of the operation
+            data (Optional[Dict[str, Any]]): JSON serialisable request data
+            timeout (float): seconds to wait for the replies
+
+        Returns:
+            Dict[int, IPCReply]: replies received before the deadline, by
+                cluster id
+        """
+        request_id = uuid4().hex
+        pending = _PendingRequest(self._bot.cluster_count)
+        self._pending[request_id] = pending
+        try:
+            await self._publish(op, data, request_id)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(pending.done.wait(), timeout)
+        finally:
+            del self._pending[request_id]
+        if len(pending.replies) < pending.expected:
+            log.warning(
+                "Only %d of %d clusters replied to %s",
+                len(pending.replies),
+                pending.expected,
+                op,
+            )
+        return pending.replies
+
+    async def publish(self, op: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Run an operation on every cluster without waiting for replies."""
+        await self._publish(op, data, None)
+
+    async def invalidate(self, keys: Iterable[str]) -> None:
+        """Tell every cluster to drop its local copies of cache keys."""
+        await self.publish("invalidate", {"keys": list(keys)})
+
+    async def _publish(
+        self, op: str, data: Optional[Dict[str, Any]], request_id: Optional[str]
+    ) -> None:
+        message = {
+            "op": op,
+            "data": data or {},
+            "id": request_id,
+            "reply_to": self._reply_channel if request_id else None,
+        }
+        await self._bot.redis.publish(self.BROADCAST_CHANNEL, json.dumps(message))
+
+    async def _listen(self) -> None:
+        assert self._pubsub is not None  # noqa: S101
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1
+                )
+            except (aioredis.RedisError, OSError) as e:
+                log.warning("IPC bus connection error: %s", e)
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            try:
+                payload = json.loads(message["data"])
+            except ValueError:
+                continue
+            if message["channel"] == self.BROADCAST_CHANNEL:
+                task = asyncio.create_task(self._handle(payload))
+                self._handling.add(task)
+                task.add_done_callback(self._handling.discard)
+            else:
+                self._receive(payload)
+
+    async def _handle(self, payload: Dict[str, Any]) -> None:
+        handler = self._handlers.get(payload["op"])
+        if handler is None:
+            reply = {"ok": False, "error": f"Unknown operation {payload['op']}"}
+        else:
+            try:
+                reply = {"ok": True, "data": await handler(payload["data"])}
+            except Exception as e:
+                log.exception("IPC operation %s failed", payload["op"], exc_info=e)
+                reply = {"ok": False, "error": f"{e.__class__.__name__}: {e}"}
+        if payload["reply_to"] is not None:
+            reply.update(id=payload["id"], cluster_id=self._bot.cluster_id)
+            await self._bot.redis.publish(payload["reply_to"], json.dumps(reply))
+
+    def _receive(self, payload: Dict[str, Any]) -> None:
+        pending = self._pending.get(payload["id"])
+        if pending is None:
+            # arrived after the deadline
+            return
+        pending.replies[payload["cluster_id"]] = IPCReply(
+            payload["cluster_id"],
+            payload["ok"],
+            payload.get("data"),
+            payload.get("error"),
+        )
+        if len(pending.replies) >= pending.expected:
+            pending.done.set()
+
+    async def _invalidate(self, data: Dict[str, Any]) -> None:
+        for listener in self._invalidation_listeners:
+            listener(data["keys"])
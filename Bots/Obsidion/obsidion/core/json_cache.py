@@ -0,0 +1,71 @@
+"""Process-local cache of decoded JSON documents."""
+import logging
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Tuple
+from typing import Union
+
+import orjson
+
+log = logging.getLogger(__name__)
+
+# Number of documents kept decoded.
+MAX_DOCUMENTS = 256
+
+
+class JSONCache:
+    """Decoded JSON documents by Redis key.
+
+    A document is only decoded again when the payload stored under its key
+    changes. The payload it was decoded from is kept to tell, comparing it is
+    a memcmp, far cheaper than hashing or decoding it. Decoded documents are
+    shared by every caller and must not be modified.
+    """
+
+    def __init__(self, max_documents: int = MAX_DOCUMENTS) -> None:
+        self.max_documents = max_documents
+        self._documents: "OrderedDict[str, Tuple[Union[str, bytes], Any]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def loads(
+        self,
+        key: str,
+        raw: Union[str, bytes],
+        decode: Callable[[Union[str, bytes]], Any] = orjson.loads,
+    ) -> Any:
+        """Decode the payload stored under a key.
+
+        Args:
+            key (str): redis key the payload was read from
+            raw (Union[str, bytes]): the payload
+            decode (Callable[[Union[str, bytes]], Any]): decodes the payload
+                when it is not cached
+
+        Returns:
+            Any: the decoded document
+        """
+        entry = self._documents.get(key)
+        if entry is not None and entry[0] == raw:
+            self._documents.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = decode(raw)
+        self._documents[key] = (raw, value)
+        self._documents.move_to_end(key)
+        if len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False)
+        return value
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        """Drop the documents of keys."""
+        for key in keys:
+            self._documents.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._documents)
@@ -0,0 +1,71 @@
+"""Leader election through Redis leases."""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+from uuid import uuid4
+
+import aioredis
+
+log = logging.getLogger(__name__)
+
+# Only extend or delete the lease if we are still the one holding it.
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLease:
+    """A named lease which at most one process can hold at a time.
+
+    The holder has to call :meth:`acquire` again before ``ttl`` runs out to
+    keep the lease, otherwise another process is free to take it over.
+    """
+
+    def __init__(self, redis: aioredis.Redis, name: str, ttl: int = 30000) -> None:
+        """Init.
+
+        Args:
+            redis (aioredis.Redis): redis connection shared by all processes
+            name (str): name of the lease
+            ttl (int): time in milliseconds before an unrenewed lease expires
+        """
+        self._redis = redis
+        self.name = name
+        self.key = f"lease_{name}"
+        self.ttl = ttl
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex}"
+        self.held = False
+
+    async def acquire(self) -> bool:
+        """Acquire the lease or renew it if it is already held.
+
+        Returns:
+            bool: whether this process holds the lease
+        """
+        if await self._redis.set(self.key, self.token, nx=True, px=self.ttl):
+            held = True
+        else:
+            held = bool(
+                await self._redis.eval(_RENEW_SCRIPT, 1, self.key, self.token, self.ttl)
+            )
+        if held != self.held:
+            log.info("%s lease %s", "Acquired" if held else "Lost", self.name)
+        self.held = held
+        return held
+
+    async def release(self) -> None:
+        """Give up the lease so another process can take over straight away."""
+        if self.held:
+            await self._redis.eval(_RELEASE_SCRIPT, 1, self.key, self.token)
+        self.held = False
@@ -0,0 +1,243 @@
+"""Cache of Minecraft player profiles."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import TYPE_CHECKING
+from typing import Union
+from uuid import UUID
+
+import orjson
+
+if TYPE_CHECKING:
+    import aioredis
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+# Milliseconds to keep each part of a profile for. The uuid, name history and
+# creation date never change and the name index is checked on every lookup,
+# only the textures have to be refreshed regularly.
+PROFILE_PX = 30 * 24 * 60 * 60 * 1000
+NAME_PX = 7 * 24 * 60 * 60 * 1000
+TEXTURES_PX = 10 * 60 * 1000
+MISSING_PX = 60 * 1000
+# Number of profiles fetched concurrently.
+FETCH_CONCURRENCY = 10
+
+# Returned by fetches for players which do not exist.
+NOT_FOUND = object()
+
+# Deletes a name index entry only if it still points to the given uuid.
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def _parse_uuid(query: str) -> Optional[str]:
+    try:
+        return str(UUID(query))
+    except ValueError:
+        return None
+
+
+class ProfileStore:
+    """Player profiles from ashcon, cached by uuid and by name.
+
+    A profile is split over ``profile_{uuid}``, a hash of the fields which
+    rarely change, and ``profile_{uuid}_textures`` which expires quickly and
+    is refreshed on its own.
+    ``profile_name_{name}`` maps case folded names to uuids. When a player
+    changes their name the index entries of their old names are released, and
+    an entry pointing to a profile which no longer has that name is ignored.
+    """
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+
+    async def get(self, query: Union[str, UUID]) -> Optional[Dict[str, Any]]:
+        """Get the profile of a player by uuid or name.
+
+        Args:
+            query (Union[str, UUID]): uuid or name of the player
+
+        Returns:
+            Optional[Dict[str, Any]]: the profile as returned by ashcon, None
+                if there is no such player
+        """
+        query = str(query)
+        uuid = _parse_uuid(query)
+        name = None if uuid is not None else query.casefold()
+        if uuid is None:
+            uuid = await self._bot.redis.get(f"profile_name_{name}")
+        cached = None
+        if uuid is not None:
+            cached = await self._cached(uuid)
+            if cached is not None and (
+                name is not None and cached["username"].casefold() != name
+            ):
+                cached = None
+        if cached is not None:
+            if "textures" in cached:
+                return cached
+            # only the textures expired, the rest of the profile is kept
+            profile = await self._fetch(cached["uuid"])
+            if profile is None:
+                return None
+            if profile["username"] == cached["username"]:
+                await self._bot.redis.set(
+                    f"profile_{profile['uuid']}_textures",
+                    orjson.dumps(profile.get("textures")),
+                    px=TEXTURES_PX,
+                )
+            else:
+                await self.store(profile)
+            return profile
+
+        if await self._bot.redis.exists(f"profile_missing_{name or uuid}"):
+            return None
+        profile = await self._fetch(name or uuid)
+        if profile is not None:
+            await self.store(profile)
+        return profile
+
+    async def usernames(self, uuids: Iterable[Union[str, UUID]]) -> Dict[str, str]:
+        """Get the current names of many players at once.
+
+        Cached names are read in one round trip, the rest of the profiles are
+        fetched concurrently and stored together in one more.
+
+        Args:
+            uuids (Iterable[Union[str, UUID]]): uuids of the players
+
+        Returns:
+            Dict[str, str]: names by uuid, players which could not be found
+                are left out
+        """
+        unique = list(dict.fromkeys(str(UUID(str(uuid))) for uuid in uuids))
+        names: Dict[str, str] = {}
+        misses: List[str] = []
+        async with self._bot.redis.pipeline(transaction=False) as pipe:
+            for uuid in unique:
+                pipe.hget(f"profile_{uuid}", "username")
+                pipe.exists(f"profile_missing_{uuid}")
+            cached = await pipe.execute()
+        for uuid, name, missing in zip(unique, cached[::2], cached[1::2]):
+            if name is not None:
+                names[uuid] = orjson.loads(name)
+            elif not missing:
+                misses.append(uuid)
+        if not misses:
+            return names
+
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async def fetch(uuid: str) -> Any:
+            async with semaphore:
+                return await self._bot.fetch_json(
+                    f"profile_{uuid}",
+                    f"https://api.ashcon.app/mojang/v2/user/{uuid}",
+                    upstream="ashcon",
+                    not_found=NOT_FOUND,
+                )
+
+        results = await asyncio.gather(
+            *(fetch(uuid) for uuid in misses), return_exceptions=True
+        )
+        # none of these were cached, so there are no old names to look up
+        async with self._bot.redis.pipeline(transaction=True) as pipe:
+            for uuid, profile in zip(misses, results):
+                if isinstance(profile, BaseException):
+                    log.warning("Unable to resolve %s: %s", uuid, profile)
+                elif profile is NOT_FOUND:
+                    pipe.set(f"profile_missing_{uuid}", 1, px=MISSING_PX)
+                elif profile is not None:
+                    names[uuid] = profile["username"]
+                    self._write(pipe, profile, None)
+            await pipe.execute()
+        return names
+
+    async def store(self, profile: Dict[str, Any]) -> None:
+        """Cache a profile and update the name index."""
+        old_name = await self._bot.redis.hget(f"profile_{profile['uuid']}", "username")
+        async with self._bot.redis.pipeline(transaction=True) as pipe:
+            self._write(
+                pipe, profile, orjson.loads(old_name) if old_name is not None else None
+            )
+            await pipe.execute()
+
+    def _write(
+        self,
+        pipe: aioredis.client.Pipeline,
+        profile: Dict[str, Any],
+        old_name: Optional[str],
+    ) -> None:
+        """Queue the commands caching a profile on a pipeline.
+
+        Args:
+            pipe (aioredis.client.Pipeline): pipeline to queue them on
+            profile (Dict[str, Any]): the profile as returned by ashcon
+            old_name (Optional[str]): name the profile was cached with before
+        """
+        uuid = profile["uuid"]
+        key = f"profile_{uuid}"
+        name = profile["username"].casefold()
+        released = {
+            entry["username"].casefold()
+            for entry in profile.get("username_history", [])
+        }
+        if old_name is not None:
+            released.add(old_name.casefold())
+        released.discard(name)
+
+        fields = {
+            field: orjson.dumps(value)
+            for field, value in profile.items()
+            if field != "textures"
+        }
+        for old in released:
+            pipe.eval(RELEASE_SCRIPT, 1, f"profile_name_{old}", uuid)
+        pipe.hset(key, mapping=fields)
+        pipe.pexpire(key, PROFILE_PX)
+        pipe.set(f"profile_name_{name}", uuid, px=NAME_PX)
+        pipe.set(
+            f"{key}_textures",
+            orjson.dumps(profile.get("textures")),
+            px=TEXTURES_PX,
+        )
+        pipe.delete(f"profile_missing_{name}", f"profile_missing_{uuid}")
+
+    async def _fetch(self, query: str) -> Optional[Dict[str, Any]]:
+        """Fetch a profile, remembering players which do not exist."""
+        profile = await self._bot.fetch_json(
+            f"profile_{query}",
+            f"https://api.ashcon.app/mojang/v2/user/{query}",
+            upstream="ashcon",
+            not_found=NOT_FOUND,
+        )
+        if profile is NOT_FOUND:
+            await self._bot.redis.set(f"profile_missing_{query}", 1, px=MISSING_PX)
+            return None
+        return profile
+
+    async def _cached(self, uuid: str) -> Optional[Dict[str, Any]]:
+        """Get a cached profile, without textures if only they expired."""
+        key = f"profile_{uuid}"
+        async with self._bot.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(key)
+            pipe.get(f"{key}_textures")
+            fields, textures = await pipe.execute()
+        if not fields:
+            return None
+        profile = {field: orjson.loads(value) for field, value in fields.items()}
+        if textures is not None:
+            profile["textures"] = orjson.loads(textures)
+        return profile
@@ -0,0 +1,196 @@
+"""Rate limits of upstream APIs shared between processes."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import heapq
+import itertools
+import logging
+from contextvars import ContextVar
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
+
+import aioredis
+
+if TYPE_CHECKING:
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Priority of requests made from the current task. Commands are interactive,
+# the scheduler marks its tasks as background.
+priority: ContextVar[int] = ContextVar("priority", default=INTERACTIVE)
+
+# Takes a token from the bucket, returns 0 if one was taken or else the
+# milliseconds until one is available. Background requests may not use the
+# last ``reserve`` tokens, those are kept for interactive requests.
+TAKE_SCRIPT = """
+redis.replicate_commands()
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+local wait = 0
+if tokens >= 1 + reserve then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 + reserve - tokens) / rate)
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / rate) + 1000)
+return wait
+"""
+
+
+class RateLimit:
+    """Requests allowed by an upstream."""
+
+    def __init__(self, requests: int, per: float, reserve: float = 0.2) -> None:
+        """Init.
+
+        Args:
+            requests (int): number of requests allowed per period
+            per (float): length of the period in seconds
+            reserve (float): fraction of the requests kept for interactive
+                requests
+        """
+        self.requests = requests
+        self.per = per
+        self.reserve = reserve
+
+
+LIMITS = {
+    "hypixel": RateLimit(120, 60),
+    "ashcon": RateLimit(300, 60),
+    "mojang": RateLimit(600, 600),
+}
+
+
+class TokenBucket:
+    """A token bucket in Redis with a local priority queue.
+
+    Waiting requests of this process are served in order of priority, so an
+    interactive command never waits behind a backlog of background refreshes.
+    Between processes the reserve does the same, background requests stop
+    while the bucket runs low.
+    """
+
+    def __init__(self, redis: aioredis.Redis, key: str, limit: RateLimit) -> None:
+        self._redis = redis
+        self.key = key
+        self.limit = limit
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """Wait for a token.
+
+        Args:
+            timeout (Optional[float]): seconds to wait at most
+
+        Raises:
+            asyncio.TimeoutError: no token became available in time
+        """
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority.get(), next(self._counter), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await asyncio.wait_for(future, timeout)
+        finally:
+            future.cancel()
+
+    async def close(self) -> None:
+        """Stop handing out tokens."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._dispatcher
+
+    async def _dispatch(self) -> None:
+        rate = self.limit.requests / (self.limit.per * 1000)
+        while self._waiters:
+            request_priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            reserve = self.limit.requests * self.limit.reserve
+            try:
+                wait = await self._redis.eval(
+                    TAKE_SCRIPT,
+                    1,
+                    self.key,
+                    self.limit.requests,
+                    rate,
+                    reserve if request_priority == BACKGROUND else 0,
+                )
+            except (aioredis.RedisError, OSError) as e:
+                # rather exceed the limit than stop every request
+                log.warning("Unable to check rate limit %s: %s", self.key, e)
+                wait = 0
+            if wait:
+                # a request of higher priority may arrive in the meantime
+                await asyncio.sleep(int(wait) / 1000)
+                continue
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+
+
+class RateLimiter:
+    """Token buckets per upstream and API key."""
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, upstream: str, api_key: Optional[str] = None) -> TokenBucket:
+        """Get the bucket of an upstream, per API key if it uses one."""
+        key = f"ratelimit_{upstream}"
+        if api_key is not None:
+            # keep API keys out of Redis
+            key += "_" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self._bot.redis, key, LIMITS[upstream])
+            self._buckets[key] = bucket
+        return bucket
+
+    async def acquire(
+        self,
+        upstream: str,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = 10,
+    ) -> None:
+        """Wait until a request to an upstream is allowed.
+
+        Upstreams without a configured limit are not limited.
+
+        Args:
+            upstream (str): name of the upstream
+            api_key (Optional[str]): API key the request is made with
+            timeout (Optional[float]): seconds to wait at most
+
+        Raises:
+            asyncio.TimeoutError: the request was not allowed in time
+        """
+        if upstream not in LIMITS:
+            return
+        await self.bucket(upstream, api_key).acquire(timeout)
+
+    async def close(self) -> None:
+        """Stop every bucket."""
+        for bucket in self._buckets.values():
+            await bucket.close()
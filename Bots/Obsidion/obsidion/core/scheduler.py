@@ -0,0 +1,197 @@
+"""Background task scheduling shared between processes."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import TYPE_CHECKING
+
+import aioredis
+
+from .lease import RedisLease
+from .ratelimit import BACKGROUND
+from .ratelimit import priority
+
+if TYPE_CHECKING:
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+# How long a leader keeps its lease without renewing it, in milliseconds.
+LEASE_TTL = 30000
+
+
+class TaskStats:
+    """Runtime metrics of a scheduled task."""
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.failures = 0
+        self.catch_ups = 0
+        self.last_run: Optional[datetime] = None
+        self.last_duration = 0.0
+        self.total_duration = 0.0
+
+    @property
+    def average_duration(self) -> float:
+        """Average run time in seconds."""
+        return self.total_duration / self.runs if self.runs else 0.0
+
+
+class ScheduledTask:
+    """A coroutine function run on an interval."""
+
+    def __init__(
+        self,
+        name: str,
+        coro: Callable[[], Awaitable[Any]],
+        interval: float,
+        jitter: float,
+        leader: bool,
+    ) -> None:
+        self.name = name
+        self.coro = coro
+        self.interval = interval
+        self.jitter = jitter
+        self.leader = leader
+        self.stats = TaskStats()
+        self.runner: Optional[asyncio.Task] = None
+
+
+class Scheduler:
+    """Run background tasks on an interval.
+
+    Leader tasks run in only one process at a time, whichever currently
+    holds the task's Redis lease. The time of the last run is stored in Redis
+    as well, so when the leader dies or the bot restarts a run that was missed
+    in the meantime is caught up straight away instead of waiting for another
+    full interval.
+    """
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+        self._tasks: Dict[str, ScheduledTask] = {}
+
+    def add(
+        self,
+        name: str,
+        coro: Callable[[], Awaitable[Any]],
+        *,
+        interval: float,
+        jitter: float = 0.1,
+        leader: bool = True,
+    ) -> None:
+        """Schedule a coroutine function.
+
+        Args:
+            name (str): unique name of the task
+            coro (Callable[[], Awaitable[Any]]): coroutine function to run
+            interval (float): seconds between runs
+            jitter (float): fraction of the interval by which a run may be
+                randomly delayed, so processes do not hit upstreams in lockstep
+            leader (bool): only run in the process holding the task's lease
+        """
+        if name in self._tasks:
+            raise ValueError(f"Task {name} is already scheduled")
+        task = ScheduledTask(name, coro, interval, jitter, leader)
+        task.runner = asyncio.create_task(self._run(task))
+        self._tasks[name] = task
+
+    def remove(self, name: str) -> None:
+        """Stop and remove a scheduled task."""
+        task = self._tasks.pop(name, None)
+        if task is not None and task.runner is not None:
+            task.runner.cancel()
+
+    def stats(self) -> Dict[str, TaskStats]:
+        """Get the runtime metrics of every scheduled task."""
+        return {name: task.stats for name, task in self._tasks.items()}
+
+    async def close(self) -> None:
+        """Stop every scheduled task."""
+        runners = [task.runner for task in self._tasks.values() if task.runner]
+        self._tasks.clear()
+        for runner in runners:
+            runner.cancel()
+        await asyncio.gather(*runners, return_exceptions=True)
+
+    async def _run(self, task: ScheduledTask) -> None:
+        priority.set(BACKGROUND)
+        lease = RedisLease(self._bot.redis, f"scheduler_{task.name}", ttl=LEASE_TTL)
+        last_key = f"scheduler_{task.name}_last"
+        heartbeat = LEASE_TTL / 3000
+        local_last: Optional[float] = None
+        delay = random.uniform(0, task.jitter * task.interval)  # noqa: S311
+        try:
+            while True:
+                try:
+                    if task.leader:
+                        if not await lease.acquire():
+                            await asyncio.sleep(heartbeat)
+                            continue
+                        last = await self._bot.redis.get(last_key)
+                        last_run = float(last) if last is not None else None
+                    else:
+                        last_run = local_last
+
+                    now = time.time()
+                    due = now if last_run is None else last_run + task.interval + delay
+                    if due > now:
+                        # wake up regularly to keep the lease while waiting
+                        await asyncio.sleep(
+                            min(due - now, heartbeat) if task.leader else due - now
+                        )
+                        continue
+
+                    if last_run is not None and now - due > task.interval:
+                        task.stats.catch_ups += 1
+                        log.info("Catching up missed run of %s", task.name)
+                    if task.leader:
+                        await self._bot.redis.set(last_key, now)
+                except (aioredis.RedisError, OSError) as e:
+                    log.warning("Unable to schedule %s: %s", task.name, e)
+                    await asyncio.sleep(heartbeat)
+                    continue
+                local_last = now
+                await self._execute(task, lease)
+                delay = random.uniform(0, task.jitter * task.interval)  # noqa: S311
+        finally:
+            if task.leader:
+                with contextlib.suppress(aioredis.RedisError, OSError):
+                    await lease.release()
+
+    async def _execute(self, task: ScheduledTask, lease: RedisLease) -> None:
+        keep_lease = None
+        if task.leader:
+            keep_lease = asyncio.create_task(self._keep_lease(lease))
+        start = time.perf_counter()
+        try:
+            await task.coro()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            task.stats.failures += 1
+            log.exception(type(e).__name__, exc_info=e)
+        finally:
+            duration = time.perf_counter() - start
+            if keep_lease is not None:
+                keep_lease.cancel()
+            task.stats.runs += 1
+            task.stats.last_run = datetime.utcnow()
+            task.stats.last_duration = duration
+            task.stats.total_duration += duration
+
+    @staticmethod
+    async def _keep_lease(lease: RedisLease) -> None:
+        while True:
+            await asyncio.sleep(LEASE_TTL / 3000)
+            with contextlib.suppress(aioredis.RedisError, OSError):
+                await lease.acquire()
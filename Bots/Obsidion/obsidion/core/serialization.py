@@ -0,0 +1,232 @@
+"""Versioned serialisation of API models for the Redis cache."""
+from __future__ import annotations
+
+import logging
+import pickle  # noqa: S403
+import time
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Generic
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import TypeVar
+
+import aioredis
+import orjson
+from pydantic import BaseModel
+from pydantic import parse_obj_as
+from pydantic import ValidationError
+
+from .compression import CompressionError
+from .compression import Compressor
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SchemaError(ValueError):
+    """Cached data does not match the current schema."""
+
+    pass
+
+
+class Schema(Generic[T]):
+    """How a type is stored in the cache.
+
+    Values are stored as ``[version, data]`` in JSON, models are written as
+    dicts by their field aliases so they are parsed back by pydantic exactly
+    like an API response. Bump ``version`` whenever the stored form changes,
+    cached data of any other version is treated as missing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        type_: Any,
+        version: int = 1,
+        encoders: Optional[Dict[Type[Any], Callable[[Any], Any]]] = None,
+    ) -> None:
+        """Init.
+
+        Args:
+            name (str): name of the schema
+            type_ (Any): type of the values, as accepted by pydantic
+            version (int): version of the stored form
+            encoders (Optional[Dict[Type[Any], Callable[[Any], Any]]]): how
+                to write values of a type, for models whose validators expect
+                something other than their own fields
+        """
+        self.name = name
+        self.type = type_
+        self.version = version
+        self.encoders = encoders or {}
+
+    def dumps(self, value: T) -> bytes:
+        """Serialise a value."""
+        return orjson.dumps([self.version, self._encode(value)])
+
+    def loads(self, data: bytes) -> T:
+        """Deserialise a value.
+
+        Raises:
+            SchemaError: the data is of another version or does not validate
+        """
+        try:
+            version, payload = orjson.loads(data)
+        except (orjson.JSONDecodeError, TypeError, ValueError) as e:
+            raise SchemaError(f"Invalid {self.name} data") from e
+        if version != self.version:
+            raise SchemaError(f"{self.name} data is of version {version}")
+        try:
+            return parse_obj_as(self.type, payload)
+        except ValidationError as e:
+            raise SchemaError(f"Invalid {self.name} data") from e
+
+    def _encode(self, value: Any) -> Any:
+        for type_, encoder in self.encoders.items():
+            if isinstance(value, type_):
+                return encoder(value)
+        if isinstance(value, BaseModel):
+            return {
+                field.alias: self._encode(getattr(value, name))
+                for name, field in value.__fields__.items()
+            }
+        if isinstance(value, (list, tuple)):
+            return [self._encode(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._encode(item) for key, item in value.items()}
+        # datetimes, UUIDs and enums are handled by orjson
+        return value
+
+
+class ModelCache:
+    """Cache of API models in Redis.
+
+    Needs a client without ``decode_responses`` as the values are bytes.
+    Values are compressed when a compressor is given.
+    """
+
+    def __init__(
+        self, redis: aioredis.Redis, compressor: Optional[Compressor] = None
+    ) -> None:
+        self._redis = redis
+        self._compressor = compressor
+
+    def _dumps(self, schema: Schema[T], value: T) -> bytes:
+        data = schema.dumps(value)
+        return self._compressor.compress(data) if self._compressor else data
+
+    def _loads(self, schema: Schema[T], data: bytes) -> T:
+        if self._compressor is not None:
+            data = self._compressor.decompress(data)
+        return schema.loads(data)
+
+    async def get(self, key: str, schema: Schema[T]) -> Optional[T]:
+        """Get a cached value, None if there is no usable one."""
+        data = await self._redis.get(key)
+        if data is None:
+            return None
+        try:
+            return self._loads(schema, data)
+        except (SchemaError, CompressionError) as e:
+            log.debug("Ignoring cached %s: %s", key, e)
+            return None
+
+    async def set(self, key: str, schema: Schema[T], value: T, px: int) -> None:
+        """Cache a value for ``px`` milliseconds."""
+        await self._redis.set(key, self._dumps(schema, value), px=px)
+
+    async def get_many(self, keys: List[str], schema: Schema[T]) -> Dict[str, T]:
+        """Get the usable cached values of several keys in one round trip."""
+        found: Dict[str, T] = {}
+        if not keys:
+            return found
+        for key, data in zip(keys, await self._redis.mget(keys)):
+            if data is None:
+                continue
+            try:
+                found[key] = self._loads(schema, data)
+            except (SchemaError, CompressionError) as e:
+                log.debug("Ignoring cached %s: %s", key, e)
+        return found
+
+    async def set_many(self, values: Dict[str, T], schema: Schema[T], px: int) -> None:
+        """Cache several values for ``px`` milliseconds in one round trip."""
+        if not values:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(key, self._dumps(schema, value), px=px)
+            await pipe.execute()
+
+    async def get_or_fetch(
+        self, key: str, schema: Schema[T], fetch: Callable[[], Awaitable[T]], px: int
+    ) -> T:
+        """Get a cached value, fetching and caching it when missing.
+
+        Args:
+            key (str): cache key
+            schema (Schema[T]): schema of the value
+            fetch (Callable[[], Awaitable[T]]): gets the value from the API
+            px (int): milliseconds to cache a fetched value for
+
+        Returns:
+            T: the value
+        """
+        data = await self._redis.get(key)
+        if data is not None:
+            try:
+                return self._loads(schema, data)
+            except (SchemaError, CompressionError) as e:
+                log.debug("Ignoring cached %s: %s", key, e)
+        value = await fetch()
+        await self.set(key, schema, value, px)
+        return value
+
+
+class BenchmarkResult:
+    """Speed and size of a serialisation method."""
+
+    def __init__(self, size: int, encode: float, decode: float) -> None:
+        self.size = size
+        self.encode = encode
+        self.decode = decode
+
+
+def benchmark(
+    schema: Schema[T], value: T, rounds: int = 1000
+) -> Dict[str, BenchmarkResult]:
+    """Compare a schema against pickle for a value.
+
+    Args:
+        schema (Schema[T]): schema to benchmark
+        value (T): value to serialise
+        rounds (int): number of times to encode and decode
+
+    Returns:
+        Dict[str, BenchmarkResult]: results by method, times are per round
+            in microseconds
+    """
+    methods: Dict[str, Tuple[Callable[[T], bytes], Callable[[bytes], Any]]] = {
+        "orjson": (schema.dumps, schema.loads),
+        "pickle": (pickle.dumps, pickle.loads),  # noqa: S301
+    }
+    results = {}
+    for name, (dumps, loads) in methods.items():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            data = dumps(value)
+        encode = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(rounds):
+            loads(data)
+        decode = time.perf_counter() - start
+        results[name] = BenchmarkResult(
+            len(data), encode / rounds * 1e6, decode / rounds * 1e6
+        )
+    return results
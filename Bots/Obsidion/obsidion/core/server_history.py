@@ -0,0 +1,133 @@
+"""Player count history of Minecraft servers."""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+# Seconds of history kept for each server.
+HISTORY_SECONDS = 24 * 60 * 60
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values: List[Optional[int]]) -> str:
+    """Draw values as a line of block characters, missing values as gaps.
+
+    Args:
+        values (List[Optional[int]]): values to draw
+
+    Returns:
+        str: one character per value
+    """
+    present = [value for value in values if value is not None]
+    if not present:
+        return ""
+    low, high = min(present), max(present)
+    steps = len(SPARK_BLOCKS) - 1
+    return "".join(
+        " "
+        if value is None
+        else SPARK_BLOCKS[(value - low) * steps // (high - low) if high > low else 0]
+        for value in values
+    )
+
+
+class ServerHistory:
+    """Player counts of servers over time.
+
+    Each server has a sorted set ``server_history_{host}:{port}`` of
+    ``{timestamp}:{online}`` members scored by their timestamp, where a server
+    that did not answer is recorded as ``-1`` players. Samples older than
+    :data:`HISTORY_SECONDS` are trimmed whenever new ones are added.
+    """
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+
+    @staticmethod
+    def _key(host: str, port: Optional[int]) -> str:
+        return f"server_history_{host}:{port or ''}"
+
+    async def record(
+        self,
+        statuses: Dict[Tuple[str, Optional[int]], Optional[Dict[str, Any]]],
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """Add a sample for each server.
+
+        Args:
+            statuses (Dict[Tuple[str, Optional[int]], Optional[Dict[str, Any]]]):
+                status of each server by host and port, None if it did not answer
+            timestamp (Optional[float]): time of the samples, now by default
+        """
+        timestamp = int(timestamp or time.time())
+        async with self._bot.redis.pipeline(transaction=False) as pipe:
+            for (host, port), status in statuses.items():
+                key = self._key(host, port)
+                online = -1 if status is None else status["players"]["online"]
+                pipe.zadd(key, {f"{timestamp}:{online}": timestamp})
+                pipe.zremrangebyscore(key, "-inf", timestamp - HISTORY_SECONDS)
+                pipe.expire(key, HISTORY_SECONDS)
+            await pipe.execute()
+
+    async def get(
+        self, host: str, port: Optional[int], since: Optional[float] = None
+    ) -> List[Tuple[int, Optional[int]]]:
+        """Get the samples of a server.
+
+        Args:
+            host (str): address of the server
+            port (Optional[int]): port of the server
+            since (Optional[float]): time of the oldest sample returned
+
+        Returns:
+            List[Tuple[int, Optional[int]]]: timestamps and player counts, None
+                where the server did not answer
+        """
+        since = since or time.time() - HISTORY_SECONDS
+        members = await self._bot.redis.zrangebyscore(
+            self._key(host, port), since, "+inf"
+        )
+        samples = []
+        for member in members:
+            timestamp, online = member.split(":")
+            samples.append((int(timestamp), None if online == "-1" else int(online)))
+        return samples
+
+    async def sparkline(
+        self, host: str, port: Optional[int], buckets: int = 24
+    ) -> Optional[str]:
+        """Draw the player count of a server over the last day.
+
+        The day is split into buckets holding the highest count seen in them.
+
+        Args:
+            host (str): address of the server
+            port (Optional[int]): port of the server
+            buckets (int): number of characters to draw
+
+        Returns:
+            Optional[str]: the sparkline, None if there is no history
+        """
+        now = time.time()
+        samples = await self.get(host, port, now - HISTORY_SECONDS)
+        if not samples:
+            return None
+        width = HISTORY_SECONDS / buckets
+        values: List[Optional[int]] = [None] * buckets
+        for timestamp, online in samples:
+            if online is None:
+                continue
+            index = min(int((timestamp - (now - HISTORY_SECONDS)) / width), buckets - 1)
+            values[index] = max(values[index] or 0, online)
+        return sparkline(values) or None
@@ -0,0 +1,475 @@
+"""Ping Minecraft servers directly.
+
+Java servers are asked for their status with the Server List Ping protocol
+over TCP, Bedrock servers with a RakNet unconnected ping over UDP.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import re
+import struct
+import time
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
+from typing import Union
+
+import aiodns
+
+if TYPE_CHECKING:
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+Ping = Callable[[str, Optional[int]], Awaitable[Dict[str, Any]]]
+
+JAVA_PORT = 25565
+BEDROCK_PORT = 19132
+# Protocol version sent in the handshake, servers answer a status request
+# whatever the version.
+HANDSHAKE_PROTOCOL = 47
+# Seconds a single server may take to answer.
+PING_TIMEOUT = 5
+# Servers pinged at the same time by this process.
+MAX_CONNECTIONS = 256
+# Largest status response accepted, favicons make up most of it.
+MAX_RESPONSE = 1 << 20
+# Milliseconds to keep the status of a server for, and to remember a server
+# did not answer.
+STATUS_PX = 60 * 1000
+DOWN_PX = 30 * 1000
+# Milliseconds to keep server icons for, they are keyed by their hash so they
+# never go stale.
+ICON_PX = 7 * 24 * 60 * 60 * 1000
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+RAKNET_MAGIC = bytes.fromhex("00ffff00fefefefefdfdfdfd12345678")
+UNCONNECTED_PING = 0x01
+UNCONNECTED_PONG = 0x1C
+
+FORMATTING = re.compile("§.")
+
+
+def pack_varint(value: int) -> bytes:
+    """Encode an int as a VarInt.
+
+    Args:
+        value (int): signed 32 bit int
+
+    Returns:
+        bytes: the encoded value
+    """
+    value &= 0xFFFFFFFF
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def unpack_varint(data: bytes, offset: int = 0) -> Tuple[int, int]:
+    """Decode a VarInt.
+
+    Args:
+        data (bytes): buffer holding the VarInt
+        offset (int): position of the VarInt in the buffer
+
+    Raises:
+        ValueError: the VarInt is longer than 5 bytes or cut off
+
+    Returns:
+        Tuple[int, int]: the value and the offset after it
+    """
+    value = 0
+    for shift in range(0, 35, 7):
+        if offset >= len(data):
+            raise ValueError("VarInt is cut off")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            if value & 0x80000000:
+                value -= 1 << 32
+            return value, offset
+    raise ValueError("VarInt is too long")
+
+
+async def read_varint(reader: asyncio.StreamReader) -> int:
+    """Read a VarInt from a stream."""
+    data = bytearray()
+    while True:
+        data += await reader.readexactly(1)
+        if not data[-1] & 0x80:
+            return unpack_varint(bytes(data))[0]
+        if len(data) >= 5:
+            raise ValueError("VarInt is too long")
+
+
+def pack_string(value: str) -> bytes:
+    """Encode a string prefixed with its length."""
+    data = value.encode("utf-8")
+    return pack_varint(len(data)) + data
+
+
+def pack_packet(packet_id: int, payload: bytes = b"") -> bytes:
+    """Frame a packet with its length."""
+    data = pack_varint(packet_id) + payload
+    return pack_varint(len(data)) + data
+
+
+def parse_address(
+    address: str, port: Optional[Union[int, str]] = None
+) -> Tuple[str, Optional[int]]:
+    """Split the port off an address.
+
+    Args:
+        address (str): address of the server, optionally with a port
+        port (Optional[Union[int, str]]): port given separately
+
+    Raises:
+        ValueError: the address or port is malformed
+
+    Returns:
+        Tuple[str, Optional[int]]: the host and port, None if not given
+    """
+    if address.count(":") > 1:
+        raise ValueError(f"Malformed address {address}")
+    if ":" in address:
+        address, port = address.split(":")
+    address = address.strip().lower()
+    if not address:
+        raise ValueError("Empty address")
+    if port is None:
+        return address, None
+    port = int(port)
+    if not 0 < port < 65536:
+        raise ValueError(f"Port {port} is out of range")
+    return address, port
+
+
+def flatten_text(component: Any) -> str:
+    """Get the plain text of a chat component, including legacy codes.
+
+    >>> flatten_text({"text": "A ", "extra": [{"text": "server"}, 5]})
+    'A server'
+    """
+    if isinstance(component, str):
+        return component
+    if isinstance(component, list):
+        return "".join(flatten_text(part) for part in component)
+    if isinstance(component, dict):
+        return flatten_text(component.get("text")) + flatten_text(
+            component.get("extra")
+        )
+    return ""
+
+
+def clean_text(text: str) -> str:
+    """Strip formatting codes."""
+    return FORMATTING.sub("", text)
+
+
+def _object(value: Any) -> Dict[str, Any]:
+    """Get a JSON object, anything else is treated as an empty one."""
+    return value if isinstance(value, dict) else {}
+
+
+def _integer(value: Any) -> int:
+    """Get a JSON integer, anything else is treated as 0."""
+    return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+
+def java_status(raw: Any, latency: float) -> Dict[str, Any]:
+    """Shape a status response like the API did.
+
+    Servers are free to send whatever they like, fields which are missing or
+    of the wrong type are left empty.
+
+    >>> status = java_status({"players": None, "version": [1]}, 0.01)
+    >>> status["players"], status["version"]
+    ({'online': 0, 'max': 0, 'sample': []}, '')
+
+    Raises:
+        ValueError: the response is not a JSON object
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("Status is not an object")
+    motd = flatten_text(raw.get("description", ""))
+    players = _object(raw.get("players"))
+    version = _object(raw.get("version"))
+    sample = players.get("sample")
+    name = version.get("name")
+    favicon = raw.get("favicon")
+    return {
+        "motd": {
+            "raw": motd.split("\n"),
+            "clean": [clean_text(line).strip() for line in motd.split("\n")],
+        },
+        "players": {
+            "online": _integer(players.get("online")),
+            "max": _integer(players.get("max")),
+            "sample": [
+                player["name"]
+                for player in (sample if isinstance(sample, list) else [])
+                if isinstance(player, dict) and isinstance(player.get("name"), str)
+            ],
+        },
+        "version": clean_text(name) if isinstance(name, str) else "",
+        "protocol": _integer(version.get("protocol")),
+        "icon": favicon if isinstance(favicon, str) else None,
+        "latency": round(latency * 1000),
+    }
+
+
+def bedrock_status(data: bytes, latency: float) -> Dict[str, Any]:
+    """Parse an unconnected pong like the API did.
+
+    Raises:
+        ValueError: the pong is malformed
+    """
+    if len(data) < 35 or data[0] != UNCONNECTED_PONG or data[17:33] != RAKNET_MAGIC:
+        raise ValueError("Not an unconnected pong")
+    (length,) = struct.unpack_from(">H", data, 33)
+    fields = data[35 : 35 + length].decode("utf-8", "replace").split(";")
+    if len(fields) < 6:
+        raise ValueError("Server id string is too short")
+    fields += [""] * (9 - len(fields))
+    return {
+        "edition": fields[0],
+        "motd": [clean_text(fields[1]), clean_text(fields[7])],
+        "protocol_version": int(fields[2]),
+        "protocol_name": fields[3],
+        "player_count": int(fields[4]),
+        "player_max": int(fields[5]),
+        "gamemode": fields[8] or None,
+        "latency": round(latency * 1000),
+    }
+
+
+class _PongProtocol(asyncio.DatagramProtocol):
+    def __init__(self, pong: asyncio.Future) -> None:
+        self._pong = pong
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if not self._pong.done() and data[:1] == bytes([UNCONNECTED_PONG]):
+            self._pong.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        if not self._pong.done():
+            self._pong.set_exception(exc)
+
+
+class ServerPinger:
+    """Ping Minecraft servers, caching their status in Redis.
+
+    Statuses are stored under ``server_{edition}_{host}:{port}`` for a minute,
+    a server which did not answer is remembered for half that. Favicons are
+    decoded once and stored under ``server_icon_{hash}``, the status only
+    holds the hash, so servers sharing artwork share the icon. Concurrent
+    pings of the same server share one connection and only
+    :data:`MAX_CONNECTIONS` servers are pinged at once.
+    """
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+        self._resolver: Optional[aiodns.DNSResolver] = None
+        self._budget = asyncio.Semaphore(MAX_CONNECTIONS)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def java(
+        self,
+        host: str,
+        port: Optional[int] = None,
+        cached: bool = True,
+        px: int = STATUS_PX,
+    ) -> Optional[Dict[str, Any]]:
+        """Get the status of a Java server.
+
+        Args:
+            host (str): address of the server
+            port (Optional[int]): port of the server, looked up from the SRV
+                record of the address by default
+            cached (bool): whether a cached status may be returned
+            px (int): milliseconds to cache the status for
+
+        Returns:
+            Optional[Dict[str, Any]]: status of the server, None if it did not
+                answer
+        """
+        return await self._status("java", self._ping_java, host, port, cached, px)
+
+    async def bedrock(
+        self,
+        host: str,
+        port: Optional[int] = None,
+        cached: bool = True,
+        px: int = STATUS_PX,
+    ) -> Optional[Dict[str, Any]]:
+        """Get the status of a Bedrock server.
+
+        Args:
+            host (str): address of the server
+            port (Optional[int]): port of the server, 19132 by default
+            cached (bool): whether a cached status may be returned
+            px (int): milliseconds to cache the status for
+
+        Returns:
+            Optional[Dict[str, Any]]: status of the server, None if it did not
+                answer
+        """
+        return await self._status("bedrock", self._ping_bedrock, host, port, cached, px)
+
+    async def resolve_srv(self, host: str) -> Tuple[str, int]:
+        """Find the address a Java server name points to.
+
+        Args:
+            host (str): address of the server
+
+        Returns:
+            Tuple[str, int]: the host and port to connect to
+        """
+        if self._resolver is None:
+            self._resolver = aiodns.DNSResolver()
+        try:
+            records = await self._resolver.query(f"_minecraft._tcp.{host}", "SRV")
+        except aiodns.error.DNSError:
+            return host, JAVA_PORT
+        record = min(records, key=lambda record: (record.priority, -record.weight))
+        return record.host.rstrip("."), record.port
+
+    async def _status(
+        self,
+        edition: str,
+        ping: Ping,
+        host: str,
+        port: Optional[int],
+        cached: bool,
+        px: int,
+    ) -> Optional[Dict[str, Any]]:
+        host = host.strip().lower()
+        key = f"server_{edition}_{host}:{port or ''}"
+        if cached:
+            data = await self._bot.redis.get(key)
+            if data is not None:
+                return json.loads(data)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._ping(key, ping, host, port, px))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _ping(
+        self, key: str, ping: Ping, host: str, port: Optional[int], px: int
+    ) -> Optional[Dict[str, Any]]:
+        async with self._budget:
+            try:
+                status = await asyncio.wait_for(ping(host, port), PING_TIMEOUT)
+            except (OSError, ValueError, asyncio.TimeoutError, EOFError) as e:
+                log.debug("Unable to ping %s: %r", key, e)
+                status = None
+            except Exception:
+                # servers are third party, whatever they send is just down
+                log.exception("Unexpected error pinging %s", key)
+                status = None
+        if status is not None and status.get("icon"):
+            status["icon"] = await self._store_icon(status["icon"])
+        await self._bot.redis.set(
+            key, json.dumps(status), px=px if status else min(px, DOWN_PX)
+        )
+        return status
+
+    async def icon(self, icon_hash: str) -> Optional[bytes]:
+        """Get a server icon.
+
+        Args:
+            icon_hash (str): hash of the icon as given in a status
+
+        Returns:
+            Optional[bytes]: PNG of the icon, None if it is no longer stored
+        """
+        return await self._bot.redis_bytes.get(f"server_icon_{icon_hash}")
+
+    async def _store_icon(self, favicon: str) -> Optional[str]:
+        try:
+            data = base64.b64decode(favicon.split(",", 1)[-1])
+        except (binascii.Error, ValueError):
+            return None
+        if not data.startswith(PNG_SIGNATURE):
+            return None
+        icon_hash = hashlib.sha256(data).hexdigest()
+        key = f"server_icon_{icon_hash}"
+        async with self._bot.redis_bytes.pipeline(transaction=False) as pipe:
+            pipe.set(key, data, px=ICON_PX, nx=True)
+            pipe.pexpire(key, ICON_PX)
+            await pipe.execute()
+        return icon_hash
+
+    async def _ping_java(self, host: str, port: Optional[int]) -> Dict[str, Any]:
+        if port is None:
+            address, port = await self.resolve_srv(host)
+        else:
+            address = host
+        reader, writer = await asyncio.open_connection(address, port)
+        try:
+            writer.write(
+                pack_packet(
+                    0x00,
+                    pack_varint(HANDSHAKE_PROTOCOL)
+                    + pack_string(host)
+                    + struct.pack(">H", port)
+                    + pack_varint(1),
+                )
+                + pack_packet(0x00)
+            )
+            start = time.perf_counter()
+            await writer.drain()
+            length = await read_varint(reader)
+            if not 0 < length <= MAX_RESPONSE:
+                raise ValueError(f"Bad status length {length}")
+            packet = await reader.readexactly(length)
+            latency = time.perf_counter() - start
+            packet_id, offset = unpack_varint(packet)
+            if packet_id != 0x00:
+                raise ValueError(f"Unexpected packet {packet_id}")
+            size, offset = unpack_varint(packet, offset)
+            raw = json.loads(packet[offset : offset + size].decode("utf-8"))
+        finally:
+            writer.close()
+        return java_status(raw, latency)
+
+    async def _ping_bedrock(self, host: str, port: Optional[int]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        pong: asyncio.Future = loop.create_future()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _PongProtocol(pong), remote_addr=(host, port or BEDROCK_PORT)
+        )
+        try:
+            start = time.perf_counter()
+            transport.sendto(
+                struct.pack(">Bq", UNCONNECTED_PING, int(time.time() * 1000))
+                + RAKNET_MAGIC
+                + struct.pack(">q", 2)
+            )
+            data = await pong
+            return bedrock_status(data, time.perf_counter() - start)
+        finally:
+            transport.close()
+
+    async def close(self) -> None:
+        """Cancel pings in progress."""
+        for task in list(self._inflight.values()):
+            task.cancel()
@@ -0,0 +1,79 @@
+"""Java's hashing of strings, as used by Minecraft."""
+from typing import Sequence
+
+import numpy as np
+
+# Powers of 31 modulo 2 ** 32, extended as longer strings are hashed.
+_powers = np.ones(1, dtype=np.uint32)
+
+
+def _powers_of_31(count: int) -> np.ndarray:
+    """Get ``31 ** k`` modulo 2 ** 32 for every k below count."""
+    global _powers
+    if len(_powers) < count:
+        powers = np.full(max(count, 2 * len(_powers)), 31, dtype=np.uint32)
+        powers[0] = 1
+        # uint32 products wrap around, which is the modulo
+        _powers = np.cumprod(powers, dtype=np.uint32)
+    return _powers[:count]
+
+
+def _code_units(text: str) -> np.ndarray:
+    """Get the UTF-16 code units of a string, as Java stores it."""
+    return np.frombuffer(text.encode("utf-16-le", "surrogatepass"), dtype="<u2")
+
+
+def java_string_hash(text: str) -> int:
+    """Hash a string like Java's ``String.hashCode``.
+
+    The hash is the sum of each UTF-16 code unit times 31 to the power of
+    the number of code units after it, as a signed 32 bit int.
+
+    >>> java_string_hash("hello")
+    99162322
+    >>> java_string_hash("Hello World")
+    -862545276
+    >>> java_string_hash("polygenelubricants")
+    -2147483648
+    >>> java_string_hash("\\N{GRINNING FACE}")
+    1772899
+    >>> java_string_hash("")
+    0
+
+    Args:
+        text (str): string to hash
+
+    Returns:
+        int: the hash
+    """
+    units = _code_units(text).astype(np.uint32)
+    powers = _powers_of_31(len(units))[::-1]
+    return int(np.sum(units * powers, dtype=np.uint32).view(np.int32))
+
+
+def java_string_hashes(texts: Sequence[str]) -> np.ndarray:
+    """Hash many strings like Java's ``String.hashCode`` at once.
+
+    >>> java_string_hashes(["hello", "", "Hello World"]).tolist()
+    [99162322, 0, -862545276]
+
+    Args:
+        texts (Sequence[str]): strings to hash
+
+    Returns:
+        np.ndarray: the hashes as int32
+    """
+    units = [_code_units(text) for text in texts]
+    lengths = np.array([len(text) for text in units], dtype=np.int64)
+    if not lengths.sum():
+        return np.zeros(len(texts), dtype=np.int32)
+    codes = np.concatenate(units).astype(np.uint32)
+    starts = np.cumsum(lengths) - lengths
+    # each code unit is multiplied by 31 to the number of units after it
+    position = np.arange(len(codes)) - np.repeat(starts, lengths)
+    exponents = np.repeat(lengths, lengths) - 1 - position
+    products = codes * _powers_of_31(int(lengths.max()))[exponents]
+    hashes = np.zeros(len(texts), dtype=np.uint32)
+    present = lengths > 0
+    hashes[present] = np.add.reduceat(products, starts[present], dtype=np.uint32)
+    return hashes.view(np.int32)
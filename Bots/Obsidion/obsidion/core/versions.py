@@ -0,0 +1,132 @@
+"""Index of Minecraft Java Edition versions."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from obsidion.core.bot import Obsidion
+
+log = logging.getLogger(__name__)
+
+MANIFEST_URL = "https://launchermeta.mojang.com/mc/game/version_manifest.json"
+# Seconds between checks of the manifest for changes, also how long it is
+# kept in Redis for every process to share.
+MANIFEST_TTL = 10 * 60
+
+
+class Version:
+    """A version from the manifest."""
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.id: str = data["id"]
+        self.type: str = data["type"]
+        self.url: str = data["url"]
+        self.released = datetime.fromisoformat(data["releaseTime"])
+        # releases are grouped by their major version, 1.17.1 belongs to 1.17
+        self.major: Optional[str] = (
+            ".".join(self.id.split(".")[:2]) if self.type == "release" else None
+        )
+
+    @property
+    def wiki(self) -> str:
+        """Link to the version on the Minecraft wiki."""
+        return f"https://minecraft.fandom.com/Java_Edition_{self.id}"
+
+
+class VersionIndex:
+    """The version manifest parsed once for lookups.
+
+    Attributes:
+        digest (str): hash of the manifest the index was built from
+        latest (Dict[str, str]): ids of the latest release and snapshot
+        versions (List[Version]): every version, newest first
+        majors (Dict[str, List[Version]]): releases by major version, both
+            oldest first
+    """
+
+    def __init__(self, manifest: Dict[str, Any], digest: str) -> None:
+        self.digest = digest
+        self.latest: Dict[str, str] = manifest.get("latest", {})
+        self.versions = [Version(data) for data in manifest["versions"]]
+        self.versions.sort(key=lambda version: version.released, reverse=True)
+        self._by_id = {version.id: version for version in self.versions}
+        self.majors: Dict[str, List[Version]] = {}
+        for version in reversed(self.versions):
+            if version.major is not None:
+                self.majors.setdefault(version.major, []).append(version)
+
+    def get(self, version_id: str) -> Optional[Version]:
+        """Get a version by its id."""
+        return self._by_id.get(version_id)
+
+    def __getitem__(self, version_id: str) -> Version:
+        """Get a version known to be in the index by its id.
+
+        Raises:
+            KeyError: there is no such version
+        """
+        return self._by_id[version_id]
+
+    def __contains__(self, version_id: str) -> bool:
+        return version_id in self._by_id
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+
+def manifest_digest(manifest: Dict[str, Any]) -> str:
+    """Hash a manifest to tell whether it changed."""
+    return hashlib.sha1(  # noqa: S303
+        json.dumps(manifest, sort_keys=True).encode()
+    ).hexdigest()
+
+
+class Versions:
+    """The current :class:`VersionIndex`, shared by every command.
+
+    The manifest is fetched at most every :data:`MANIFEST_TTL` seconds and the
+    index is only rebuilt when the hash of the manifest changes.
+    """
+
+    def __init__(self, bot: Obsidion) -> None:
+        self._bot = bot
+        self._index: Optional[VersionIndex] = None
+        self._checked = 0.0
+        self._lock = asyncio.Lock()
+
+    async def index(self) -> Optional[VersionIndex]:
+        """Get the index of the current manifest.
+
+        Returns:
+            Optional[VersionIndex]: the index, None if the manifest could not
+                be fetched yet
+        """
+        if self._index is not None and time.monotonic() - self._checked < MANIFEST_TTL:
+            return self._index
+        async with self._lock:
+            if (
+                self._index is not None
+                and time.monotonic() - self._checked < MANIFEST_TTL
+            ):
+                return self._index
+            manifest = await self._bot.get_json(
+                "versions", MANIFEST_URL, px=MANIFEST_TTL * 1000
+            )
+            if manifest is None:
+                return self._index
+            self._checked = time.monotonic()
+            digest = manifest_digest(manifest)
+            if self._index is None or self._index.digest != digest:
+                self._index = VersionIndex(manifest, digest)
+                log.info("Indexed %d versions", len(self._index))
+            return self._index
@@ -0,0 +1,136 @@
+"""Outbound webhook posting."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+
+import aiohttp
+
+log = logging.getLogger(__name__)
+
+
+class WebhookTarget:
+    """A JSON payload to post to a url."""
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        json: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.name = name
+        self.url = url
+        self.json = json
+        self.headers = headers or {}
+
+
+class TargetStats:
+    """Delivery metrics of a webhook target."""
+
+    def __init__(self) -> None:
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.last_status: Optional[int] = None
+        self.last_latency = 0.0
+
+
+class WebhookPoster:
+    """Post payloads to many targets concurrently.
+
+    Every attempt has its own timeout, failed attempts are retried with
+    exponential backoff and each target keeps track of its latency and
+    success rate.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        timeout: float = 10,
+        retries: int = 3,
+        backoff: float = 1,
+    ) -> None:
+        """Init.
+
+        Args:
+            session (aiohttp.ClientSession): session to post with
+            timeout (float): seconds before an attempt is given up
+            retries (int): number of retries after the first attempt
+            backoff (float): seconds to wait before the first retry, doubled
+                for every retry after it
+        """
+        self._session = session
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.stats: Dict[str, TargetStats] = {}
+
+    async def post_all(self, targets: Iterable[WebhookTarget]) -> Dict[str, bool]:
+        """Post to every target at once.
+
+        Returns:
+            Dict[str, bool]: whether the payload was delivered, by target name
+        """
+        targets = list(targets)
+        results = await asyncio.gather(*(self.post(target) for target in targets))
+        return {target.name: result for target, result in zip(targets, results)}
+
+    async def post(self, target: WebhookTarget) -> bool:
+        """Post to a single target, retrying on server errors and timeouts.
+
+        Only a 2xx response counts as delivered.
+
+        Returns:
+            bool: whether the payload was delivered
+        """
+        stats = self.stats.setdefault(target.name, TargetStats())
+        for attempt in range(self.retries + 1):
+            stats.attempts += 1
+            retry_after: Optional[float] = None
+            start = time.perf_counter()
+            try:
+                async with self._session.post(
+                    target.url,
+                    json=target.json,
+                    headers=target.headers,
+                    timeout=self._timeout,
+                    # a redirect means the payload was not accepted here
+                    allow_redirects=False,
+                ) as resp:
+                    # read the body so the connection goes back to the pool
+                    await resp.read()
+                    status: Optional[int] = resp.status
+                    if "Retry-After" in resp.headers:
+                        try:
+                            retry_after = float(resp.headers["Retry-After"])
+                        except ValueError:
+                            pass
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log.debug("Posting to %s failed: %r", target.name, e)
+                status = None
+            stats.last_latency = time.perf_counter() - start
+            stats.last_status = status
+
+            if status is not None and 200 <= status < 300:
+                stats.successes += 1
+                return True
+            if status is not None and status < 500 and status != 429:
+                # redirected or the request itself is wrong, retrying will
+                # not help
+                break
+            if attempt < self.retries:
+                jitter = random.uniform(0.5, 1.5)  # noqa: S311
+                delay = self.backoff * pow(2, attempt) * jitter
+                await asyncio.sleep(max(delay, retry_after or 0))
+
+        stats.failures += 1
+        log.warning("Unable to post to %s, last status %s", target.name, status)
+        return False
@@ -0,0 +1,11 @@
+"""Configuration of the test suite."""
+import os
+
+# obsidion reads its settings from the environment as soon as it is imported
+os.environ.setdefault("DISCORD_TOKEN", "token")
+os.environ.setdefault("SERVER_NAME", "tests")
+os.environ.setdefault("API_URL", "http://127.0.0.1/")
+os.environ.setdefault("HYPIXEL_API_TOKEN", "c2ab4bf4-fdb5-4a9e-8b04-7e3a1c2d9f10")
+os.environ.setdefault("STACK_TRACE_CHANNEL", "1")
+os.environ.setdefault("DATABASE_URL", "postgresql://obsidion@127.0.0.1/obsidion")
+os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:6379")
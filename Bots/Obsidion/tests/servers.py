@@ -0,0 +1,145 @@
+"""Local stand-ins for the servers the bot talks to."""
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterator
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from aiohttp import web
+
+Reply = Union[None, int, bytes, str, List[Optional[bytes]], Exception]
+
+
+@contextlib.asynccontextmanager
+async def http_server(app: web.Application) -> AsyncIterator[str]:
+    """Serve an app on a free local port.
+
+    Args:
+        app (web.Application): the app to serve
+
+    Yields:
+        str: base url of the server
+    """
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        await runner.cleanup()
+
+
+class RedisServer:
+    """An in-memory Redis speaking just enough RESP for the caches.
+
+    Every command received is recorded, so tests can check how many round
+    trips were made.
+
+    Attributes:
+        commands (List[List[bytes]]): the commands in the order received,
+            with their names upper cased
+    """
+
+    def __init__(self) -> None:
+        self.commands: List[List[bytes]] = []
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def __aenter__(self) -> str:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"redis://127.0.0.1:{port}"
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        assert self._server is not None  # noqa: S101
+        self._server.close()
+        await self._server.wait_closed()
+
+    def named(self, name: str) -> List[List[bytes]]:
+        """Get the commands received of a name."""
+        return [command for command in self.commands if command[0] == name.encode()]
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                args = []
+                for _arg in range(int(line[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                args[0] = args[0].upper()
+                self.commands.append(args)
+                writer.write(self._encode(self._execute(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        value, deadline = self._data.get(key, (None, None))
+        if deadline is not None and deadline <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def _execute(self, args: List[bytes]) -> Reply:
+        name, *params = args
+        if name == b"PING":
+            return "PONG"
+        if name == b"GET":
+            return self._get(params[0])
+        if name == b"MGET":
+            return [self._get(key) for key in params]
+        if name == b"SET":
+            key, value, *options = params
+            options = [option.upper() for option in options]
+            if b"NX" in options and self._get(key) is not None:
+                return None
+            deadline = None
+            if b"PX" in options:
+                px = int(options[options.index(b"PX") + 1])
+                deadline = time.monotonic() + px / 1000
+            self._data[key] = (value, deadline)
+            return "OK"
+        if name == b"DEL":
+            return sum(self._data.pop(key, None) is not None for key in params)
+        if name == b"EXISTS":
+            return sum(self._get(key) is not None for key in params)
+        if name == b"PEXPIRE":
+            value = self._get(params[0])
+            if value is None:
+                return 0
+            self._data[params[0]] = (value, time.monotonic() + int(params[1]) / 1000)
+            return 1
+        if name == b"PTTL":
+            if self._get(params[0]) is None:
+                return -2
+            deadline = self._data[params[0]][1]
+            if deadline is None:
+                return -1
+            return round((deadline - time.monotonic()) * 1000)
+        return Exception(f"unknown command '{name.decode()}'")
+
+    def _encode(self, reply: Reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, Exception):
+            return f"-ERR {reply}\r\n".encode()
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, str):
+            return f"+{reply}\r\n".encode()
+        if isinstance(reply, bytes):
+            return b"$%d\r\n%s\r\n" % (len(reply), reply)
+        return b"*%d\r\n" % len(reply) + b"".join(self._encode(item) for item in reply)
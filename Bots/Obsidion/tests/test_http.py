@@ -0,0 +1,86 @@
+"""Tests of the upstream clients against a stand-in server."""
+import asyncio
+from typing import Callable
+from typing import List
+from typing import Optional
+
+import pytest
+from aiohttp import web
+from obsidion.core.breaker import OPEN
+from obsidion.core.errors import UpstreamUnavailableError
+from obsidion.core.http import HTTPClients
+
+from .servers import http_server
+
+
+class CountingLimiter:
+    """Hands out tokens, recording the upstreams they were taken for."""
+
+    def __init__(self, error: Optional[BaseException] = None) -> None:
+        self.taken: List[str] = []
+        self.error = error
+
+    async def acquire(self, upstream: str) -> None:
+        if self.error is not None:
+            raise self.error
+        self.taken.append(upstream)
+
+
+def app() -> web.Application:
+    async def ok(request: web.Request) -> web.Response:
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_get("/", ok)
+    return app
+
+
+def request(
+    limiter: CountingLimiter,
+    clients_setup: Optional[Callable[[HTTPClients], None]] = None,
+) -> HTTPClients:
+    """Make a request to a stand-in upstream with fresh clients."""
+
+    async def run() -> HTTPClients:
+        clients = HTTPClients(rate_limiter=limiter)  # type: ignore[arg-type]
+        if clients_setup is not None:
+            clients_setup(clients)
+        try:
+            async with http_server(app()) as url:
+                async with clients.request("GET", url, upstream="mojang") as resp:
+                    assert resp.status == 200
+        finally:
+            await clients.close()
+        return clients
+
+    return asyncio.run(run())
+
+
+def test_token_is_taken_for_allowed_requests() -> None:
+    limiter = CountingLimiter()
+    clients = request(limiter)
+    assert limiter.taken == ["mojang"]
+    assert clients.breaker("mojang").failures == 0
+
+
+def test_open_circuit_does_not_take_a_token() -> None:
+    limiter = CountingLimiter()
+
+    def trip(clients: HTTPClients) -> None:
+        breaker = clients.breaker("mojang")
+        for _failure in range(breaker.failure_threshold):
+            breaker.record_failure()
+        assert breaker.state == OPEN
+
+    with pytest.raises(UpstreamUnavailableError):
+        request(limiter, trip)
+    assert limiter.taken == []
+
+
+def test_rate_limit_timeout_is_not_an_upstream_failure() -> None:
+    limiter = CountingLimiter(asyncio.TimeoutError())
+    clients_seen: List[HTTPClients] = []
+    with pytest.raises(asyncio.TimeoutError):
+        request(limiter, clients_seen.append)
+    breaker = clients_seen[0].breaker("mojang")
+    assert breaker.failures == 0
@@ -0,0 +1,204 @@
+"""Tests of the Hypixel player batcher against stand-in Hypixel and Redis."""
+import asyncio
+from collections import Counter
+from pathlib import Path
+from typing import Any
+from typing import AsyncIterator
+from typing import List
+
+import aioredis
+import asyncpixel.hypixel
+import pytest
+from aiohttp import web
+from asyncpixel import Hypixel
+from asyncpixel.models import Status
+from obsidion.cogs.hypixel.schemas import STATUS
+from obsidion.cogs.hypixel.service import PlayerBatcher
+from obsidion.cogs.hypixel.service import STATUS_PX
+from obsidion.core.serialization import ModelCache
+
+from .servers import http_server
+from .servers import RedisServer
+
+API_KEY = "c2ab4bf4-fdb5-4a9e-8b04-7e3a1c2d9f10"
+
+
+class FakeHypixel:
+    """Answers status requests, counting them by player.
+
+    Players whose uuid starts with ``offline`` have no session and those
+    starting with ``broken`` get a server error.
+    """
+
+    def __init__(self, delay: float = 0.01) -> None:
+        self.requests: Counter = Counter()
+        self.delay = delay
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/status", self.status)
+        return app
+
+    async def status(self, request: web.Request) -> web.Response:
+        uuid = request.query["uuid"]
+        assert request.query["key"] == API_KEY  # noqa: S101
+        self.requests[uuid] += 1
+        await asyncio.sleep(self.delay)
+        if uuid.startswith("broken"):
+            return web.json_response({"success": False}, status=500)
+        session = None
+        if not uuid.startswith("offline"):
+            session = {"online": True, "gameType": "BEDWARS", "mode": "LOBBY"}
+        return web.json_response({"success": True, "session": session})
+
+
+class Setup:
+    """A batcher of statuses backed by the stand-ins."""
+
+    def __init__(
+        self,
+        hypixel: FakeHypixel,
+        redis: RedisServer,
+        client: aioredis.Redis,
+        batcher: PlayerBatcher,
+    ) -> None:
+        self.hypixel = hypixel
+        self.redis = redis
+        self.client = client
+        self.batcher = batcher
+
+    async def lookup(self, *uuids: str) -> List[Any]:
+        """Look up players, then wait for their results to be cached."""
+        results = await asyncio.gather(
+            *(self.batcher.get(uuid) for uuid in uuids), return_exceptions=True
+        )
+        # lookups are answered before the results are written to the cache
+        await asyncio.gather(*self.batcher._flushes)
+        return results
+
+
+async def setup(
+    monkeypatch: pytest.MonkeyPatch, px: int = STATUS_PX
+) -> AsyncIterator[Setup]:
+    # asyncpixel opens its game types relative to the working directory
+    monkeypatch.chdir(Path(asyncpixel.__file__).parent.parent)
+    hypixel = FakeHypixel()
+    redis_server = RedisServer()
+    async with http_server(hypixel.app()) as url, redis_server as redis_url:
+        monkeypatch.setattr(asyncpixel.hypixel, "BASE_URL", f"{url}/")
+        client = Hypixel(API_KEY)
+        redis = aioredis.from_url(redis_url)
+        try:
+            batcher = PlayerBatcher(ModelCache(redis), STATUS, client.player_status, px)
+            yield Setup(hypixel, redis_server, redis, batcher)
+        finally:
+            await client.close()
+            await redis.close()
+
+
+def run(monkeypatch: pytest.MonkeyPatch, test: Any, px: int = STATUS_PX) -> None:
+    async def main() -> None:
+        async for state in setup(monkeypatch, px):
+            await test(state)
+
+    asyncio.run(main())
+
+
+def test_lookups_are_deduplicated_and_batched(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def test(state: Setup) -> None:
+        results = await state.lookup("a", "b", "a", "offline", "a", "b")
+        assert all(isinstance(result, Status) for result in results[:3])
+        assert results[0].online and results[0].mode == "LOBBY"
+        assert results[0].game_type.type_name == "BEDWARS"
+        assert results[3] is None
+        assert state.hypixel.requests == {"a": 1, "b": 1, "offline": 1}
+        # the cache is checked with a single MGET of every distinct player
+        assert [len(command) - 1 for command in state.redis.named("MGET")] == [3]
+        assert len(state.redis.named("GET")) == 0
+
+    run(monkeypatch, test)
+
+
+def test_cached_players_are_not_fetched_again(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def test(state: Setup) -> None:
+        first = await state.lookup("a", "b")
+        second = await state.lookup("a", "b", "c")
+        assert second[:2] == first
+        assert state.hypixel.requests == {"a": 1, "b": 1, "c": 1}
+        assert len(state.redis.named("MGET")) == 2
+
+    run(monkeypatch, test)
+
+
+def test_results_are_cached_for_their_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def test(state: Setup) -> None:
+        await state.lookup("a", "b")
+        sets = state.redis.named("SET")
+        assert len(sets) == 2
+        assert all(command[-2:] == [b"PX", str(STATUS_PX).encode()] for command in sets)
+        for uuid in ("a", "b"):
+            assert 0 < await state.client.pttl(state.batcher.key(uuid)) <= STATUS_PX
+
+    run(monkeypatch, test)
+
+
+def test_expired_results_are_fetched_again(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def test(state: Setup) -> None:
+        await state.lookup("a")
+        await state.lookup("a")
+        assert state.hypixel.requests["a"] == 1
+        await asyncio.sleep(0.25)
+        await state.lookup("a")
+        assert state.hypixel.requests["a"] == 2
+
+    run(monkeypatch, test, px=200)
+
+
+def test_failures_only_affect_their_player(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def test(state: Setup) -> None:
+        results = await state.lookup("a", "broken")
+        assert isinstance(results[0], Status)
+        assert isinstance(results[1], asyncpixel.exceptions.ApiNoSuccess)
+        # only the successful lookup is cached
+        assert [command[1] for command in state.redis.named("SET")] == [
+            state.batcher.key("a").encode()
+        ]
+        await state.lookup("broken")
+        assert state.hypixel.requests["broken"] == 2
+
+    run(monkeypatch, test)
+
+
+def test_lookups_during_a_fetch_share_it(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def test(state: Setup) -> None:
+        state.hypixel.delay = 0.2
+        first = asyncio.ensure_future(state.lookup("a"))
+        # past the batch window, the first lookup is being fetched
+        await asyncio.sleep(0.1)
+        second = await state.lookup("a")
+        assert second == await first
+        assert state.hypixel.requests["a"] == 1
+
+    run(monkeypatch, test)
+
+
+def test_load(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A burst of lookups costs one fetch per player and one cache read."""
+    players = [f"player{number}" for number in range(200)]
+
+    async def test(state: Setup) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await state.lookup(*(players * 10))
+        elapsed = loop.time() - start
+        assert all(isinstance(result, Status) for result in results)
+        assert set(state.hypixel.requests.values()) == {1}
+        assert len(state.hypixel.requests) == len(players)
+        assert len(state.redis.named("MGET")) == 1
+        # every fetch runs at once, not one after another
+        assert elapsed < 2
+        assert not state.batcher._flushes
+
+    run(monkeypatch, test)
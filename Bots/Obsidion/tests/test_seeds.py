@@ -0,0 +1,72 @@
+"""Tests of the seed analysis against a direct port of the game's code."""
+import numpy as np
+import pytest
+from obsidion.cogs.minecraft.seeds import count_slime_chunks
+from obsidion.cogs.minecraft.seeds import slime_chunks
+
+
+def java_int(value: int) -> int:
+    """Wrap a value to a Java int."""
+    value &= 0xFFFFFFFF
+    return value - (1 << 32) if value >> 31 else value
+
+
+def java_long(value: int) -> int:
+    """Wrap a value to a Java long."""
+    value &= (1 << 64) - 1
+    return value - (1 << 64) if value >> 63 else value
+
+
+def is_slime_chunk(seed: int, x: int, z: int) -> bool:
+    """Check a single chunk, a line by line port of the game's Java code."""
+    seed = (
+        java_long(
+            seed
+            + java_int(x * x * 0x4C1906)
+            + java_int(x * 0x5AC0DB)
+            + java_int(z * z) * 0x4307A7
+            + java_int(z * 0x5F24F)
+        )
+        ^ 0x3AD8025F
+    )
+    # new Random(seed).nextInt(10) == 0
+    state = (seed ^ 0x5DEECE66D) & ((1 << 48) - 1)
+    while True:
+        state = (state * 0x5DEECE66D + 0xB) & ((1 << 48) - 1)
+        bits = state >> 17
+        value = bits % 10
+        if bits - value + 9 < 1 << 31:
+            return value == 0
+
+
+@pytest.mark.parametrize(
+    ("seed", "x", "z"),
+    [
+        (0, -2, -2),
+        (12345, 100000, -100000),
+        (2**31 - 1, 1875000, 1875000),
+        (-(2**63), -1875000, 1875000),
+        (2**63 - 1, 46340, -46341),
+        (-4172144997902289642, 30000, 30000),
+    ],
+)
+def test_slime_chunks(seed: int, x: int, z: int) -> None:
+    expected = [
+        [is_slime_chunk(seed, cx, cz) for cx in range(x, x + 16)]
+        for cz in range(z, z + 16)
+    ]
+    assert slime_chunks(seed, x, z, 16, 16).tolist() == expected
+
+
+def test_count_slime_chunks() -> None:
+    # spans several blocks of rows, far from the origin
+    seed, x, z = 987654321, 1000000, -1000000
+    expected = slime_chunks(seed, x, z, 20, 600)
+    assert count_slime_chunks(seed, x, z, 20, 600) == int(expected.sum())
+    assert np.array_equal(
+        expected[::97, ::7],
+        [
+            [is_slime_chunk(seed, cx, cz) for cx in range(x, x + 20, 7)]
+            for cz in range(z, z + 600, 97)
+        ],
+    )
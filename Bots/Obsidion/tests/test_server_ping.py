@@ -0,0 +1,312 @@
+"""Tests of the server pinger against stand-in Java and Bedrock servers."""
+import asyncio
+import base64
+import json
+import struct
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import aioredis
+import pytest
+from obsidion.core import server_ping
+from obsidion.core.server_ping import pack_packet
+from obsidion.core.server_ping import pack_string
+from obsidion.core.server_ping import pack_varint
+from obsidion.core.server_ping import RAKNET_MAGIC
+from obsidion.core.server_ping import read_varint
+from obsidion.core.server_ping import ServerPinger
+from obsidion.core.server_ping import unpack_varint
+
+from .servers import RedisServer
+
+ICON = b"\x89PNG\r\n\x1a\n" + b"icon"
+STATUS = {
+    "description": {"text": "§aA ", "extra": [{"text": "server"}, "\n§bhere"]},
+    "players": {"online": 3, "max": 20, "sample": [{"name": "Notch", "id": "0"}]},
+    "version": {"name": "§cPaper 1.17.1", "protocol": 756},
+    "favicon": "data:image/png;base64," + base64.b64encode(ICON).decode(),
+}
+
+Respond = Callable[[asyncio.StreamWriter, bytes], Awaitable[None]]
+
+
+def status_packet(status: Any) -> bytes:
+    """Frame a status response."""
+    return pack_packet(0x00, pack_string(json.dumps(status)))
+
+
+class Bot:
+    """Just the Redis clients of the bot."""
+
+    def __init__(self, redis: aioredis.Redis, redis_bytes: aioredis.Redis) -> None:
+        self.redis = redis
+        self.redis_bytes = redis_bytes
+
+
+class JavaServer:
+    """A Java server answering status requests with a scripted response."""
+
+    def __init__(self, respond: Respond) -> None:
+        self.respond = respond
+        self.connections = 0
+
+    async def serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        try:
+            handshake = await reader.readexactly(await read_varint(reader))
+            request = await reader.readexactly(await read_varint(reader))
+            assert request == b"\x00"  # noqa: S101
+            await self.respond(writer, handshake)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class BedrockServer(asyncio.DatagramProtocol):
+    """A Bedrock server answering unconnected pings, or ignoring them."""
+
+    def __init__(self, server_id: Optional[str]) -> None:
+        self.server_id = server_id
+        self.pings: List[bytes] = []
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        self.pings.append(data)
+        if self.server_id is None or self.transport is None:
+            return
+        payload = self.server_id.encode()
+        self.transport.sendto(
+            b"\x1c"
+            + data[1:9]
+            + struct.pack(">q", 1234)
+            + RAKNET_MAGIC
+            + struct.pack(">H", len(payload))
+            + payload,
+            addr,
+        )
+
+
+async def ping(
+    monkeypatch: pytest.MonkeyPatch,
+    edition: str,
+    server: Any,
+    times: int = 1,
+    px: int = server_ping.STATUS_PX,
+) -> Tuple[List[Optional[Dict[str, Any]]], RedisServer, ServerPinger]:
+    """Ping a stand-in server with a fresh pinger, several times in a row."""
+    monkeypatch.setattr(server_ping, "PING_TIMEOUT", 0.2)
+    loop = asyncio.get_running_loop()
+    if edition == "java":
+        listener = await asyncio.start_server(server.serve, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+    else:
+        transport, bedrock = await loop.create_datagram_endpoint(
+            lambda: server, local_addr=("127.0.0.1", 0)
+        )
+        port = transport.get_extra_info("sockname")[1]
+    redis_server = RedisServer()
+    async with redis_server as url:
+        bot = Bot(aioredis.from_url(url, decode_responses=True), aioredis.from_url(url))
+        pinger = ServerPinger(bot)  # type: ignore
+        method = pinger.java if edition == "java" else pinger.bedrock
+        try:
+            results = [await method("127.0.0.1", port, px=px) for time in range(times)]
+            icons = [
+                await pinger.icon(result["icon"])
+                for result in results
+                if result and result.get("icon")
+            ]
+            for result, icon in zip(results, icons):
+                result["icon_data"] = icon  # type: ignore
+        finally:
+            await bot.redis.close()
+            await bot.redis_bytes.close()
+            if edition == "java":
+                listener.close()
+                await listener.wait_closed()
+            else:
+                transport.close()
+    return results, redis_server, pinger
+
+
+def java(
+    monkeypatch: pytest.MonkeyPatch, respond: Respond, times: int = 1
+) -> Tuple[Optional[Dict[str, Any]], RedisServer, JavaServer]:
+    """Ping a stand-in Java server, returning the last result."""
+    server = JavaServer(respond)
+
+    async def main() -> Tuple[List[Optional[Dict[str, Any]]], RedisServer, Any]:
+        return await ping(monkeypatch, "java", server, times)
+
+    results, redis, pinger = asyncio.run(main())
+    return results[-1], redis, server
+
+
+def cached_px(redis: RedisServer, prefix: str) -> int:
+    """Get the PX a status was cached with."""
+    (command,) = [
+        command
+        for command in redis.named("SET")
+        if command[1].startswith(prefix.encode())
+    ]
+    return int(command[command.index(b"PX") + 1])
+
+
+def test_java_status(monkeypatch: pytest.MonkeyPatch) -> None:
+    handshakes = []
+
+    async def respond(writer: asyncio.StreamWriter, handshake: bytes) -> None:
+        handshakes.append(handshake)
+        writer.write(status_packet(STATUS))
+
+    status, redis, server = java(monkeypatch, respond)
+    assert status is not None
+    assert status["motd"] == {
+        "raw": ["§aA server", "§bhere"],
+        "clean": ["A server", "here"],
+    }
+    assert status["players"] == {"online": 3, "max": 20, "sample": ["Notch"]}
+    assert status["version"] == "Paper 1.17.1"
+    assert status["protocol"] == 756
+    assert status["icon_data"] == ICON
+    assert cached_px(redis, "server_java_") == server_ping.STATUS_PX
+    # the icon is stored once by its hash and kept alive
+    assert len(redis.named("PEXPIRE")) == 1
+
+    # handshake: packet id, protocol version, host, port, next state
+    (handshake,) = handshakes
+    packet_id, offset = unpack_varint(handshake)
+    protocol, offset = unpack_varint(handshake, offset)
+    size, offset = unpack_varint(handshake, offset)
+    assert (packet_id, protocol) == (0x00, server_ping.HANDSHAKE_PROTOCOL)
+    assert handshake[offset : offset + size] == b"127.0.0.1"
+    assert handshake[-1] == 1
+
+
+def test_java_legacy_motd(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def respond(writer: asyncio.StreamWriter, handshake: bytes) -> None:
+        writer.write(status_packet({"description": "§l§6Legacy§r\n§7server"}))
+
+    status, redis, server = java(monkeypatch, respond)
+    assert status is not None
+    assert status["motd"] == {
+        "raw": ["§l§6Legacy§r", "§7server"],
+        "clean": ["Legacy", "server"],
+    }
+    assert status["players"] == {"online": 0, "max": 0, "sample": []}
+    assert status["icon"] is None
+
+
+def test_java_reply_split_into_single_bytes(monkeypatch: pytest.MonkeyPatch) -> None:
+    # the length VarInt of a big response spans several bytes
+    description = "x" * 300
+
+    async def respond(writer: asyncio.StreamWriter, handshake: bytes) -> None:
+        for byte in status_packet({"description": description}):
+            writer.write(bytes([byte]))
+            await writer.drain()
+            await asyncio.sleep(0)
+
+    status, redis, server = java(monkeypatch, respond)
+    assert status is not None
+    assert status["motd"]["raw"] == [description]
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        # length promises more than is sent
+        pack_varint(100) + b"\x00" + pack_string("{}"),
+        # length cut off halfway through its VarInt
+        b"\x80",
+        # length VarInt longer than 5 bytes
+        b"\xff\xff\xff\xff\xff\x01",
+        # length of 0
+        pack_varint(0),
+        # length beyond the largest response accepted
+        pack_varint(server_ping.MAX_RESPONSE + 1),
+        # string length cut off inside the packet
+        pack_varint(2) + b"\x00\x80",
+        # wrong packet id
+        pack_packet(0x01, pack_string("{}")),
+        # not JSON
+        pack_packet(0x00, pack_string("{")),
+        # JSON but not an object
+        status_packet([1, 2]),
+    ],
+)
+def test_java_malformed_reply(monkeypatch: pytest.MonkeyPatch, response: bytes) -> None:
+    async def respond(writer: asyncio.StreamWriter, handshake: bytes) -> None:
+        writer.write(response)
+
+    status, redis, server = java(monkeypatch, respond)
+    assert status is None
+    # down servers are remembered for a shorter time
+    assert cached_px(redis, "server_java_") == server_ping.DOWN_PX
+
+
+def test_java_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def respond(writer: asyncio.StreamWriter, handshake: bytes) -> None:
+        # half a length, then nothing
+        writer.write(b"\x80")
+        await writer.drain()
+        await asyncio.sleep(1)
+
+    status, redis, server = java(monkeypatch, respond)
+    assert status is None
+    assert cached_px(redis, "server_java_") == server_ping.DOWN_PX
+
+
+def test_java_status_is_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def respond(writer: asyncio.StreamWriter, handshake: bytes) -> None:
+        writer.write(status_packet(STATUS))
+
+    status, redis, server = java(monkeypatch, respond, times=3)
+    assert status is not None
+    assert status["players"]["online"] == 3
+    assert server.connections == 1
+
+
+def test_bedrock_status(monkeypatch: pytest.MonkeyPatch) -> None:
+    server = BedrockServer(
+        "MCPE;§aBedrock server;448;1.17.10;3;10;1234;§bworld;Survival;1;19132;"
+    )
+
+    async def main() -> Any:
+        return await ping(monkeypatch, "bedrock", server, times=2)
+
+    (status, cached), redis, pinger = asyncio.run(main())
+    assert status == cached
+    assert status is not None
+    assert status["edition"] == "MCPE"
+    assert status["motd"] == ["Bedrock server", "world"]
+    assert (status["protocol_version"], status["protocol_name"]) == (448, "1.17.10")
+    assert (status["player_count"], status["player_max"]) == (3, 10)
+    assert status["gamemode"] == "Survival"
+    (ping_data,) = server.pings
+    assert ping_data[0] == server_ping.UNCONNECTED_PING
+    assert ping_data[9:25] == RAKNET_MAGIC
+
+
+def test_bedrock_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    server = BedrockServer(None)
+
+    async def main() -> Any:
+        return await ping(monkeypatch, "bedrock", server)
+
+    (status,), redis, pinger = asyncio.run(main())
+    assert status is None
+    assert len(server.pings) == 1
+    assert cached_px(redis, "server_bedrock_") == server_ping.DOWN_PX
@@ -0,0 +1,156 @@
+"""Tests of the webhook poster against a stand-in receiver."""
+import asyncio
+import time
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import aiohttp
+from aiohttp import web
+from obsidion.core.webhooks import TargetStats
+from obsidion.core.webhooks import WebhookPoster
+from obsidion.core.webhooks import WebhookTarget
+
+from .servers import http_server
+
+
+class Receiver:
+    """A webhook receiver answering with a scripted list of responses.
+
+    The last response is repeated once the list runs out.
+    """
+
+    def __init__(self, *responses: int, headers: Optional[Dict[str, str]] = None):
+        self.responses = list(responses)
+        self.headers = headers or {}
+        self.received: List[float] = []
+        self.redirected = 0
+        self.delay = 0.0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/hook", self.hook)
+        app.router.add_route("*", "/elsewhere", self.elsewhere)
+        return app
+
+    async def hook(self, request: web.Request) -> web.Response:
+        self.received.append(time.perf_counter())
+        assert await request.json() == {"guilds": 10}  # noqa: S101
+        status = self.responses[min(len(self.received), len(self.responses)) - 1]
+        if self.delay and len(self.received) == 1:
+            await asyncio.sleep(self.delay)
+        headers = dict(self.headers)
+        if 300 <= status < 400:
+            headers["Location"] = "/elsewhere"
+        return web.Response(status=status, headers=headers)
+
+    async def elsewhere(self, request: web.Request) -> web.Response:
+        self.redirected += 1
+        return web.Response(status=200)
+
+    @property
+    def gaps(self) -> List[float]:
+        return [b - a for a, b in zip(self.received, self.received[1:])]
+
+
+def post(
+    receiver: Receiver, timeout: float = 10, retries: int = 3, backoff: float = 1
+) -> Tuple[bool, TargetStats]:
+    """Post a payload to the receiver with a fresh poster."""
+
+    async def run() -> Tuple[bool, TargetStats]:
+        async with http_server(receiver.app()) as url:
+            async with aiohttp.ClientSession() as session:
+                poster = WebhookPoster(
+                    session, timeout=timeout, retries=retries, backoff=backoff
+                )
+                target = WebhookTarget("list", f"{url}/hook", {"guilds": 10})
+                delivered = await poster.post(target)
+                return delivered, poster.stats["list"]
+
+    return asyncio.run(run())
+
+
+def test_delivered() -> None:
+    receiver = Receiver(204)
+    delivered, stats = post(receiver)
+    assert delivered
+    assert len(receiver.received) == 1
+    assert stats.successes == 1
+
+
+def test_server_errors_are_retried_with_backoff() -> None:
+    receiver = Receiver(500, 503, 200)
+    delivered, stats = post(receiver, backoff=0.05)
+    assert delivered
+    assert len(receiver.received) == 3
+    # the delay doubles after every attempt, jittered by at most half
+    assert receiver.gaps[0] >= 0.05 * 0.5
+    assert receiver.gaps[1] >= 0.1 * 0.5
+    assert stats.attempts == 3
+    assert stats.successes == 1
+    assert stats.failures == 0
+
+
+def test_rate_limit_waits_for_retry_after() -> None:
+    receiver = Receiver(429, 200, headers={"Retry-After": "0.3"})
+    delivered, stats = post(receiver, backoff=0.01)
+    assert delivered
+    assert len(receiver.received) == 2
+    assert receiver.gaps[0] >= 0.3
+
+
+def test_gives_up_after_the_last_retry() -> None:
+    receiver = Receiver(502)
+    delivered, stats = post(receiver, retries=2, backoff=0.01)
+    assert not delivered
+    assert len(receiver.received) == 3
+    assert stats.failures == 1
+    assert stats.last_status == 502
+
+
+def test_timeouts_are_retried() -> None:
+    receiver = Receiver(200)
+    receiver.delay = 1
+    delivered, stats = post(receiver, timeout=0.2, backoff=0.01)
+    assert delivered
+    assert len(receiver.received) == 2
+
+
+def test_client_errors_are_not_retried() -> None:
+    receiver = Receiver(400)
+    delivered, stats = post(receiver, backoff=0.01)
+    assert not delivered
+    assert len(receiver.received) == 1
+    assert stats.failures == 1
+
+
+def test_redirect_is_not_delivered() -> None:
+    receiver = Receiver(307)
+    delivered, stats = post(receiver, backoff=0.01)
+    assert not delivered
+    assert len(receiver.received) == 1
+    assert receiver.redirected == 0
+    assert stats.successes == 0
+    assert stats.last_status == 307
+
+
+def test_post_all_reports_every_target() -> None:
+    async def run() -> Dict[str, bool]:
+        ok = Receiver(200)
+        broken = Receiver(404)
+        async with http_server(ok.app()) as ok_url:
+            async with http_server(broken.app()) as broken_url:
+                async with aiohttp.ClientSession() as session:
+                    poster = WebhookPoster(session, backoff=0.01)
+                    return await poster.post_all(
+                        [
+                            WebhookTarget("ok", f"{ok_url}/hook", {"guilds": 10}),
+                            WebhookTarget(
+                                "broken", f"{broken_url}/hook", {"guilds": 10}
+                            ),
+                        ]
+                    )
+
+    assert asyncio.run(run()) == {"ok": True, "broken": False}